@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+ANN Benchmark - Index backends against exact search
+
+Builds the index backends over synthetic clustered embeddings (real
+embeddings cluster by topic, which is what makes graph search and
+quantization work) and reports recall@k against the exact top k together
+with p50/p99 query latency: for HNSW per efSearch value, for the quantized
+backends (sq8, pq) per re-rank factor, with the memory their scanned codes
+take. Use it to pick RAG_INDEX_BACKEND and its settings per deployment.
+
+Usage:
+    python scripts/benchmark_ann.py
+    python scripts/benchmark_ann.py --n 20000 --dim 384 --ef-search 16 32 64 128
+    python scripts/benchmark_ann.py --backends sq8 pq --pq-subspaces 48 --rerank 4 10
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Shared tool libraries (vector indexes)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tools')))
+
+from hnsw_index import HNSWIndex, HnswlibIndex, hnswlib
+from quantization import QuantizedIndex
+from vector_index import VectorIndex
+
+
+def clustered_vectors(n, dim, clusters, rng):
+    centres = rng.normal(size=(clusters, dim))
+    labels = rng.integers(clusters, size=n)
+    return (centres[labels] + 0.5 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def percentile(values, pct):
+    return float(np.percentile(values, pct))
+
+
+def timed_search(index, queries, k, **kwargs):
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits = index.search(query, limit=k, threshold=-1.0, **kwargs)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([hit["id"] for hit in hits])
+    return results, latencies
+
+
+def recall_at_k(found, truth):
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def megabytes(n_bytes):
+    return n_bytes / (1024 * 1024)
+
+
+def report(name, latencies, recall=None, memory=None):
+    line = f"{name:<16} p50 {percentile(latencies, 50):7.3f} ms  p99 {percentile(latencies, 99):7.3f} ms"
+    if recall is not None:
+        line += f"  recall@k {recall:.4f}"
+    if memory is not None:
+        line += f"  scanned {megabytes(memory):7.2f} MB"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the index backends against exact search")
+    parser.add_argument("--n", type=int, default=5000, help="Number of indexed vectors")
+    parser.add_argument("--dim", type=int, default=128, help="Vector dimension")
+    parser.add_argument("--clusters", type=int, default=50, help="Topic clusters in the synthetic data")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--k", type=int, default=10, help="Results per query")
+    parser.add_argument("--backends", nargs="+", default=["hnsw", "sq8", "pq"],
+                        choices=["hnsw", "sq8", "pq"], help="Backends to compare with exact search")
+    parser.add_argument("--M", type=int, default=16, help="HNSW links per node")
+    parser.add_argument("--ef-construction", type=int, default=200, help="HNSW build candidate list size")
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 32, 64, 128],
+                        help="HNSW query candidate list sizes to compare")
+    parser.add_argument("--pq-subspaces", type=int, default=16, help="PQ chunks per vector (must divide --dim)")
+    parser.add_argument("--rerank", type=int, nargs="+", default=[1, 4, 10],
+                        help="Quantized backends: candidates re-scored per result")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    vectors = clustered_vectors(args.n + args.queries, args.dim, args.clusters, rng)
+    rows = [
+        {"id": str(i), "content": "", "metadata": {}, "doc_type": None, "category": None,
+         "title": None, "embedding": vector}
+        for i, vector in enumerate(vectors[:args.n])
+    ]
+    queries = vectors[args.n:]
+
+    print(f"n={args.n} dim={args.dim} queries={args.queries} k={args.k}")
+
+    start = time.perf_counter()
+    exact = VectorIndex.from_rows(rows, dim=args.dim)
+    print(f"exact build      {time.perf_counter() - start:8.2f} s")
+    truth, exact_ms = timed_search(exact, queries, args.k)
+    report("exact", exact_ms, memory=args.n * args.dim * 4)
+
+    if "hnsw" in args.backends:
+        # The pure-Python graph, and hnswlib's when it is installed
+        engines = [("hnsw", HNSWIndex)] + ([("hnswlib", HnswlibIndex)] if hnswlib is not None else [])
+        for name, engine in engines:
+            start = time.perf_counter()
+            hnsw = engine.from_rows(rows, dim=args.dim, M=args.M,
+                                    ef_construction=args.ef_construction, seed=args.seed)
+            print(f"{name + ' build':<16} {time.perf_counter() - start:8.2f} s  "
+                  f"(M={args.M} efConstruction={args.ef_construction})")
+            for ef in args.ef_search:
+                found, hnsw_ms = timed_search(hnsw, queries, args.k, ef_search=ef)
+                report(f"{name} ef={ef}", hnsw_ms, recall_at_k(found, truth))
+
+    for method in ("sq8", "pq"):
+        if method not in args.backends:
+            continue
+        params = {"subspaces": args.pq_subspaces} if method == "pq" else {}
+        start = time.perf_counter()
+        index = QuantizedIndex.from_rows(rows, dim=args.dim, method=method, **params)
+        print(f"{method} build        {time.perf_counter() - start:8.2f} s")
+        for rerank in args.rerank:
+            index.rerank = rerank
+            found, quant_ms = timed_search(index, queries, args.k)
+            report(f"{method} rerank={rerank}", quant_ms, recall_at_k(found, truth),
+                   index.memory_usage()["codes"])
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,15 @@ Generate SQL UPDATE statements to add embeddings to documents.
 Run this, then copy the output SQL into Supabase SQL Editor.
 """
 import os
+import sys
 from openai import OpenAI
 from supabase import create_client
 
+# Shared tool libraries (batched embeddings)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tools')))
+
+from batch_embedder import BatchEmbedder, pack_batches
+
 # Initialize clients
 openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 supabase = create_client(
@@ -16,42 +22,64 @@ supabase = create_client(
 
 # Get all documents without embeddings
 print("📡 Fetching documents from Supabase...")
-response = supabase.table("documents").select("id, content, title").is_("embedding", "null").execute()
-documents = response.data
+response = supabase.table("documents").select("id, content, title, metadata, parent_id").is_("embedding", "null").execute()
+# Parents of chunked documents are stored without an embedding on purpose
+documents = [
+    doc for doc in response.data
+    if doc.get("parent_id") or "chunk_count" not in (doc.get("metadata") or {})
+]
 
 if not documents:
     print("✅ All documents already have embeddings!")
     exit(0)
 
 print(f"Found {len(documents)} documents without embeddings\n")
+
 print("Generating embeddings and SQL...\n")
+
+embedder = BatchEmbedder(openai_client)
+
+
+def embed_documents(docs):
+    """
+    (document, embedding or exception) pairs. One request per batch of
+    documents instead of one per document (cached across runs); a batch that
+    fails is retried a document at a time, so one bad document does not cost
+    the others their SQL.
+    """
+    contents = [doc["content"] for doc in docs]
+    for batch in pack_batches(contents, embedder.max_batch_tokens, embedder.max_batch_inputs):
+        batch_docs = [docs[i] for i in batch]
+        try:
+            yield from zip(batch_docs, embedder.embed([doc["content"] for doc in batch_docs]))
+        except Exception:
+            for doc in batch_docs:
+                try:
+                    yield doc, embedder.embed([doc["content"]])[0]
+                except Exception as e:
+                    yield doc, e
+
+
 print("=" * 80)
 print("-- Copy everything below this line and paste into Supabase SQL Editor")
 print("=" * 80)
 print()
 
-for doc in documents:
-    try:
-        # Generate embedding
-        embedding_response = openai_client.embeddings.create(
-            model="text-embedding-3-small",
-            input=doc["content"]
-        )
-        embedding = embedding_response.data[0].embedding
-        
-        # Format as PostgreSQL array
-        embedding_str = "[" + ",".join(str(x) for x in embedding) + "]"
-        
-        # Generate SQL
-        print(f"-- Update: {doc['title']}")
-        print(f"UPDATE documents")
-        print(f"SET embedding = '{embedding_str}'::vector")
-        print(f"WHERE id = '{doc['id']}';")
-        print()
-        
-    except Exception as e:
-        print(f"-- ERROR for {doc['title']}: {e}")
+for doc, embedding in embed_documents(documents):
+    if isinstance(embedding, Exception):
+        print(f"-- ERROR for {doc['title']}: {embedding}")
         print()
+        continue
+    
+    # Format as PostgreSQL array
+    embedding_str = "[" + ",".join(str(x) for x in embedding) + "]"
+    
+    # Generate SQL
+    print(f"-- Update: {doc['title']}")
+    print(f"UPDATE documents")
+    print(f"SET embedding = '{embedding_str}'::vector")
+    print(f"WHERE id = '{doc['id']}';")
+    print()
 
 print("=" * 80)
 print("-- End of SQL")
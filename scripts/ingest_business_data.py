@@ -11,7 +11,7 @@ This script ingests ALL types of business data into Supabase:
 - General business knowledge
 
 Usage:
-    # Ingest from structured JSON file
+    # Ingest from structured JSON file (or JSON Lines: .jsonl / .ndjson)
     python ingest_business_data.py --json /path/to/business_data.json
     
     # Ingest sample data for testing
@@ -21,13 +21,37 @@ Usage:
     python ingest_business_data.py --dir /path/to/business/data
 """
 import argparse
-import json
 import os
 import sys
+import threading
+from contextlib import ExitStack, contextmanager
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional, Tuple
 from supabase import create_client, Client
 from openai import OpenAI
+from postgrest.types import ReturnMethod
+
+# Shared tool libraries (batched embeddings, chunking, bulk writes, sync state)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tools')))
+
+from batch_embedder import BatchEmbedder
+from bulk_writer import BULK_BATCH_SIZE, CopyWriter, batches, rest_insert, vector_literal, with_ids
+from chunking import chunk_document, chunk_rows, parent_row
+from ingest_pipeline import Pipeline, Stage
+from ingest_state import PAGE_SIZE, IngestState, content_hash, fetch_sources, state_path, sync_action
+from json_stream import iter_records
+
+# Documents embedded and written per sync batch (and checkpoint)
+SYNC_BATCH_DOCUMENTS = int(os.getenv("INGEST_BATCH_DOCUMENTS", "100"))
+
+# Contact emails per existence lookup (an `in` filter in the request URL)
+EMAIL_LOOKUP_SIZE = 200
+
+# Threads per sync pipeline stage
+INGEST_READ_WORKERS = int(os.getenv("INGEST_READ_WORKERS", "4"))
+INGEST_CHUNK_WORKERS = int(os.getenv("INGEST_CHUNK_WORKERS", "2"))
+INGEST_EMBED_WORKERS = int(os.getenv("INGEST_EMBED_WORKERS", "2"))
+INGEST_WRITE_WORKERS = int(os.getenv("INGEST_WRITE_WORKERS", "1"))
 
 
 def get_clients():
@@ -45,13 +69,119 @@ def get_clients():
     return supabase, openai_client
 
 
+def get_db_connection():
+    """Postgres connection for COPY-based bulk writes (None without SUPABASE_DB_URL)."""
+    db_url = os.getenv("SUPABASE_DB_URL")
+    if not db_url:
+        return None
+    import psycopg2
+    return psycopg2.connect(db_url)
+
+
 def generate_embedding(text: str, openai_client: OpenAI) -> List[float]:
-    """Generate embedding for text."""
-    response = openai_client.embeddings.create(
-        model="text-embedding-3-small",
-        input=text
-    )
-    return response.data[0].embedding
+    """Generate embedding for text (cached across runs and with rag_cli)."""
+    return generate_embeddings([text], openai_client)[0]
+
+
+def generate_embeddings(texts: List[str], openai_client: OpenAI) -> List[List[float]]:
+    """Embed many texts in as few requests as possible (see batch_embedder.py)."""
+    return BatchEmbedder(openai_client).embed(texts)
+
+
+def document_fields(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """The `documents` columns of an input document."""
+    return {
+        "content": doc["content"],
+        "doc_type": doc.get("doc_type", "general"),
+        "category": doc.get("category", "general"),
+        "title": doc.get("title"),
+        "source": doc.get("source"),
+        "metadata": doc.get("metadata", {})
+    }
+
+
+def document_rows(doc: Dict[str, Any], doc_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    `documents` rows for a document, still without embeddings: the document
+    itself, or (when it is longer than one chunk) a parent row plus its chunks.
+    The first row is the top-level one, with id `doc_id` (new if None).
+    
+    A parent row leaves out `content_hash`: it is set by `finish_document`
+    once the chunks are stored, so a parent whose chunks never made it is
+    picked up again as changed on the next sync.
+    """
+    data = document_fields(doc)
+    for column in ("source_key", "content_hash"):
+        if doc.get(column):
+            data[column] = doc[column]
+    top = {**data, "id": doc_id} if doc_id else dict(data)
+    
+    file_type = data["metadata"].get("file_type") or Path(doc.get("source") or "").suffix
+    chunks = chunk_document(data["content"], file_type)
+    if len(chunks) <= 1:
+        return with_ids([top])
+    top.pop("content_hash", None)
+    parent = with_ids([parent_row(top, len(chunks))])[0]
+    return [parent] + with_ids(chunk_rows(data, chunks, parent["id"]))
+
+
+def finish_document(supabase: Client, rows: List[Dict[str, Any]], digest: Optional[str]) -> None:
+    """Mark a chunked document complete by storing its hash on the parent row."""
+    if len(rows) > 1 and digest:
+        supabase.table("documents").update({"content_hash": digest}).eq("id", rows[0]["id"]).execute()
+
+
+def embed_rows(rows: List[Dict[str, Any]], openai_client: OpenAI) -> None:
+    """Fill in the embeddings of `rows` in batches (parent rows stay without one)."""
+    pending = [row for row in rows if "embedding" not in row]
+    embeddings = generate_embeddings([row["content"] for row in pending], openai_client)
+    for row, embedding in zip(pending, embeddings):
+        row["embedding"] = embedding
+
+
+@contextmanager
+def document_writer(supabase: Client):
+    """Bulk row writer: COPY when SUPABASE_DB_URL is set, multi-row REST inserts otherwise."""
+    conn = get_db_connection()
+    if conn is None:
+        yield lambda rows: rest_insert(supabase, "documents", rows)
+        return
+    try:
+        yield CopyWriter(conn).write
+    finally:
+        conn.close()
+
+
+def ingest_documents(supabase: Client, openai_client: OpenAI, docs: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """
+    Ingest documents in bulk: their rows are embedded in batches and written
+    with COPY when SUPABASE_DB_URL is set, otherwise with multi-row REST inserts.
+    
+    Returns:
+        (documents ingested, errors)
+    """
+    rows, ingested, errors = [], [], 0
+    for doc in docs:
+        if not doc.get("content", "").strip():
+            print(f"⚠️  Skipping empty document: {doc.get('title', 'Untitled')}")
+            errors += 1
+            continue
+        rows.extend(document_rows(doc))
+        ingested.append(doc)
+    if not ingested:
+        return 0, errors
+    
+    try:
+        embed_rows(rows, openai_client)
+        with document_writer(supabase) as write:
+            write(rows)
+    except Exception as e:
+        print(f"❌ Error ingesting documents: {e}")
+        return 0, errors + len(ingested)
+    
+    for doc in ingested:
+        print(f"✅ Ingested: {doc.get('title', 'Untitled')} ({doc.get('doc_type')})")
+    return len(ingested), errors
 
 
 def ingest_document(supabase: Client, openai_client: OpenAI, doc: Dict[str, Any]) -> bool:
@@ -61,43 +191,230 @@ def ingest_document(supabase: Client, openai_client: OpenAI, doc: Dict[str, Any]
     Args:
         doc: Dictionary with keys: content, doc_type, category, title (optional)
     """
-    try:
-        content = doc.get("content", "")
-        if not content.strip():
-            print(f"⚠️  Skipping empty document: {doc.get('title', 'Untitled')}")
-            return False
-        
-        embedding = generate_embedding(content, openai_client)
-        
-        data = {
-            "content": content,
-            "embedding": embedding,
-            "doc_type": doc.get("doc_type", "general"),
-            "category": doc.get("category", "general"),
-            "title": doc.get("title"),
-            "source": doc.get("source"),
-            "metadata": doc.get("metadata", {})
-        }
+    return ingest_documents(supabase, openai_client, [doc])[0] == 1
+
+
+def replace_document(supabase: Client, write, rows: List[Dict[str, Any]], digest: Optional[str] = None) -> None:
+    """
+    Update a stored document in place with re-embedded `rows` and replace its
+    chunks. The old chunks go first and the new hash is stored last, so an
+    interruption anywhere in between leaves the document out of date (and
+    re-synced next time) rather than marked current.
+    """
+    top, chunks = rows[0], rows[1:]
+    supabase.table("documents").delete().eq("parent_id", top["id"]).execute()
+    update = {column: value for column, value in top.items() if column != "id"}
+    if chunks:
+        update["content_hash"] = None
+    if update.get("embedding") is not None:
+        update["embedding"] = vector_literal(update["embedding"])
+    supabase.table("documents").update(update).eq("id", top["id"]).execute()
+    if chunks:
+        write(chunks)
+        finish_document(supabase, rows, digest)
+
+
+def sync_documents(supabase: Client, openai_client: OpenAI, docs: Iterable[Dict[str, Any]],
+                   scope: str, state: Optional[IngestState] = None) -> Dict[str, int]:
+    """
+    Incrementally ingest the complete set of documents under `scope` (a
+    source_key prefix, e.g. a folder): only new and changed documents are
+    embedded and written, and stored documents under `scope` that are no
+    longer among `docs` are deleted. `state` is checkpointed after every
+    written batch.
+    
+    A document is keyed by its `source_key` (default: scope + source or
+    title, or its content hash without either; a repeated default key gets
+    the occurrence number appended, "#2", "#3"...). It may carry a precomputed `content_hash` and a `load` callable
+    instead of its content, to be read only if it has to be written, or
+    `keep: True` to leave its stored version alone (e.g. unreadable for now).
+    
+    `docs` is consumed lazily by a staged pipeline (read -> chunk -> embed ->
+    write, see tools/ingest_pipeline.py), so reading and chunking overlap
+    with embedding requests and database writes, and only a bounded number
+    of documents is held in memory at a time.
+    
+    Returns:
+        Counts of new, changed, unchanged, removed and errors
+    """
+    if not scope:
+        raise ValueError("sync_documents needs a non-empty scope")
+    state = state or IngestState(None)
+    stats = {"new": 0, "changed": 0, "unchanged": 0, "removed": 0, "errors": 0}
+    stored = fetch_sources(supabase, scope)
+    seen = set()
+    lock = threading.Lock()
+    
+    def keyed(docs: Iterable[Dict[str, Any]]):
+        """Key documents in input order, so repeated titles resolve the same way on every run."""
+        occurrences: Dict[str, int] = {}
+        for doc in docs:
+            key = doc.get("source_key")
+            if key:
+                if key in occurrences:
+                    print(f"❌ Duplicate source key: {key}")
+                    with lock:
+                        stats["errors"] += 1
+                    continue
+                occurrences[key] = 1
+                yield doc
+                continue
+            if not doc.get("content", "").strip():
+                # Reported (and not keyed) by the read stage
+                yield doc
+                continue
+            name = doc.get("source") or doc.get("title")
+            if not name:
+                doc = {**doc, "content_hash": doc.get("content_hash") or content_hash(document_fields(doc))}
+                name = doc["content_hash"]
+            base = scope + name
+            count = occurrences[base] = occurrences.get(base, 0) + 1
+            yield {**doc, "source_key": base if count == 1 else f"{base}#{count}"}
+    
+    def unchanged(key: str, digest: str, doc_id: str, stat) -> None:
+        with lock:
+            state.record(key, digest, doc_id, stat)
+            stats["unchanged"] += 1
+    
+    def read(doc: Dict[str, Any]):
+        key = doc.get("source_key")
+        placeholder = "load" in doc
+        if doc.get("keep") or placeholder:
+            with lock:
+                seen.add(key)
+        if doc.get("keep"):
+            return ()
+        if placeholder:
+            entry = stored.get(key)
+            if sync_action(doc.get("content_hash"), entry) == "unchanged":
+                unchanged(key, doc["content_hash"], entry["id"], doc.get("stat"))
+                return ()
+            # Raising keeps the key seen: an unreadable source is not a deletion
+            doc = {**doc["load"](), "source_key": key, "stat": doc.get("stat")}
         
-        response = supabase.table("documents").insert(data).execute()
+        if not doc.get("content", "").strip():
+            print(f"⚠️  Skipping empty document: {doc.get('title', 'Untitled')}")
+            with lock:
+                seen.discard(key)
+                stats["errors"] += 1
+            return ()
+        if "content_hash" not in doc:
+            doc = {**doc, "content_hash": content_hash(document_fields(doc))}
+        with lock:
+            seen.add(key)
         
-        print(f"✅ Ingested: {doc.get('title', 'Untitled')} ({doc.get('doc_type')})")
-        return True
+        entry = stored.get(key)
+        if sync_action(doc["content_hash"], entry) == "unchanged":
+            unchanged(key, doc["content_hash"], entry["id"], doc.get("stat"))
+            return ()
+        return [(key, doc, entry["id"] if entry else None)]
+    
+    def chunk(item):
+        key, doc, doc_id = item
+        return [(key, doc, doc_id, document_rows(doc, doc_id))]
+    
+    def embed(items):
+        embed_rows([row for _, _, _, rows in items for row in rows], openai_client)
+        return items
+    
+    # One writer (and database connection) per write worker
+    writers = ExitStack()
+    local = threading.local()
+    
+    def write(items):
+        if not hasattr(local, "write"):
+            with lock:
+                local.write = writers.enter_context(document_writer(supabase))
+        local.write([row for _, _, doc_id, rows in items if doc_id is None for row in rows])
+        for _, doc, doc_id, rows in items:
+            if doc_id is None:
+                finish_document(supabase, rows, doc["content_hash"])
+            else:
+                replace_document(supabase, local.write, rows, doc["content_hash"])
         
-    except Exception as e:
-        print(f"❌ Error ingesting document: {e}")
-        return False
+        with lock:
+            for key, doc, doc_id, rows in items:
+                state.record(key, doc["content_hash"], rows[0]["id"], doc.get("stat"))
+                stats["new" if doc_id is None else "changed"] += 1
+                print(f"✅ {'Ingested' if doc_id is None else 'Updated'}: {doc.get('title') or key}")
+            state.save()
+        return ()
+    
+    pipeline = Pipeline([
+        Stage("read", read, workers=INGEST_READ_WORKERS),
+        Stage("chunk", chunk, workers=INGEST_CHUNK_WORKERS),
+        Stage("embed", embed, workers=INGEST_EMBED_WORKERS, batch_size=SYNC_BATCH_DOCUMENTS),
+        Stage("write", write, workers=INGEST_WRITE_WORKERS, batch_size=SYNC_BATCH_DOCUMENTS),
+    ])
+    with writers:
+        counters = pipeline.run(keyed(docs))
+    stats["errors"] += sum(counter["errors"] for counter in counters.values())
+    
+    removed = [key for key in stored if key not in seen]
+    removed_ids = [stored[key]["id"] for key in removed]
+    for start in range(0, len(removed_ids), SYNC_BATCH_DOCUMENTS):
+        # Chunks go with their parents (ON DELETE CASCADE)
+        supabase.table("documents").delete().in_("id", removed_ids[start:start + SYNC_BATCH_DOCUMENTS]).execute()
+    state.forget(removed)
+    stats["removed"] = len(removed_ids)
+    state.save()
+    return stats
 
 
-def ingest_contact(supabase: Client, contact: Dict[str, Any]) -> bool:
-    """Ingest a contact into the database."""
-    try:
-        required_fields = ["email"]
-        if not all(field in contact for field in required_fields):
-            print(f"⚠️  Skipping contact: missing required fields")
-            return False
-        
-        data = {
+def normalize_email(email: Any) -> Optional[str]:
+    """Lower-cased, trimmed address, or None if it is not one."""
+    if not isinstance(email, str):
+        return None
+    email = email.strip().lower()
+    return email if "@" in email.strip("@") else None
+
+
+def merge_contacts(contacts: Iterable[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int, int]:
+    """
+    Contacts keyed by normalized email, in first-seen order. Duplicates are
+    merged: later non-empty fields win and metadata dicts are combined.
+    
+    Returns:
+        (merged contacts, duplicates merged, contacts without a valid email)
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    duplicates = invalid = 0
+    for contact in contacts:
+        email = normalize_email(contact.get("email"))
+        if email is None:
+            print(f"⚠️  Skipping contact: missing or invalid email ({contact.get('name', 'unnamed')})")
+            invalid += 1
+            continue
+        current = merged.get(email)
+        if current is None:
+            merged[email] = {**contact, "email": email, "metadata": dict(contact.get("metadata") or {})}
+            continue
+        duplicates += 1
+        for field, value in contact.items():
+            if field == "metadata":
+                current["metadata"].update(value or {})
+            elif field != "email" and value not in (None, ""):
+                current[field] = value
+    return list(merged.values()), duplicates, invalid
+
+
+def ingest_contacts(supabase: Client, contacts: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Upsert contacts in bulk: addresses are normalized and duplicates merged
+    in memory, then written with multi-row upserts (on_conflict="email") of
+    BULK_BATCH_SIZE. Each batch first looks up which of its addresses
+    already exist, to tell inserts from updates. Stored addresses are
+    normalized too (the normalize_contacts_email trigger of
+    setup_supabase_complete.sql), so both match whatever the input's case.
+    
+    Returns:
+        Counts of inserted, updated, merged (duplicates) and errors
+    """
+    merged, duplicates, invalid = merge_contacts(contacts)
+    stats = {"inserted": 0, "updated": 0, "merged": duplicates, "errors": invalid}
+    
+    for batch in batches(merged, BULK_BATCH_SIZE):
+        rows = [{
             "email": contact["email"],
             "name": contact.get("name"),
             "company": contact.get("company"),
@@ -106,21 +423,39 @@ def ingest_contact(supabase: Client, contact: Dict[str, Any]) -> bool:
             "relationship_type": contact.get("relationship_type", "client"),
             "notes": contact.get("notes"),
             "metadata": contact.get("metadata", {})
-        }
-        
-        # Upsert (insert or update if exists)
-        response = supabase.table("contacts").upsert(data, on_conflict="email").execute()
-        
-        print(f"✅ Ingested contact: {contact.get('name', contact['email'])}")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Error ingesting contact: {e}")
-        return False
+        } for contact in batch]
+        emails = [row["email"] for row in rows]
+        try:
+            existing = set()
+            # Addresses go in the URL of an `in` filter, so look them up in slices
+            for start in range(0, len(emails), EMAIL_LOOKUP_SIZE):
+                response = (supabase.table("contacts").select("email")
+                            .in_("email", emails[start:start + EMAIL_LOOKUP_SIZE]).execute())
+                existing.update(row["email"] for row in response.data)
+            supabase.table("contacts").upsert(rows, on_conflict="email", returning=ReturnMethod.minimal).execute()
+        except Exception as e:
+            print(f"❌ Error ingesting contacts: {e}")
+            stats["errors"] += len(rows)
+            continue
+        stats["updated"] += len(existing)
+        stats["inserted"] += len(rows) - len(existing)
+    
+    if merged:
+        print(f"✅ Contacts: {stats['inserted']} inserted, {stats['updated']} updated, "
+              f"{duplicates} duplicates merged")
+    return stats
+
+
+def ingest_contact(supabase: Client, contact: Dict[str, Any]) -> bool:
+    """Ingest a contact into the database."""
+    return ingest_contacts(supabase, [contact])["errors"] == 0
 
 
-def ingest_proposal_template(supabase: Client, proposal: Dict[str, Any]) -> bool:
-    """Ingest a proposal template."""
+def ingest_proposal_template(supabase: Client, proposal: Dict[str, Any], scope: Optional[str] = None) -> bool:
+    """
+    Ingest a proposal template. With a `scope` (e.g. the import file) it is
+    keyed by scope + template name and upserted, so re-imports update it.
+    """
     try:
         required_fields = ["title", "content"]
         if not all(field in proposal for field in required_fields):
@@ -135,7 +470,11 @@ def ingest_proposal_template(supabase: Client, proposal: Dict[str, Any]) -> bool
             "metadata": proposal.get("metadata", {})
         }
         
-        response = supabase.table("proposals").insert(data).execute()
+        if scope:
+            data["source_key"] = scope + data["template_name"]
+            supabase.table("proposals").upsert(data, on_conflict="source_key").execute()
+        else:
+            supabase.table("proposals").insert(data).execute()
         
         print(f"✅ Ingested proposal template: {proposal['title']}")
         return True
@@ -145,45 +484,122 @@ def ingest_proposal_template(supabase: Client, proposal: Dict[str, Any]) -> bool
         return False
 
 
-def ingest_faq(supabase: Client, faq: Dict[str, Any]) -> bool:
-    """Ingest an FAQ."""
-    try:
-        required_fields = ["question", "answer"]
-        if not all(field in faq for field in required_fields):
+def load_faq_categories(supabase: Client) -> Dict[str, str]:
+    """All FAQ categories as name -> id, read once per import."""
+    categories: Dict[str, str] = {}
+    offset = 0
+    while True:
+        page = (supabase.table("faq_categories").select("id, name").order("id")
+                .range(offset, offset + PAGE_SIZE - 1).execute().data)
+        categories.update({row["name"]: row["id"] for row in page})
+        offset += len(page)
+        if len(page) < PAGE_SIZE:
+            return categories
+
+
+def ensure_faq_categories(supabase: Client, names: Iterable[str], categories: Dict[str, str]) -> None:
+    """Create the categories missing from `categories` in one upsert and add their ids."""
+    missing = sorted({name for name in names if name not in categories})
+    if not missing:
+        return
+    # on_conflict also covers categories created since the map was loaded
+    response = supabase.table("faq_categories").upsert(
+        [{"name": name} for name in missing], on_conflict="name"
+    ).execute()
+    categories.update({row["name"]: row["id"] for row in response.data})
+
+
+def ingest_faqs(supabase: Client, openai_client: OpenAI, faqs: List[Dict[str, Any]],
+                categories: Optional[Dict[str, str]] = None, scope: Optional[str] = None) -> Tuple[int, int]:
+    """
+    Ingest FAQs in bulk: categories come from a name -> id map (loaded if not
+    given, updated with any new ones), questions are embedded in batches and
+    rows are written with multi-row inserts of BULK_BATCH_SIZE.
+    
+    With a `scope` (e.g. the import file) each FAQ is keyed by scope +
+    question and upserted, so re-imports update rows instead of adding
+    copies; a repeated question keeps its last answer.
+    
+    Returns:
+        (FAQs ingested, errors)
+    """
+    valid, errors = [], 0
+    for faq in faqs:
+        if not all(field in faq for field in ("question", "answer")):
             print(f"⚠️  Skipping FAQ: missing required fields")
-            return False
-        
-        # Get or create category
-        category_name = faq.get("category", "General")
-        category_response = supabase.table("faq_categories").select("id").eq("name", category_name).execute()
-        
-        if not category_response.data:
-            # Create category
-            cat_response = supabase.table("faq_categories").insert({"name": category_name}).execute()
-            category_id = cat_response.data[0]["id"]
-        else:
-            category_id = category_response.data[0]["id"]
-        
-        data = {
-            "category_id": category_id,
+            errors += 1
+            continue
+        valid.append(faq)
+    if scope:
+        # One upsert must not touch a row twice
+        valid = list({faq["question"]: faq for faq in valid}.values())
+    if not valid:
+        return 0, errors
+    
+    try:
+        if categories is None:
+            categories = load_faq_categories(supabase)
+        ensure_faq_categories(supabase, (faq.get("category") or "General" for faq in valid), categories)
+    except Exception as e:
+        print(f"❌ Error ingesting FAQ categories: {e}")
+        return 0, errors + len(valid)
+    
+    questions = [faq["question"] for faq in valid]
+    print(f"🧮 Embedding {len(questions)} FAQ questions in batches...")
+    try:
+        embeddings = generate_embeddings(questions, openai_client)
+    except Exception as e:
+        # One bad question should not fail the batch; finished ones are cached
+        print(f"⚠️  Batch embedding failed, falling back to per-question requests: {e}")
+        embeddings = []
+        for question in questions:
+            try:
+                embeddings.append(generate_embedding(question, openai_client))
+            except Exception as e:
+                print(f"❌ Error ingesting FAQ: {question[:50]}: {e}")
+                embeddings.append(None)
+    
+    rows = []
+    for faq, embedding in zip(valid, embeddings):
+        if embedding is None:
+            errors += 1
+            continue
+        rows.append({
+            "category_id": categories[faq.get("category") or "General"],
             "question": faq["question"],
             "answer": faq["answer"],
-            "keywords": faq.get("keywords", [])
-        }
-        
-        response = supabase.table("faqs").insert(data).execute()
-        
-        print(f"✅ Ingested FAQ: {faq['question'][:50]}...")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Error ingesting FAQ: {e}")
-        return False
+            "keywords": faq.get("keywords", []),
+            # Lets rag_cli's FAQ matcher load without embedding every question
+            "question_embedding": vector_literal(embedding)
+        })
+        if scope:
+            rows[-1]["source_key"] = scope + faq["question"]
+    
+    ingested = 0
+    for batch in batches(rows, BULK_BATCH_SIZE):
+        try:
+            if scope:
+                supabase.table("faqs").upsert(batch, on_conflict="source_key",
+                                              returning=ReturnMethod.minimal).execute()
+                ingested += len(batch)
+            else:
+                ingested += rest_insert(supabase, "faqs", batch)
+        except Exception as e:
+            print(f"❌ Error ingesting FAQs: {e}")
+            errors += len(batch)
+    if ingested:
+        print(f"✅ Ingested {ingested} FAQs")
+    return ingested, errors
+
+
+def ingest_faq(supabase: Client, openai_client: OpenAI, faq: Dict[str, Any]) -> bool:
+    """Ingest an FAQ."""
+    return ingest_faqs(supabase, openai_client, [faq])[0] == 1
 
 
 def ingest_from_json(file_path: Path) -> tuple:
     """
-    Ingest data from a structured JSON file.
+    Ingest data from a structured JSON or JSON Lines file.
     
     Expected format:
     {
@@ -192,41 +608,82 @@ def ingest_from_json(file_path: Path) -> tuple:
         "proposals": [...],
         "faqs": [...]
     }
+    
+    or, for .jsonl / .ndjson, one record per line with its section in
+    `type`: {"type": "contact", "email": ...}
+    
+    Records are ingested as they are parsed (see tools/json_stream.py), so
+    the file never has to fit in memory.
     """
     supabase, openai_client = get_clients()
-    
-    with open(file_path, 'r') as f:
-        data = json.load(f)
+    # Source keys of the file's records start with this
+    scope = f"{file_path.resolve()}#"
     
     stats = {"documents": 0, "contacts": 0, "proposals": 0, "faqs": 0, "errors": 0}
+    faqs: List[Dict[str, Any]] = []
+    faq_categories: Optional[Dict[str, str]] = None
+    contacts: List[Dict[str, Any]] = []
     
-    # Ingest documents
-    for doc in data.get("documents", []):
-        if ingest_document(supabase, openai_client, doc):
-            stats["documents"] += 1
-        else:
-            stats["errors"] += 1
+    def flush_contacts():
+        # Duplicates are merged within a batch; one in a later batch is upserted again
+        synced = ingest_contacts(supabase, contacts)
+        stats["contacts"] += synced["inserted"] + synced["updated"]
+        stats["errors"] += synced["errors"]
+        contacts.clear()
     
-    # Ingest contacts
-    for contact in data.get("contacts", []):
-        if ingest_contact(supabase, contact):
-            stats["contacts"] += 1
-        else:
-            stats["errors"] += 1
+    def flush_faqs():
+        nonlocal faq_categories
+        if not faqs:
+            return
+        try:
+            if faq_categories is None:
+                # Loaded once per import, then kept up to date by ingest_faqs
+                faq_categories = load_faq_categories(supabase)
+        except Exception as e:
+            print(f"❌ Error loading FAQ categories: {e}")
+            stats["errors"] += len(faqs)
+            faqs.clear()
+            return
+        ingested, errors = ingest_faqs(supabase, openai_client, faqs, faq_categories, scope)
+        stats["faqs"] += ingested
+        stats["errors"] += errors
+        faqs.clear()
     
-    # Ingest proposals
-    for proposal in data.get("proposals", []):
-        if ingest_proposal_template(supabase, proposal):
-            stats["proposals"] += 1
-        else:
-            stats["errors"] += 1
+    def documents():
+        """Route records as they are parsed; documents go on to the sync pipeline."""
+        for section, record in iter_records(file_path):
+            if section == "documents":
+                yield record
+            elif section == "contacts":
+                contacts.append(record)
+                if len(contacts) >= BULK_BATCH_SIZE:
+                    flush_contacts()
+            elif section == "proposals":
+                if ingest_proposal_template(supabase, record, scope):
+                    stats["proposals"] += 1
+                else:
+                    stats["errors"] += 1
+            elif section == "faqs":
+                faqs.append(record)
+                if len(faqs) >= BULK_BATCH_SIZE:
+                    flush_faqs()
+            else:
+                print(f"⚠️  Skipping record of unknown type: {str(record)[:50]}")
+                stats["errors"] += 1
+        flush_contacts()
+        flush_faqs()
     
-    # Ingest FAQs
-    for faq in data.get("faqs", []):
-        if ingest_faq(supabase, faq):
-            stats["faqs"] += 1
-        else:
-            stats["errors"] += 1
+    # Ingest documents (only new and changed ones; records dropped from the file are deleted)
+    try:
+        synced = sync_documents(supabase, openai_client, documents(), scope,
+                                IngestState(state_path(scope)))
+    except (OSError, ValueError) as e:
+        # An unreadable or malformed file stops the import before anything is deleted
+        print(f"❌ Error reading {file_path}: {e}")
+        stats["errors"] += 1
+        return stats
+    stats["documents"] += synced["new"] + synced["changed"]
+    stats["errors"] += synced["errors"]
     
     return stats
 
@@ -273,11 +730,9 @@ def ingest_sample_data() -> tuple:
         }
     ]
     
-    for doc in documents:
-        if ingest_document(supabase, openai_client, doc):
-            stats["documents"] += 1
-        else:
-            stats["errors"] += 1
+    synced = sync_documents(supabase, openai_client, documents, "sample#")
+    stats["documents"] += synced["new"] + synced["changed"]
+    stats["errors"] += synced["errors"]
     
     # Sample contacts
     contacts = [
@@ -307,11 +762,9 @@ def ingest_sample_data() -> tuple:
         }
     ]
     
-    for contact in contacts:
-        if ingest_contact(supabase, contact):
-            stats["contacts"] += 1
-        else:
-            stats["errors"] += 1
+    synced = ingest_contacts(supabase, contacts)
+    stats["contacts"] += synced["inserted"] + synced["updated"]
+    stats["errors"] += synced["errors"]
     
     # Sample proposal templates
     proposals = [
@@ -328,7 +781,7 @@ def ingest_sample_data() -> tuple:
     ]
     
     for proposal in proposals:
-        if ingest_proposal_template(supabase, proposal):
+        if ingest_proposal_template(supabase, proposal, "sample#"):
             stats["proposals"] += 1
         else:
             stats["errors"] += 1
@@ -355,18 +808,16 @@ def ingest_sample_data() -> tuple:
         }
     ]
     
-    for faq in faqs:
-        if ingest_faq(supabase, faq):
-            stats["faqs"] += 1
-        else:
-            stats["errors"] += 1
+    ingested, errors = ingest_faqs(supabase, openai_client, faqs, scope="sample#")
+    stats["faqs"] += ingested
+    stats["errors"] += errors
     
     return stats
 
 
 def main():
     parser = argparse.ArgumentParser(description="Ingest business data into Supabase")
-    parser.add_argument("--json", help="Path to JSON file with structured data")
+    parser.add_argument("--json", help="Path to JSON or JSON Lines file with structured data")
     parser.add_argument("--sample", action="store_true", help="Ingest sample data")
     parser.add_argument("--dir", help="Directory containing business data files")
     
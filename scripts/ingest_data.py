@@ -2,81 +2,64 @@
 """
 Data Ingestion Script for RAG Knowledge Base
 
-This script ingests business data (FAQs, templates, policies) into the Supabase
-knowledge base using the rag_cli.py tool.
+This script syncs business data files (FAQs, templates, policies) into the
+Supabase knowledge base with sync_documents from ingest_business_data.py, in
+one process with batched embeddings and writes.
+
+Re-running --data-dir is incremental: unchanged files cost nothing, changed
+files are re-embedded in place and deleted files are removed (see
+tools/ingest_state.py).
 
 Usage:
     python scripts/ingest_data.py --data-dir /path/to/business/data
+    python scripts/ingest_data.py --sample    # demo documents via tools/rag_cli.py add
 """
 import argparse
 import os
 import json
 import subprocess
+import sys
 from pathlib import Path
 from typing import List, Dict
 
+# Shared tool libraries (sync state); scripts/ is on the path for ingest_business_data
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tools')))
 
-def ingest_file(file_path: Path, metadata: Dict = None) -> bool:
-    """
-    Ingest a single file into the knowledge base.
-    
-    Args:
-        file_path: Path to the file to ingest
-        metadata: Optional metadata dictionary
-    
-    Returns:
-        True if successful, False otherwise
-    """
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        if not content.strip():
-            print(f"⚠️  Skipping empty file: {file_path}")
-            return False
-        
-        # Prepare metadata
-        file_metadata = metadata or {}
-        file_metadata.update({
+from ingest_business_data import get_clients, sync_documents
+from ingest_state import IngestState, state_path
+
+
+def file_document(file_path: Path, data_dir: Path) -> Dict:
+    """The document stored for a data file (category from its folder)."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    category = file_path.parent.name if file_path.parent != data_dir else "general"
+    return {
+        "content": content,
+        "category": category,
+        "title": file_path.name,
+        "source": str(file_path),
+        "metadata": {
+            "category": category,
             "filename": file_path.name,
             "file_type": file_path.suffix,
             "source": str(file_path)
-        })
-        
-        metadata_json = json.dumps(file_metadata)
-        
-        # Call rag_cli.py to add the document
-        result = subprocess.run(
-            [
-                "python", "tools/rag_cli.py", "add",
-                "--text", content,
-                "--metadata", metadata_json
-            ],
-            capture_output=True,
-            text=True,
-            cwd="/home/ubuntu/voice-email-agent"
-        )
-        
-        if result.returncode == 0:
-            data = json.loads(result.stdout)
-            if data.get("status") == "success":
-                print(f"✅ Ingested: {file_path.name} (ID: {data.get('id')})")
-                return True
-            else:
-                print(f"❌ Failed to ingest {file_path.name}: {data.get('message')}")
-                return False
-        else:
-            print(f"❌ Error ingesting {file_path.name}: {result.stderr}")
-            return False
-            
-    except Exception as e:
-        print(f"❌ Exception ingesting {file_path.name}: {e}")
-        return False
+        }
+    }
 
 
 def ingest_directory(data_dir: Path, recursive: bool = True) -> tuple:
     """
-    Ingest all files from a directory.
+    Sync all files from a directory into the knowledge base.
+    
+    Only new and changed files are embedded and written (changed ones in
+    place), documents of files that disappeared are deleted, and progress is
+    checkpointed so an interrupted run resumes. Files whose size and mtime
+    match the last run are not read at all.
+    
+    Files stream through reader, chunker, embedder and writer stages running
+    concurrently (see tools/ingest_pipeline.py), so memory stays flat however
+    large the directory is.
     
     Args:
         data_dir: Path to the directory containing data files
@@ -85,32 +68,36 @@ def ingest_directory(data_dir: Path, recursive: bool = True) -> tuple:
     Returns:
         Tuple of (success_count, failure_count)
     """
-    success_count = 0
-    failure_count = 0
+    data_dir = data_dir.resolve()
+    scope = f"{data_dir}{os.sep}"
+    state = IngestState(state_path(scope))
     
     # Supported file extensions
     supported_extensions = {'.txt', '.md', '.json', '.csv'}
     
-    # Get all files
-    if recursive:
-        files = [f for f in data_dir.rglob('*') if f.is_file() and f.suffix in supported_extensions]
-    else:
-        files = [f for f in data_dir.glob('*') if f.is_file() and f.suffix in supported_extensions]
-    
-    print(f"\n📂 Found {len(files)} files to ingest from {data_dir}\n")
-    
-    for file_path in files:
-        # Determine metadata based on directory structure
-        metadata = {
-            "category": file_path.parent.name if file_path.parent != data_dir else "general"
-        }
-        
-        if ingest_file(file_path, metadata):
-            success_count += 1
-        else:
-            failure_count += 1
-    
-    return success_count, failure_count
+    def documents():
+        """Placeholders for all files; the pipeline's reader loads the ones it needs."""
+        files = data_dir.rglob('*') if recursive else data_dir.glob('*')
+        for file_path in files:
+            if not file_path.is_file() or file_path.suffix not in supported_extensions:
+                continue
+            key = str(file_path)
+            stat = file_path.stat()
+            doc = {"source_key": key, "stat": stat, "title": file_path.name,
+                   "load": lambda file_path=file_path: file_document(file_path, data_dir)}
+            known_hash = state.file_unchanged(key, stat)
+            if known_hash:
+                doc["content_hash"] = known_hash
+            yield doc
+    
+    print(f"\n📂 Syncing files from {data_dir}\n")
+    
+    supabase, openai_client = get_clients()
+    stats = sync_documents(supabase, openai_client, documents(), scope, state)
+    print(f"\n📊 {stats['new']} added, {stats['changed']} updated, {stats['unchanged']} unchanged, "
+          f"{stats['removed']} removed")
+    
+    return stats["new"] + stats["changed"], stats["errors"]
 
 
 def ingest_sample_data():
@@ -1,12 +1,19 @@
 #!/usr/bin/env python3
 """
 Fixed document ingestion that properly handles vector embeddings.
-Uses direct SQL execution instead of REST API for vector columns.
+Uses direct SQL execution (bulk COPY) instead of REST API for vector columns.
 """
 import os
+import sys
 import psycopg2
 from openai import OpenAI
 
+# Shared tool libraries (batched embeddings, bulk writes)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tools')))
+
+from batch_embedder import BatchEmbedder
+from bulk_writer import CopyWriter, rest_insert, with_ids
+
 # Sample documents
 SAMPLE_DOCUMENTS = [
     {
@@ -102,43 +109,28 @@ def ingest_documents_with_sql(password):
     
     print("\n📡 Connecting to database...")
     conn = psycopg2.connect(conn_string)
-    conn.autocommit = True
-    cursor = conn.cursor()
     
     print("✅ Connected\n")
     
     # Initialize OpenAI
     openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
     
+    print("🧮 Generating embeddings...")
+    embeddings = BatchEmbedder(openai_client).embed([doc["content"] for doc in SAMPLE_DOCUMENTS])
+    
     print("📝 Ingesting documents with embeddings...")
     
-    for doc in SAMPLE_DOCUMENTS:
-        try:
-            # Generate embedding
-            response = openai_client.embeddings.create(
-                model="text-embedding-3-small",
-                input=doc["content"]
-            )
-            embedding = response.data[0].embedding
-            
-            # Insert with SQL
-            cursor.execute("""
-                INSERT INTO documents (content, embedding, doc_type, category, title)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (
-                doc["content"],
-                embedding,
-                doc["doc_type"],
-                doc["category"],
-                doc["title"]
-            ))
-            
-            print(f"✅ Ingested: {doc['title']}")
-            
-        except Exception as e:
-            print(f"❌ Error ingesting {doc['title']}: {e}")
+    # One COPY for all rows (binary pgvector encoding) instead of an INSERT per row
+    rows = with_ids(
+        {**doc, "embedding": embedding}
+        for doc, embedding in zip(SAMPLE_DOCUMENTS, embeddings)
+    )
+    try:
+        written = CopyWriter(conn).write(rows)
+        print(f"✅ Ingested {written} documents")
+    except Exception as e:
+        print(f"❌ Error ingesting documents: {e}")
     
-    cursor.close()
     conn.close()
     
     print("\n✅ Document ingestion complete!")
@@ -156,19 +148,11 @@ def ingest_documents_without_embeddings():
     print("\n📝 Ingesting documents (without embeddings)...")
     print("⚠️  Note: RAG search won't work without embeddings")
     
-    for doc in SAMPLE_DOCUMENTS:
-        try:
-            supabase.table("documents").insert({
-                "content": doc["content"],
-                "doc_type": doc["doc_type"],
-                "category": doc["category"],
-                "title": doc["title"]
-            }).execute()
-            
-            print(f"✅ Ingested: {doc['title']}")
-            
-        except Exception as e:
-            print(f"❌ Error: {e}")
+    try:
+        written = rest_insert(supabase, "documents", SAMPLE_DOCUMENTS)
+        print(f"✅ Ingested {written} documents")
+    except Exception as e:
+        print(f"❌ Error: {e}")
     
     print("\n✅ Documents ingested (without embeddings)")
     print("⚠️  To enable RAG search, you'll need to add embeddings later")
@@ -10,10 +10,17 @@ CREATE TABLE IF NOT EXISTS documents (
     content TEXT NOT NULL,
     metadata JSONB DEFAULT '{}',
     embedding vector(1536),  -- OpenAI text-embedding-3-small dimension
+    parent_id UUID REFERENCES documents(id) ON DELETE CASCADE,  -- Set on chunks of a longer document
+    chunk_index INTEGER,  -- Position of the chunk within its parent
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- For databases created before chunking
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS parent_id UUID REFERENCES documents(id) ON DELETE CASCADE;
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS chunk_index INTEGER;
+CREATE INDEX IF NOT EXISTS documents_parent_id_idx ON documents(parent_id);
+
 -- Create an index on the embedding column for fast similarity search
 CREATE INDEX IF NOT EXISTS documents_embedding_idx 
 ON documents USING ivfflat (embedding vector_cosine_ops)
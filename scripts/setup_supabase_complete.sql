@@ -18,10 +18,20 @@ CREATE TABLE IF NOT EXISTS documents (
     category TEXT,  -- e.g., 'sales', 'support', 'refunds', 'onboarding'
     title TEXT,
     source TEXT,  -- Original file path or URL
+    parent_id UUID REFERENCES documents(id) ON DELETE CASCADE,  -- Set on chunks of a longer document
+    chunk_index INTEGER,  -- Position of the chunk within its parent
+    source_key TEXT,  -- Stable identity of the source (file path, JSON record) for re-runs
+    content_hash TEXT,  -- SHA-256 of the stored fields, to skip unchanged sources
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- For databases created before chunking and incremental ingestion
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS parent_id UUID REFERENCES documents(id) ON DELETE CASCADE;
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS chunk_index INTEGER;
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS source_key TEXT;
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
 -- Index for fast vector similarity search
 CREATE INDEX IF NOT EXISTS documents_embedding_idx 
 ON documents USING ivfflat (embedding vector_cosine_ops)
@@ -30,6 +40,8 @@ WITH (lists = 100);
 -- Indexes for filtering
 CREATE INDEX IF NOT EXISTS documents_doc_type_idx ON documents(doc_type);
 CREATE INDEX IF NOT EXISTS documents_category_idx ON documents(category);
+CREATE INDEX IF NOT EXISTS documents_parent_id_idx ON documents(parent_id);
+CREATE INDEX IF NOT EXISTS documents_source_key_idx ON documents(source_key) WHERE parent_id IS NULL;
 
 -- Vector similarity search function
 CREATE OR REPLACE FUNCTION match_documents(
@@ -94,6 +106,50 @@ CREATE INDEX IF NOT EXISTS contacts_email_idx ON contacts(email);
 CREATE INDEX IF NOT EXISTS contacts_company_idx ON contacts(company);
 CREATE INDEX IF NOT EXISTS contacts_relationship_type_idx ON contacts(relationship_type);
 
+-- Contact addresses are stored lower-cased and trimmed, which makes the
+-- UNIQUE constraint on email case-insensitive. The trigger normalizes every
+-- write (importer, app, dashboard), so `ON CONFLICT (email)` also matches
+-- addresses that differ only in case.
+CREATE OR REPLACE FUNCTION normalize_contact_email()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.email = lower(btrim(NEW.email));
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS normalize_contacts_email ON contacts;
+CREATE TRIGGER normalize_contacts_email BEFORE INSERT OR UPDATE OF email ON contacts
+FOR EACH ROW EXECUTE FUNCTION normalize_contact_email();
+
+-- For databases created before: merge rows differing only in case into the
+-- most recently updated one (repointing their proposals), then normalize the
+-- rest. Earlier versions of this script rejected non-normalized addresses
+-- with a CHECK constraint; the trigger replaces it.
+ALTER TABLE contacts DROP CONSTRAINT IF EXISTS contacts_email_normalized;
+
+DO $$
+BEGIN
+    IF to_regclass('proposals') IS NOT NULL THEN
+        WITH ranked AS (
+            SELECT id, first_value(id) OVER (PARTITION BY lower(btrim(email))
+                                             ORDER BY updated_at DESC NULLS LAST, id) AS keep_id
+            FROM contacts
+        )
+        UPDATE proposals SET contact_id = ranked.keep_id
+        FROM ranked WHERE proposals.contact_id = ranked.id AND ranked.id <> ranked.keep_id;
+    END IF;
+END $$;
+
+WITH ranked AS (
+    SELECT id, first_value(id) OVER (PARTITION BY lower(btrim(email))
+                                     ORDER BY updated_at DESC NULLS LAST, id) AS keep_id
+    FROM contacts
+)
+DELETE FROM contacts USING ranked WHERE contacts.id = ranked.id AND ranked.id <> ranked.keep_id;
+
+UPDATE contacts SET email = lower(btrim(email)) WHERE email <> lower(btrim(email));
+
 -- ============================================================================
 -- 3. PROPOSALS - Proposal templates and sent proposals
 -- ============================================================================
@@ -109,11 +165,16 @@ CREATE TABLE IF NOT EXISTS proposals (
     sent_date TIMESTAMP WITH TIME ZONE,
     value DECIMAL(10, 2),  -- Proposal value
     metadata JSONB DEFAULT '{}',
+    source_key TEXT,  -- Import identity of a template (file + title), for re-runs
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- For databases created before incremental ingestion
+ALTER TABLE proposals ADD COLUMN IF NOT EXISTS source_key TEXT;
+
 CREATE INDEX IF NOT EXISTS proposals_contact_id_idx ON proposals(contact_id);
+CREATE UNIQUE INDEX IF NOT EXISTS proposals_source_key_key ON proposals(source_key);
 CREATE INDEX IF NOT EXISTS proposals_is_template_idx ON proposals(is_template);
 CREATE INDEX IF NOT EXISTS proposals_status_idx ON proposals(status);
 
@@ -200,15 +261,34 @@ CREATE TABLE IF NOT EXISTS faqs (
     question TEXT NOT NULL,
     answer TEXT NOT NULL,
     keywords TEXT[],
+    question_embedding vector(1536),  -- Precomputed for the FAQ fast path
+    source_key TEXT,  -- Import identity (file + question), for re-runs
     usage_count INTEGER DEFAULT 0,  -- Track how often this FAQ is retrieved
     last_used TIMESTAMP WITH TIME ZONE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- For databases created before the columns existed
+ALTER TABLE faqs ADD COLUMN IF NOT EXISTS question_embedding vector(1536);
+ALTER TABLE faqs ADD COLUMN IF NOT EXISTS source_key TEXT;
+
 CREATE INDEX IF NOT EXISTS faqs_category_id_idx ON faqs(category_id);
+CREATE UNIQUE INDEX IF NOT EXISTS faqs_source_key_key ON faqs(source_key);
 CREATE INDEX IF NOT EXISTS faqs_keywords_idx ON faqs USING GIN(keywords);
 
+-- Batched usage tracking: usage is a JSON array of {id, count, last_used}
+CREATE OR REPLACE FUNCTION record_faq_usage(usage JSONB)
+RETURNS void
+LANGUAGE sql
+AS $$
+    UPDATE faqs
+    SET usage_count = COALESCE(faqs.usage_count, 0) + u.count,
+        last_used = GREATEST(faqs.last_used, u.last_used)
+    FROM jsonb_to_recordset(usage) AS u(id UUID, count INTEGER, last_used TIMESTAMP WITH TIME ZONE)
+    WHERE faqs.id = u.id;
+$$;
+
 -- ============================================================================
 -- TRIGGERS - Auto-update timestamps
 -- ============================================================================
@@ -33,6 +33,9 @@ class Settings(BaseSettings):
     environment: str = Field("development", env="ENVIRONMENT")
     log_level: str = Field("INFO", env="LOG_LEVEL")
     
+    # Speech synthesis
+    tts_max_concurrency: int = Field(4, env="TTS_MAX_CONCURRENCY")
+    
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -0,0 +1,214 @@
+"""
+Local Intent Classifier - kNN over labelled example utterances
+
+`classify_intent` used to send every turn to GPT-4 just to pick one of five
+labels. This classifier handles the common phrasings locally in well under a
+millisecond: each example utterance is turned into a sparse TF-IDF vector of
+word, word-bigram and character-trigram features once, and a request is
+labelled by a similarity-weighted vote of its nearest examples.
+
+`classify()` returns the intent together with a confidence (the vote margin
+between the two best intents, scaled by how close the nearest example is).
+That score is not a probability, so `is_confident()` decides whether to trust
+it with thresholds calibrated on held-out utterances
+(scripts/eval_intent_classifier.py --calibrate), a stricter one for intents
+that change the mailbox. Negated requests ("don't archive anything") are never
+answered locally: the examples are all affirmative, so a negation looks just
+like the command it cancels. Neither are questions labelled as an inbox
+action ("what does the important label mean?").
+"""
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# Labelled seed utterances (the workflow test cases plus common variants)
+INTENT_EXAMPLES: Dict[str, List[str]] = {
+    "DRAFT_EMAIL": [
+        "Draft a proposal email for Acme Corp about our new product",
+        "Draft a proposal email for Acme Corp about our consulting services",
+        "Write an email to John about the meeting tomorrow",
+        "Compose a follow up email to the client",
+        "Send an email to Sarah saying I'll be late",
+        "Email the team about the launch date",
+        "Reply to Mike and tell him the invoice is attached",
+        "Write a thank you note to our new customer",
+        "Draft a reply declining the invitation",
+        "Can you write a message to the vendor asking for a quote",
+        "Send a quick note to Lisa confirming Friday",
+        "Compose an introduction email to the investors",
+        "Reply to Anna's email and say yes",
+        "Respond to the recruiter and thank them",
+    ],
+    "RETRIEVE_INFO": [
+        "What is our refund policy?",
+        "How much does the premium plan cost?",
+        "What are our business hours?",
+        "Tell me about our consulting services",
+        "Look up the pricing for enterprise customers",
+        "What does our warranty cover?",
+        "Search the knowledge base for onboarding steps",
+        "How do I reset a customer's password?",
+        "What's the phone number for Acme Corp?",
+        "Find information about our shipping options",
+        "Who is the contact person at Globex?",
+        "Explain our cancellation terms",
+        "What features come with the pro tier?",
+        "What is included in our support package?",
+    ],
+    "MANAGE_INBOX": [
+        "Label the last email as important and archive it",
+        "Label the last email as Important",
+        "Archive this email",
+        "Move the newsletter to the archive",
+        "Mark the email from Sarah as important",
+        "Tag that message as follow up",
+        "Archive all the promotional emails",
+        "Add the invoices label to the last message",
+        "Organize my inbox",
+        "File the last email under clients",
+        "Clean up my inbox and archive old messages",
+        "Put a label on the email from the bank",
+    ],
+    "READ_EMAIL": [
+        "Read me the subject lines of my unread emails",
+        "Read me my unread emails",
+        "What new emails do I have?",
+        "Do I have any unread messages?",
+        "Read the latest email from John",
+        "Check my inbox",
+        "What did Sarah send me today?",
+        "Go through my new mail",
+        "Any new emails this morning?",
+        "Read my most recent message",
+        "Tell me who emailed me today",
+        "Listen to my latest emails",
+        "What's waiting in my inbox?",
+    ],
+    "UNKNOWN": [
+        "Sing me a song",
+        "Tell me a joke",
+        "What's the weather like tomorrow?",
+        "Play some music",
+        "Set a timer for ten minutes",
+        "Who won the game last night?",
+        "Turn off the lights",
+        "Book a flight to Paris",
+        "Hello",
+        "Hi there",
+        "Hey",
+        "Good afternoon",
+        "Are you there?",
+        "Thanks, that's all",
+        "Remind me about the dentist appointment",
+        "What's the date today?",
+        "How are you doing?",
+    ],
+}
+
+
+# Intents that act on the mailbox; a wrong local answer here is not harmless
+ACTION_INTENTS = {"MANAGE_INBOX"}
+
+_NEGATION = re.compile(r"^\s*no\b|\b(?:don'?t|do not|never|stop|cancel|hold off|never ?mind)\b", re.IGNORECASE)
+_QUESTION = re.compile(
+    r"\?\s*$|^\s*(?:what|whats|what's|why|how|when|where|who|which|is|are|does|do|can|should)\b",
+    re.IGNORECASE,
+)
+
+
+def is_negated(text: str) -> bool:
+    return bool(_NEGATION.search(text))
+
+
+def is_question(text: str) -> bool:
+    return bool(_QUESTION.search(text))
+
+
+def is_confident(text: str, intent: str, confidence: float,
+                 threshold: float, action_threshold: float) -> bool:
+    """Whether a local classification of `text` can be used without the LLM."""
+    if is_negated(text):
+        return False
+    if intent in ACTION_INTENTS:
+        return confidence >= action_threshold and not is_question(text)
+    return confidence >= threshold
+
+
+def _features(text: str) -> Counter:
+    """Word, word-bigram and character-trigram counts of a normalized text."""
+    words = re.findall(r"[a-z0-9]+", text.lower().replace("'", ""))
+    features = Counter(words)
+    features.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    for word in words:
+        padded = f"#{word}#"
+        features.update(f"~{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return features
+
+
+def _normalize(vector: Dict[str, float]) -> Dict[str, float]:
+    norm = math.sqrt(sum(w * w for w in vector.values()))
+    return {f: w / norm for f, w in vector.items()} if norm else {}
+
+
+class IntentClassifier:
+    """Similarity-weighted kNN over TF-IDF vectors of example utterances."""
+
+    def __init__(self, examples: Dict[str, Iterable[str]], k: int = 5, min_similarity: float = 0.4):
+        self.k = k
+        self.min_similarity = min_similarity
+        labelled = [(intent, text) for intent, texts in examples.items() for text in texts]
+        counts = [_features(text) for _, text in labelled]
+
+        document_frequency = Counter(f for c in counts for f in c)
+        n = len(counts)
+        self.idf = {f: math.log((1 + n) / (1 + df)) + 1.0 for f, df in document_frequency.items()}
+
+        self.vectors: List[Tuple[str, Dict[str, float]]] = [
+            (intent, self._vectorize(c)) for (intent, _), c in zip(labelled, counts)
+        ]
+
+    def _vectorize(self, counts: Counter) -> Dict[str, float]:
+        # Features never seen in the examples cannot match anything; skip them
+        return _normalize({f: (1 + math.log(tf)) * self.idf[f] for f, tf in counts.items() if f in self.idf})
+
+    def neighbours(self, text: str) -> List[Tuple[float, str]]:
+        """The k most similar examples as (cosine similarity, intent)."""
+        query = self._vectorize(_features(text))
+        similarities = []
+        for intent, vector in self.vectors:
+            if len(query) > len(vector):
+                sim = sum(w * query.get(f, 0.0) for f, w in vector.items())
+            else:
+                sim = sum(w * vector.get(f, 0.0) for f, w in query.items())
+            similarities.append((sim, intent))
+        return sorted(similarities, reverse=True)[:self.k]
+
+    def classify(self, text: str) -> Tuple[str, float]:
+        """Return (intent, confidence in [0, 1])."""
+        neighbours = self.neighbours(text)
+        if not neighbours or neighbours[0][0] <= 0:
+            return "UNKNOWN", 0.0
+
+        votes: Dict[str, float] = defaultdict(float)
+        for sim, intent in neighbours:
+            votes[intent] += sim
+        ranked = sorted(votes.values(), reverse=True)
+        best_intent = max(votes, key=votes.get)
+        runner_up = ranked[1] if len(ranked) > 1 else 0.0
+
+        margin = (ranked[0] - runner_up) / ranked[0]
+        closeness = min(1.0, neighbours[0][0] / self.min_similarity)
+        return best_intent, round(margin * closeness, 4)
+
+
+_classifier: Optional[IntentClassifier] = None
+
+
+def get_classifier() -> IntentClassifier:
+    """The process-wide classifier over INTENT_EXAMPLES, built on first use."""
+    global _classifier
+    if _classifier is None:
+        _classifier = IntentClassifier(INTENT_EXAMPLES)
+    return _classifier
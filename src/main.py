@@ -5,16 +5,20 @@ This module implements the API entry point with streaming speech-to-speech suppo
 """
 import os
 import json
+import time
 import asyncio
-import subprocess
+import contextlib
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import sentry_sdk
 from sentry_sdk.integrations.fastapi import FastApiIntegration
 
 from .config import settings
-from .workflow import process_user_input
+from .workflow import CONSTANT_RESPONSES, aprocess_user_input, astream_response
+from .tool_executor import executor
+from .speech_pipeline import delta_sentences, run_ahead, split_sentences, synthesize_sentences
 
 
 # Initialize Sentry if DSN is provided
@@ -27,15 +31,46 @@ if settings.sentry_dsn:
     )
 
 
+async def prerender_constant_responses() -> None:
+    """
+    Synthesize the workflow's fixed responses into the TTS cache.
+    
+    Responses are spoken sentence by sentence, so the sentences are what
+    gets cached.
+    """
+    sentences = sorted({s for text in CONSTANT_RESPONSES for s in split_sentences(text)})
+    results = await asyncio.gather(*(executor.asynthesize_bytes(s) for s in sentences))
+    rendered = sum(1 for result in results if result.get("status") == "success")
+    print(f"Pre-rendered {rendered}/{len(sentences)} fixed responses")
+
+
+async def warm_knowledge_index() -> None:
+    """Load the local vector index so searches skip the match_documents RPC."""
+    result = await executor.awarm_knowledge_index()
+    if result.get("status") != "success":
+        print(f"Knowledge index not loaded, searches use the RPC: {result.get('message')}")
+    elif not result.get("skipped"):
+        print(f"Knowledge index loaded: {result['documents']} documents in {result['load_ms']} ms")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown events."""
     # Startup
     print("🚀 Voice-First AI Email Agent starting up...")
     print(f"Environment: {settings.environment}")
+    print(f"Tool execution mode: {executor.mode}")
+    executor.start()
+    warmups = [
+        asyncio.create_task(prerender_constant_responses()),
+        asyncio.create_task(warm_knowledge_index()),
+    ]
     yield
     # Shutdown
     print("👋 Voice-First AI Email Agent shutting down...")
+    for task in warmups:
+        task.cancel()
+    await executor.ashutdown()
 
 
 app = FastAPI(
@@ -76,13 +111,17 @@ async def health_check():
             "supabase": bool(settings.supabase_url),
             "gmail": bool(settings.gmail_client_id),
             "google_cloud": bool(settings.google_cloud_project)
-        }
+        },
+        "tools": executor.stats()
     }
 
 
 async def transcribe_audio_stream(audio_data: bytes) -> str:
     """
-    Transcribe audio data to text using the voice CLI tool.
+    Transcribe audio data to text using the voice tool.
+    
+    The buffer is handed to the recognizer directly; nothing is written to
+    disk, so concurrent sessions cannot overwrite each other's audio.
     
     Args:
         audio_data: Raw audio bytes
@@ -90,68 +129,230 @@ async def transcribe_audio_stream(audio_data: bytes) -> str:
     Returns:
         Transcribed text
     """
-    # Save audio to temporary file
-    temp_audio_path = "/tmp/user_audio.wav"
-    with open(temp_audio_path, "wb") as f:
-        f.write(audio_data)
-    
-    # Call voice CLI tool
-    result = subprocess.run(
-        ["python", "tools/voice_cli.py", "transcribe", "--file", temp_audio_path],
-        capture_output=True,
-        text=True,
-        cwd="/home/ubuntu/voice-email-agent"
-    )
+    result = await executor.atranscribe_bytes(audio_data)
     
-    if result.returncode == 0:
-        data = json.loads(result.stdout)
-        return data.get("text", "")
+    if result.get("status") == "success":
+        return result.get("text", "")
     else:
-        raise Exception(f"Transcription failed: {result.stderr}")
+        raise Exception(f"Transcription failed: {result.get('message')}")
 
 
 async def synthesize_speech_stream(text: str) -> bytes:
     """
-    Convert text to speech using the voice CLI tool.
+    Convert text to speech using the voice tool.
     
     Args:
         text: Text to convert to speech
     
     Returns:
-        Audio data as bytes
+        Audio data as bytes (kept in memory, sent straight to the websocket)
     """
-    temp_output_path = "/tmp/agent_response.mp3"
+    result = await executor.asynthesize_bytes(text)
     
-    # Call voice CLI tool
-    result = subprocess.run(
-        ["python", "tools/voice_cli.py", "speak", "--text", text, "--output", temp_output_path],
-        capture_output=True,
-        text=True,
-        cwd="/home/ubuntu/voice-email-agent"
-    )
-    
-    if result.returncode == 0:
-        with open(temp_output_path, "rb") as f:
-            return f.read()
+    if result.get("status") == "success":
+        return result["audio"]
     else:
-        raise Exception(f"Speech synthesis failed: {result.stderr}")
+        raise Exception(f"Speech synthesis failed: {result.get('message')}")
+
+
+async def respond_to_utterance(websocket: WebSocket, user_text: str) -> None:
+    """
+    Run a transcribed utterance through the workflow and send back speech.
+    
+    LLM tokens are forwarded as {"status": "response_delta", "delta": ...}
+    while they are generated, and each completed sentence is synthesized
+    right away; its audio is sent as {"status": "audio_chunk", "seq": n, ...}
+    followed by the MP3 bytes. A final {"status": "complete"} carries the
+    full response text and the time from transcript to first audio.
+    """
+    started = time.perf_counter()
+    await websocket.send_json({
+        "status": "processing",
+        "message": "Processing request...",
+        "transcription": user_text
+    })
+    
+    # Deltas and audio chunks are sent from different tasks; the lock keeps
+    # each audio_chunk message directly in front of its bytes.
+    send_lock = asyncio.Lock()
+    response_parts = []
+    
+    async def forward_deltas():
+        # Step 2: Process through LangGraph workflow, streaming its output
+        async for delta in astream_response(user_text):
+            response_parts.append(delta)
+            async with send_lock:
+                await websocket.send_json({"status": "response_delta", "delta": delta})
+            yield delta
+    
+    # Steps 3-4: Convert each sentence to speech and send it when ready. The
+    # deltas run ahead in their own task, so a full TTS window delays the
+    # audio but not the text.
+    time_to_first_audio_ms = None
+    audio_size = 0
+    chunks = 0
+    async for seq, sentence, audio in synthesize_sentences(
+        delta_sentences(run_ahead(forward_deltas())),
+        synthesize_speech_stream,
+        max_concurrency=settings.tts_max_concurrency,
+    ):
+        if time_to_first_audio_ms is None:
+            time_to_first_audio_ms = round((time.perf_counter() - started) * 1000)
+        async with send_lock:
+            await websocket.send_json({
+                "status": "audio_chunk",
+                "seq": seq,
+                "text": sentence,
+                "audio_size": len(audio)
+            })
+            await websocket.send_bytes(audio)
+        audio_size += len(audio)
+        chunks += 1
+    
+    await websocket.send_json({
+        "status": "complete",
+        "message": "Response ready",
+        "response_text": "".join(response_parts),
+        "audio_size": audio_size,
+        "chunks": chunks,
+        "time_to_first_audio_ms": time_to_first_audio_ms
+    })
+
+
+# Marks the end of an utterance in the streaming frame queue
+END_OF_UTTERANCE = object()
+
+
+async def receive_frames(websocket: WebSocket, frames: asyncio.Queue) -> None:
+    """Pump client messages into the frame queue; None marks a disconnect."""
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes") is not None:
+                await frames.put(message["bytes"])
+            elif message.get("text"):
+                try:
+                    event = json.loads(message["text"]).get("event")
+                except (json.JSONDecodeError, AttributeError):
+                    event = None
+                if event == "end_of_utterance":
+                    await frames.put(END_OF_UTTERANCE)
+    finally:
+        await frames.put(None)
+
+
+class Utterance:
+    """The frames of one utterance, read from the session's frame queue."""
+    
+    def __init__(self, first_frame: bytes, frames: asyncio.Queue):
+        self.first_frame = first_frame
+        self.frames = frames
+        self.complete = False
+    
+    async def _next_frame(self):
+        frame = await self.frames.get()
+        if frame is None:
+            # Leave the disconnect marker for the session loop
+            self.frames.put_nowait(None)
+            self.complete = True
+            return None
+        if frame is END_OF_UTTERANCE:
+            self.complete = True
+            return None
+        return frame
+    
+    async def stream(self):
+        """Yield frames up to the end-of-utterance marker or a disconnect."""
+        yield self.first_frame
+        while not self.complete:
+            frame = await self._next_frame()
+            if frame is None:
+                return
+            yield frame
+    
+    async def discard_rest(self) -> None:
+        """Drop frames the recognizer did not need, up to the end marker."""
+        while not self.complete:
+            await self._next_frame()
+
+
+async def stream_voice_session(websocket: WebSocket) -> None:
+    """
+    Streaming recognition: PCM frames are fed to the recognizer as they
+    arrive and interim transcripts are pushed back as `partial` messages.
+    """
+    frames: asyncio.Queue = asyncio.Queue(maxsize=512)
+    receiver = asyncio.create_task(receive_frames(websocket, frames))
+    
+    try:
+        while True:
+            first_frame = await frames.get()
+            if first_frame is None:
+                break
+            if first_frame is END_OF_UTTERANCE:
+                continue
+            
+            utterance = Utterance(first_frame, frames)
+            user_text = ""
+            try:
+                # Step 1: Transcribe while the user is still talking
+                async with contextlib.aclosing(executor.astream_transcribe(utterance.stream())) as updates:
+                    async for update in updates:
+                        if update["is_final"]:
+                            user_text = update["text"]
+                            break
+                        await websocket.send_json({"status": "partial", "transcript": update["text"]})
+                
+                if not user_text:
+                    await websocket.send_json({"status": "error", "message": "Could not transcribe audio"})
+                else:
+                    await websocket.send_json({"status": "final", "transcript": user_text})
+                    await respond_to_utterance(websocket, user_text)
+            
+            except Exception as e:
+                await websocket.send_json({
+                    "status": "error",
+                    "message": f"Processing error: {str(e)}"
+                })
+            
+            # The recognizer may finish before the client's end marker arrives;
+            # drop the rest of this utterance's frames before the next one.
+            await utterance.discard_rest()
+    finally:
+        receiver.cancel()
 
 
 @app.websocket("/ws/voice")
-async def voice_websocket(websocket: WebSocket):
+async def voice_websocket(websocket: WebSocket, mode: str = "batch"):
     """
     WebSocket endpoint for streaming speech-to-speech interaction.
     
-    Protocol:
+    Protocol (default, `mode=batch`):
     1. Client sends audio data (binary)
     2. Server transcribes audio to text
-    3. Server processes text through LangGraph workflow
-    4. Server converts response text to speech
-    5. Server sends audio response back to client
+    3. Server processes text through LangGraph workflow, forwarding response
+       tokens as {"status": "response_delta", "delta": ...}
+    4. Server converts response text to speech, one sentence at a time
+    5. Server sends each {"status": "audio_chunk", "seq": n} message followed by
+       its audio (binary), in order, then {"status": "complete"} with
+       `response_text` and `time_to_first_audio_ms`
+    
+    Protocol (`/ws/voice?mode=stream`):
+    1. Client sends small 16 kHz LINEAR16 PCM frames (binary) while the user speaks
+    2. Server pushes {"status": "partial", "transcript": ...} as hypotheses arrive
+    3. Server sends {"status": "final", "transcript": ...} as soon as speech ends,
+       then continues with steps 3-5 above
+    4. Client sends {"event": "end_of_utterance"} after the last frame of an utterance
     """
     await websocket.accept()
     
     try:
+        if mode == "stream":
+            await stream_voice_session(websocket)
+            return
+        
         while True:
             # Receive audio data from client
             audio_data = await websocket.receive_bytes()
@@ -167,32 +368,7 @@ async def voice_websocket(websocket: WebSocket):
                     await websocket.send_json({"status": "error", "message": "Could not transcribe audio"})
                     continue
                 
-                await websocket.send_json({
-                    "status": "processing",
-                    "message": "Processing request...",
-                    "transcription": user_text
-                })
-                
-                # Step 2: Process through LangGraph workflow
-                response_text = await asyncio.to_thread(process_user_input, user_text)
-                
-                await websocket.send_json({
-                    "status": "processing",
-                    "message": "Generating speech...",
-                    "response_text": response_text
-                })
-                
-                # Step 3: Convert response to speech
-                response_audio = await synthesize_speech_stream(response_text)
-                
-                # Step 4: Send audio response to client
-                await websocket.send_json({
-                    "status": "complete",
-                    "message": "Response ready",
-                    "audio_size": len(response_audio)
-                })
-                
-                await websocket.send_bytes(response_audio)
+                await respond_to_utterance(websocket, user_text)
                 
             except Exception as e:
                 await websocket.send_json({
@@ -234,12 +410,41 @@ async def text_endpoint(request: dict):
         return {"error": "No text provided"}
     
     try:
-        response_text = await asyncio.to_thread(process_user_input, user_text)
+        response_text = await aprocess_user_input(user_text)
         return {"response": response_text}
     except Exception as e:
         return {"error": str(e)}
 
 
+
+@app.post("/api/text/stream")
+async def text_stream_endpoint(request: dict):
+    """
+    Streaming variant of /api/text.
+    
+    Response (application/x-ndjson), one JSON object per line:
+        {"delta": "..."}            as the response is generated
+        {"response": "full text"}   once it is complete
+        {"error": "..."}            if processing fails
+    """
+    user_text = request.get("text", "")
+    
+    if not user_text:
+        return {"error": "No text provided"}
+    
+    async def lines():
+        parts = []
+        try:
+            async for delta in astream_response(user_text):
+                parts.append(delta)
+                yield json.dumps({"delta": delta}) + "\n"
+            yield json.dumps({"response": "".join(parts)}) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": str(e)}) + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -0,0 +1,158 @@
+"""
+Sentence-chunked speech synthesis.
+
+Synthesizing a long response (e.g. a full email draft) as one MP3 means the
+user hears nothing until the whole text is rendered. The pipeline splits the
+response into sentences, synthesizes several of them concurrently and yields
+the audio strictly in sentence order, so the first sentence can be played
+while the rest are still being rendered. The sentences may come from a text
+that is still being generated (see `SentenceSplitter`).
+"""
+import asyncio
+import re
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+# Sentence ends: terminal punctuation followed by whitespace, or a blank line
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+
+# Fragments shorter than this are merged into the next sentence; tiny clips
+# ("Hi John,") cost a full TTS round trip and sound choppy on their own.
+MIN_SENTENCE_CHARS = 20
+
+
+class SentenceSplitter:
+    """
+    Incremental sentence splitter for text that arrives in pieces (LLM deltas).
+    
+    `feed()` returns the sentences completed by the new text; `flush()`
+    returns whatever is left once the text has ended.
+    """
+    
+    def __init__(self, min_chars: int = MIN_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self.buffer = ""
+    
+    def feed(self, text: str) -> List[str]:
+        self.buffer += text
+        sentences = []
+        start = 0
+        for match in SENTENCE_BOUNDARY.finditer(self.buffer):
+            sentence = _normalize(self.buffer[start:match.start()])
+            if len(sentence) >= self.min_chars:
+                sentences.append(sentence)
+                start = match.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+    
+    def flush(self) -> List[str]:
+        rest = _normalize(self.buffer)
+        self.buffer = ""
+        return [rest] if rest else []
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+def split_sentences(text: str, min_chars: int = MIN_SENTENCE_CHARS) -> List[str]:
+    """Split text into speakable sentences, merging very short fragments."""
+    splitter = SentenceSplitter(min_chars)
+    return splitter.feed(text) + splitter.flush()
+
+
+async def text_sentences(text: str) -> AsyncIterator[str]:
+    """Async source of the sentences of an already complete text."""
+    for sentence in split_sentences(text):
+        yield sentence
+
+
+async def delta_sentences(deltas: AsyncIterable[str]) -> AsyncIterator[str]:
+    """Async source of sentences from streamed text deltas."""
+    splitter = SentenceSplitter()
+    async for delta in deltas:
+        for sentence in splitter.feed(delta):
+            yield sentence
+    for sentence in splitter.flush():
+        yield sentence
+
+
+async def run_ahead(source: AsyncIterable[T]) -> AsyncIterator[T]:
+    """
+    Iterate `source` in its own task and yield its items from a buffer, so a
+    slow consumer (TTS backpressure) never holds back the producer and its
+    side effects (forwarding text deltas to the client).
+    """
+    items: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    async def pump() -> None:
+        try:
+            async for item in source:
+                await items.put(item)
+        finally:
+            await items.put(done)
+
+    task = asyncio.create_task(pump())
+    try:
+        while True:
+            item = await items.get()
+            if item is done:
+                break
+            yield item
+        # Surface errors raised by the source
+        await task
+    finally:
+        task.cancel()
+
+
+async def synthesize_sentences(
+    sentences: AsyncIterable[str],
+    synthesize: Callable[[str], Awaitable[bytes]],
+    max_concurrency: int = 4,
+) -> AsyncIterator[Tuple[int, str, bytes]]:
+    """
+    Synthesize sentences concurrently and yield (seq, sentence, audio) in order.
+
+    At most `max_concurrency` sentences are being synthesized or waiting to
+    be consumed at any time, which bounds both TTS load and buffered audio.
+    """
+    window = asyncio.Semaphore(max_concurrency)
+    pending: asyncio.Queue = asyncio.Queue()
+
+    async def schedule() -> None:
+        try:
+            async for sentence in sentences:
+                await window.acquire()
+                task = asyncio.create_task(synthesize(sentence))
+                await pending.put((sentence, task))
+        finally:
+            await pending.put(None)
+
+    scheduler = asyncio.create_task(schedule())
+    in_flight: List[asyncio.Task] = []
+    seq = 0
+    try:
+        while True:
+            item: Optional[Tuple[str, asyncio.Task]] = await pending.get()
+            if item is None:
+                break
+            sentence, task = item
+            in_flight.append(task)
+            audio = await task
+            in_flight.remove(task)
+            window.release()
+            yield seq, sentence, audio
+            seq += 1
+        # Surface errors raised by the sentence source
+        await scheduler
+    finally:
+        scheduler.cancel()
+        while not pending.empty():
+            item = pending.get_nowait()
+            if item is not None:
+                in_flight.append(item[1])
+        for task in in_flight:
+            task.cancel()
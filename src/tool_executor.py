@@ -0,0 +1,465 @@
+"""
+Tool Executor - In-Process Execution of the CLI Tool Layer
+
+The workflow used to spawn `python tools/<name>_cli.py ...` for every tool call,
+paying interpreter start-up, cold SDK imports and JSON round trips on each
+voice turn. The executor imports the tool modules once and calls their
+functions directly. The CLIs remain thin argparse wrappers over the same
+functions, so process isolation is still available as a fallback:
+
+    TOOL_EXECUTION_MODE=inprocess   (default) call tool functions directly
+    TOOL_EXECUTION_MODE=worker      send calls to a pool of warm `serve` workers
+    TOOL_EXECUTION_MODE=subprocess  spawn the CLI per call and parse its JSON
+
+Every call has an async twin (`acall`, `asearch_knowledge`, ...). In-process,
+tools that provide an `a<function>` coroutine are awaited directly; tools
+backed by blocking SDKs (the Gmail client has no async API) run on a
+dedicated thread pool sized by TOOL_THREAD_POOL_SIZE instead of the event
+loop's default executor.
+"""
+import asyncio
+import base64
+import functools
+import importlib
+import json
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import ModuleType
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, TypedDict
+
+from .worker_pool import WorkerSupervisor
+
+
+TOOLS_DIR = Path(__file__).resolve().parent.parent / "tools"
+
+EXECUTION_MODES = ("inprocess", "worker", "subprocess")
+
+TOOLS = ("rag", "email", "voice")
+
+
+# ============================================================================
+# Typed results (same shape as the JSON printed by the CLIs)
+# ============================================================================
+
+class SearchResult(TypedDict, total=False):
+    id: str
+    content: str
+    metadata: Dict[str, Any]
+    similarity: Optional[float]  # None for keyword-only hits
+    score: float                 # reciprocal-rank fusion score (hybrid search)
+
+
+class SearchResponse(TypedDict, total=False):
+    status: str
+    results: List[SearchResult]
+    embedding_skipped: bool
+    message: str
+
+
+class FAQMatch(TypedDict):
+    id: str
+    question: str
+    answer: str
+    category: Optional[str]
+
+
+class FAQResponse(TypedDict, total=False):
+    status: str
+    match: Optional[FAQMatch]
+    confidence: float
+    message: str
+
+
+# "from" is a keyword, so this one uses the functional TypedDict syntax
+EmailSummary = TypedDict("EmailSummary", {
+    "id": str,
+    "thread_id": str,
+    "from": str,
+    "subject": str,
+    "date": str,
+    "snippet": str,
+})
+
+
+class EmailListResponse(TypedDict, total=False):
+    status: str
+    emails: List[EmailSummary]
+    count: int
+    message: str
+
+
+class EmailResponse(TypedDict, total=False):
+    status: str
+    email: Dict[str, Any]
+    message: str
+
+
+class ActionResponse(TypedDict, total=False):
+    status: str
+    id: str
+    message_id: str
+    thread_id: str
+    label_id: str
+    message: str
+
+
+class TranscriptionResponse(TypedDict, total=False):
+    status: str
+    text: str
+    confidence: float
+    message: str
+
+
+class TranscriptUpdate(TypedDict):
+    is_final: bool
+    text: str
+    stability: float
+    confidence: float
+
+
+class SpeechResponse(TypedDict, total=False):
+    status: str
+    audio_file: str
+    size_bytes: int
+    message: str
+
+
+class SpeechAudio(TypedDict, total=False):
+    status: str
+    audio: bytes
+    size_bytes: int
+    cached: bool
+    message: str
+
+
+def _decode_speech_audio(result: Dict[str, Any]) -> SpeechAudio:
+    """Turn a CLI/worker `speak --output -` result into in-memory audio."""
+    if result.get("status") != "success":
+        return result
+    audio = base64.b64decode(result["audio_base64"])
+    return {"status": "success", "audio": audio, "size_bytes": len(audio)}
+
+
+# ============================================================================
+# Command table: (tool, command) -> (function name, {kwarg: CLI flag})
+# ============================================================================
+
+COMMANDS: Dict[Tuple[str, str], Tuple[str, Dict[str, str]]] = {
+    ("rag", "search"): ("search_knowledge", {"query": "--query", "limit": "--limit",
+                                             "doc_type": "--doc-type", "category": "--category"}),
+    ("rag", "add"): ("add_knowledge", {"text": "--text", "metadata": "--metadata"}),
+    ("rag", "delete"): ("delete_knowledge", {"doc_id": "--id"}),
+    ("rag", "list"): ("list_knowledge", {"limit": "--limit", "offset": "--offset"}),
+    ("rag", "warm"): ("warm_index", {}),
+    ("rag", "faq"): ("match_faq", {"question": "--question"}),
+    ("email", "send"): ("send_email", {"to": "--to", "subject": "--subject", "body": "--body", "cc": "--cc", "bcc": "--bcc"}),
+    ("email", "list"): ("list_emails", {"query": "--query", "max_results": "--max-results"}),
+    ("email", "get"): ("get_email", {"message_id": "--message-id"}),
+    ("email", "label"): ("label_email", {"message_id": "--message-id", "label": "--label"}),
+    ("email", "archive"): ("archive_email", {"message_id": "--message-id"}),
+    ("voice", "transcribe"): ("transcribe_audio", {"file_path": "--file"}),
+    ("voice", "speak"): ("synthesize_speech", {"text": "--text", "output_file": "--output"}),
+}
+
+
+def load_tool_module(name: str) -> ModuleType:
+    """Import `tools/<name>.py` as a module (cached by the import system)."""
+    tools_dir = str(TOOLS_DIR)
+    if tools_dir not in sys.path:
+        sys.path.insert(0, tools_dir)
+    return importlib.import_module(name)
+
+
+class ToolExecutor:
+    """Dispatch tool calls either in-process or to the CLI subprocesses."""
+
+    def __init__(self, mode: Optional[str] = None, python: str = sys.executable):
+        mode = mode or os.getenv("TOOL_EXECUTION_MODE", "inprocess")
+        if mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown tool execution mode: {mode} (expected one of {EXECUTION_MODES})")
+        self.mode = mode
+        self.python = python
+        self._supervisor: Optional[WorkerSupervisor] = None
+        self._supervisor_lock = threading.Lock()
+        self._blocking_pool: Optional[ThreadPoolExecutor] = None
+
+    def start(self) -> None:
+        """Warm up the worker pools (no-op outside worker mode)."""
+        if self.mode == "worker":
+            self._get_supervisor()
+
+    def shutdown(self) -> None:
+        """Stop the worker pools and close the in-process API clients."""
+        with self._supervisor_lock:
+            if self._supervisor is not None:
+                self._supervisor.shutdown()
+                self._supervisor = None
+        if self.mode == "inprocess":
+            load_tool_module("clients").registry.close()
+        if self._blocking_pool is not None:
+            self._blocking_pool.shutdown(wait=False)
+            self._blocking_pool = None
+
+    async def ashutdown(self) -> None:
+        """Async shutdown that also closes the async API clients."""
+        if self.mode == "inprocess":
+            await load_tool_module("clients").registry.aclose()
+        await asyncio.to_thread(self.shutdown)
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"mode": self.mode}
+        if self._supervisor is not None:
+            stats["workers"] = self._supervisor.stats()
+        if self.mode == "inprocess":
+            stats["clients"] = load_tool_module("clients").registry.health()
+            stats["tts_cache"] = load_tool_module("voice_cli").tts_cache.stats()
+            stats["embedding_cache"] = load_tool_module("embedding_cache").get_embedding_cache().stats()
+        return stats
+
+    def _get_supervisor(self) -> WorkerSupervisor:
+        with self._supervisor_lock:
+            if self._supervisor is None:
+                supervisor = WorkerSupervisor(
+                    TOOLS_DIR,
+                    list(TOOLS),
+                    size=int(os.getenv("TOOL_WORKER_POOL_SIZE", "2")),
+                    timeout=float(os.getenv("TOOL_WORKER_TIMEOUT", "60")),
+                    python=self.python,
+                )
+                supervisor.start()
+                self._supervisor = supervisor
+            return self._supervisor
+
+    def call(self, tool: str, command: str, **kwargs) -> Dict[str, Any]:
+        """Run a tool command and return its JSON-compatible result."""
+        if (tool, command) not in COMMANDS:
+            return {"status": "error", "message": f"Unknown tool command: {tool} {command}"}
+
+        if self.mode == "subprocess":
+            return self._call_subprocess(tool, command, kwargs)
+        if self.mode == "worker":
+            return self._get_supervisor().call(tool, command, kwargs)
+        return self._call_inprocess(tool, command, kwargs)
+
+    def _call_inprocess(self, tool: str, command: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        function_name, _ = COMMANDS[(tool, command)]
+        return self._invoke(tool, function_name, kwargs)
+
+    @staticmethod
+    def _invoke(tool: str, function_name: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            function: Callable[..., Dict[str, Any]] = getattr(load_tool_module(f"{tool}_cli"), function_name)
+            return function(**kwargs)
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    def _cli_argv(self, tool: str, command: str, kwargs: Dict[str, Any]) -> List[str]:
+        _, flags = COMMANDS[(tool, command)]
+        argv = [self.python, str(TOOLS_DIR / f"{tool}_cli.py"), command]
+        for name, value in kwargs.items():
+            if value is not None:
+                argv.extend([flags[name], str(value)])
+        return argv
+
+    @staticmethod
+    def _parse_cli_output(returncode: int, stdout: bytes, stderr: bytes) -> Dict[str, Any]:
+        if returncode != 0:
+            return {"status": "error", "message": stderr.decode(errors="replace").strip()}
+        try:
+            return json.loads(stdout)
+        except json.JSONDecodeError as e:
+            return {"status": "error", "message": f"Invalid tool output: {e}"}
+
+    def _call_subprocess(self, tool: str, command: str, kwargs: Dict[str, Any],
+                         stdin: Optional[bytes] = None) -> Dict[str, Any]:
+        result = subprocess.run(self._cli_argv(tool, command, kwargs), input=stdin, capture_output=True)
+        return self._parse_cli_output(result.returncode, result.stdout, result.stderr)
+
+    # Async execution
+
+    async def acall(self, tool: str, command: str, **kwargs) -> Dict[str, Any]:
+        """Async variant of `call` that never blocks the event loop."""
+        if (tool, command) not in COMMANDS:
+            return {"status": "error", "message": f"Unknown tool command: {tool} {command}"}
+
+        if self.mode == "subprocess":
+            return await self._acall_subprocess(tool, command, kwargs)
+        if self.mode == "worker":
+            supervisor = self._get_supervisor()
+            return await self._run_blocking(supervisor.call, tool, command, kwargs)
+        return await self._acall_inprocess(tool, command, kwargs)
+
+    async def _run_blocking(self, function: Callable[..., Any], *args, **kwargs) -> Any:
+        if self._blocking_pool is None:
+            self._blocking_pool = ThreadPoolExecutor(
+                max_workers=int(os.getenv("TOOL_THREAD_POOL_SIZE", "64")),
+                thread_name_prefix="tool-io",
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._blocking_pool, functools.partial(function, *args, **kwargs))
+
+    async def _acall_inprocess(self, tool: str, command: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        function_name, _ = COMMANDS[(tool, command)]
+        try:
+            module = load_tool_module(f"{tool}_cli")
+            async_function = getattr(module, f"a{function_name}", None)
+            if async_function is not None:
+                return await async_function(**kwargs)
+            return await self._run_blocking(getattr(module, function_name), **kwargs)
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    async def _acall_subprocess(self, tool: str, command: str, kwargs: Dict[str, Any],
+                                stdin: Optional[bytes] = None) -> Dict[str, Any]:
+        process = await asyncio.create_subprocess_exec(
+            *self._cli_argv(tool, command, kwargs),
+            stdin=asyncio.subprocess.PIPE if stdin is not None else None,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, stderr = await process.communicate(stdin)
+        return self._parse_cli_output(process.returncode, stdout, stderr)
+
+    # RAG tools
+
+    def search_knowledge(self, query: str, limit: int = 5,
+                         doc_type: Optional[str] = None, category: Optional[str] = None) -> SearchResponse:
+        return self.call("rag", "search", query=query, limit=limit, doc_type=doc_type, category=category)
+
+    def match_faq(self, question: str) -> FAQResponse:
+        return self.call("rag", "faq", question=question)
+
+    def add_knowledge(self, text: str, metadata: str = "{}") -> ActionResponse:
+        return self.call("rag", "add", text=text, metadata=metadata)
+
+    def delete_knowledge(self, doc_id: str) -> ActionResponse:
+        return self.call("rag", "delete", doc_id=doc_id)
+
+    def list_knowledge(self, limit: int = 10, offset: int = 0) -> Dict[str, Any]:
+        return self.call("rag", "list", limit=limit, offset=offset)
+
+    # Email tools
+
+    def send_email(self, to: str, subject: str, body: str, cc: str = None, bcc: str = None) -> ActionResponse:
+        return self.call("email", "send", to=to, subject=subject, body=body, cc=cc, bcc=bcc)
+
+    def list_emails(self, query: str = "", max_results: int = 10) -> EmailListResponse:
+        return self.call("email", "list", query=query, max_results=max_results)
+
+    def get_email(self, message_id: str) -> EmailResponse:
+        return self.call("email", "get", message_id=message_id)
+
+    def label_email(self, message_id: str, label: str) -> ActionResponse:
+        return self.call("email", "label", message_id=message_id, label=label)
+
+    def archive_email(self, message_id: str) -> ActionResponse:
+        return self.call("email", "archive", message_id=message_id)
+
+    # Voice tools
+
+    def transcribe_audio(self, file_path: str) -> TranscriptionResponse:
+        return self.call("voice", "transcribe", file_path=file_path)
+
+    def synthesize_speech(self, text: str, output_file: str = None) -> SpeechResponse:
+        return self.call("voice", "speak", text=text, output_file=output_file)
+
+    # In-memory audio (no temp files; safe for concurrent sessions)
+
+    def transcribe_bytes(self, audio: bytes) -> TranscriptionResponse:
+        audio = bytes(audio)
+        if self.mode == "inprocess":
+            return self._invoke("voice", "transcribe_bytes", {"content": audio})
+        if self.mode == "worker":
+            return self._get_supervisor().call("voice", "transcribe_base64", {"audio_b64": base64.b64encode(audio).decode("ascii")})
+        return self._call_subprocess("voice", "transcribe", {"file_path": "-"}, stdin=audio)
+
+    def synthesize_bytes(self, text: str) -> SpeechAudio:
+        if self.mode == "inprocess":
+            return self._invoke("voice", "synthesize_bytes", {"text": text})
+        return _decode_speech_audio(self.call("voice", "speak", text=text, output_file="-"))
+
+    # Async variants
+
+    async def asearch_knowledge(self, query: str, limit: int = 5,
+                                doc_type: Optional[str] = None, category: Optional[str] = None) -> SearchResponse:
+        return await self.acall("rag", "search", query=query, limit=limit, doc_type=doc_type, category=category)
+
+    async def amatch_faq(self, question: str) -> FAQResponse:
+        return await self.acall("rag", "faq", question=question)
+
+    async def awarm_knowledge_index(self) -> Dict[str, Any]:
+        """
+        Load the local vector index of the rag tool.
+        
+        In worker mode this warms one rag worker; the others load their index
+        on first search. Subprocess mode keeps nothing warm, so it is skipped.
+        """
+        if self.mode == "subprocess":
+            return {"status": "success", "skipped": True}
+        return await self.acall("rag", "warm")
+
+    async def alist_emails(self, query: str = "", max_results: int = 10) -> EmailListResponse:
+        return await self.acall("email", "list", query=query, max_results=max_results)
+
+    async def aget_email(self, message_id: str) -> EmailResponse:
+        return await self.acall("email", "get", message_id=message_id)
+
+    async def alabel_email(self, message_id: str, label: str) -> ActionResponse:
+        return await self.acall("email", "label", message_id=message_id, label=label)
+
+    async def aarchive_email(self, message_id: str) -> ActionResponse:
+        return await self.acall("email", "archive", message_id=message_id)
+
+    async def atranscribe_audio(self, file_path: str) -> TranscriptionResponse:
+        return await self.acall("voice", "transcribe", file_path=file_path)
+
+    async def asynthesize_speech(self, text: str, output_file: str = None) -> SpeechResponse:
+        return await self.acall("voice", "speak", text=text, output_file=output_file)
+
+    async def atranscribe_bytes(self, audio: bytes) -> TranscriptionResponse:
+        audio = bytes(audio)
+        if self.mode == "inprocess":
+            try:
+                return await load_tool_module("voice_cli").atranscribe_bytes(audio)
+            except Exception as e:
+                return {"status": "error", "message": str(e)}
+        if self.mode == "worker":
+            return await self._run_blocking(self.transcribe_bytes, audio)
+        return await self._acall_subprocess("voice", "transcribe", {"file_path": "-"}, stdin=audio)
+
+    async def astream_transcribe(self, frames: AsyncIterator[bytes]) -> AsyncIterator[TranscriptUpdate]:
+        """
+        Stream audio frames to the recognizer, yielding partial and final transcripts.
+        
+        Streaming needs a live gRPC stream, so it is only available in-process;
+        in the worker and subprocess modes the frames are buffered and sent as
+        one request once the utterance ends (a single final transcript).
+        """
+        if self.mode == "inprocess":
+            async for update in load_tool_module("voice_cli").astream_transcribe(frames):
+                yield update
+            return
+
+        audio = bytearray()
+        async for frame in frames:
+            audio.extend(frame)
+        result = await self.atranscribe_bytes(audio)
+        if result.get("status") != "success":
+            raise Exception(result.get("message"))
+        yield {"is_final": True, "text": result.get("text", ""), "stability": 1.0, "confidence": result.get("confidence", 0.0)}
+
+    async def asynthesize_bytes(self, text: str) -> SpeechAudio:
+        if self.mode == "inprocess":
+            try:
+                return await load_tool_module("voice_cli").asynthesize_bytes(text)
+            except Exception as e:
+                return {"status": "error", "message": str(e)}
+        return _decode_speech_audio(await self.acall("voice", "speak", text=text, output_file="-"))
+
+
+# Shared executor used by the workflow and the API server
+executor = ToolExecutor()
@@ -0,0 +1,182 @@
+"""
+Tool Worker Pool - Supervisor for persistent JSON-lines tool workers
+
+Keeps a pool of warm `python tools/<tool>_cli.py serve` processes per tool so
+calls keep process isolation without paying interpreter start-up and client
+construction each time. Crashed workers are restarted either when they are
+checked out or by a background monitor, so the pool stays warm.
+"""
+import json
+import queue
+import select
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+class WorkerError(Exception):
+    """A worker died, timed out or broke the JSON-lines protocol."""
+
+
+class ToolWorker:
+    """A single long-lived `serve` process for one tool."""
+
+    def __init__(self, script: Path, python: str = sys.executable):
+        self.script = script
+        self.python = python
+        self.lock = threading.Lock()
+        self.restarts = 0
+        self._process: Optional[subprocess.Popen] = None
+        self._next_id = 0
+
+    def start(self) -> None:
+        self._process = subprocess.Popen(
+            [self.python, str(self.script), "serve"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+
+    def alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def ensure_running(self) -> None:
+        """Restart the process if it has exited. Caller must hold `lock`."""
+        if not self.alive():
+            if self._process is not None:
+                self.restarts += 1
+            self.start()
+
+    def request(self, command: str, args: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """Send one request and wait for its response. Caller must hold `lock`."""
+        self._next_id += 1
+        request_id = self._next_id
+        line = json.dumps({"id": request_id, "command": command, "args": args}) + "\n"
+
+        try:
+            self._process.stdin.write(line.encode("utf-8"))
+            self._process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise WorkerError(f"worker stdin closed: {e}")
+
+        ready, _, _ = select.select([self._process.stdout], [], [], timeout)
+        if not ready:
+            raise WorkerError(f"no response within {timeout}s")
+
+        raw = self._process.stdout.readline()
+        if not raw:
+            raise WorkerError("worker exited")
+
+        try:
+            response = json.loads(raw)
+        except json.JSONDecodeError as e:
+            raise WorkerError(f"invalid response: {e}")
+        if response.get("id") != request_id:
+            raise WorkerError(f"response id {response.get('id')} does not match request {request_id}")
+        return response["result"]
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._process is None:
+            return
+        try:
+            self._process.stdin.close()
+            self._process.wait(timeout=timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            self._process.kill()
+            self._process.wait()
+
+
+class WorkerPool:
+    """A fixed-size pool of warm workers for one tool."""
+
+    def __init__(self, script: Path, size: int = 2, timeout: float = 60.0, python: str = sys.executable):
+        self.script = script
+        self.timeout = timeout
+        self.workers: List[ToolWorker] = [ToolWorker(script, python) for _ in range(size)]
+        self._idle: "queue.Queue[ToolWorker]" = queue.Queue()
+
+    def start(self) -> None:
+        for worker in self.workers:
+            with worker.lock:
+                worker.ensure_running()
+            self._idle.put(worker)
+
+    def call(self, command: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            worker = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            return {"status": "error", "message": f"No idle {self.script.stem} worker within {self.timeout}s"}
+
+        try:
+            with worker.lock:
+                worker.ensure_running()
+                try:
+                    return worker.request(command, args, self.timeout)
+                except WorkerError as e:
+                    # The request may have had side effects, so it is not
+                    # retried; the worker is replaced for the next caller.
+                    worker.stop(timeout=0)
+                    worker.ensure_running()
+                    return {"status": "error", "message": f"{self.script.stem} worker failed: {e}"}
+        finally:
+            self._idle.put(worker)
+
+    def restart_dead(self) -> None:
+        """Restart exited workers that are not currently serving a request."""
+        for worker in self.workers:
+            if worker.lock.acquire(blocking=False):
+                try:
+                    worker.ensure_running()
+                finally:
+                    worker.lock.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self.workers),
+            "alive": sum(1 for w in self.workers if w.alive()),
+            "restarts": sum(w.restarts for w in self.workers),
+        }
+
+    def stop(self) -> None:
+        for worker in self.workers:
+            with worker.lock:
+                worker.stop()
+
+
+class WorkerSupervisor:
+    """Owns one worker pool per tool and a monitor thread restarting crashes."""
+
+    def __init__(self, tools_dir: Path, tools: List[str], size: int = 2, timeout: float = 60.0,
+                 monitor_interval: float = 5.0, python: str = sys.executable):
+        self.pools: Dict[str, WorkerPool] = {
+            tool: WorkerPool(tools_dir / f"{tool}_cli.py", size, timeout, python) for tool in tools
+        }
+        self.monitor_interval = monitor_interval
+        self._stopping = threading.Event()
+        self._monitor: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        for pool in self.pools.values():
+            pool.start()
+        self._stopping.clear()
+        self._monitor = threading.Thread(target=self._monitor_loop, name="tool-worker-monitor", daemon=True)
+        self._monitor.start()
+
+    def _monitor_loop(self) -> None:
+        while not self._stopping.wait(self.monitor_interval):
+            for pool in self.pools.values():
+                pool.restart_dead()
+
+    def call(self, tool: str, command: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        return self.pools[tool].call(command, args)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {tool: pool.stats() for tool, pool in self.pools.items()}
+
+    def shutdown(self) -> None:
+        self._stopping.set()
+        if self._monitor is not None:
+            self._monitor.join(timeout=self.monitor_interval)
+        for pool in self.pools.values():
+            pool.stop()
@@ -3,13 +3,23 @@ LangGraph Workflow - Deterministic State Machine for Email Agent
 
 This module implements the core orchestration logic using LangGraph's StateGraph.
 It replaces the unreliable LLM instruction-following with a deterministic workflow.
+
+Every node has a sync and an async implementation sharing the same prompts.
+`agent_workflow.invoke` runs the sync nodes and `agent_workflow.ainvoke` the
+async ones, which await the LLM (`ChatOpenAI.ainvoke`) and the tools without
+tying up a thread per session. `astream_response` additionally streams the
+tokens of the answer-generating nodes as they are produced.
 """
+import os
 import json
-import subprocess
-from typing import TypedDict, Literal, Annotated
+from typing import AsyncIterator, TypedDict, Literal, Annotated
 from langgraph.graph import StateGraph, END
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableLambda
+
+from .tool_executor import executor
+from .intent_classifier import get_classifier, is_confident
 
 
 # Define the state structure
@@ -27,14 +37,10 @@ class AgentState(TypedDict):
 llm = ChatOpenAI(model="gpt-4", temperature=0.7)
 
 
-def classify_intent(state: AgentState) -> AgentState:
-    """
-    Classify user intent using LLM.
-    This is the ONLY place where LLM is used for decision-making,
-    and the output is strictly constrained to one of the defined intents.
-    """
-    user_input = state["user_input"]
-    
+VALID_INTENTS = ["DRAFT_EMAIL", "RETRIEVE_INFO", "MANAGE_INBOX", "READ_EMAIL", "UNKNOWN"]
+
+
+def _intent_messages(user_input: str) -> list:
     system_prompt = """You are an intent classifier for an AI email agent.
     
 Classify the user's request into ONE of these intents:
@@ -46,20 +52,67 @@ Classify the user's request into ONE of these intents:
 
 Respond with ONLY the intent name, nothing else."""
     
-    messages = [
+    return [
         SystemMessage(content=system_prompt),
         HumanMessage(content=f"User request: {user_input}")
     ]
-    
-    response = llm.invoke(messages)
-    intent = response.content.strip()
+
+
+def _parse_intent(content: str) -> str:
+    intent = content.strip()
     
     # Validate intent
-    valid_intents = ["DRAFT_EMAIL", "RETRIEVE_INFO", "MANAGE_INBOX", "READ_EMAIL", "UNKNOWN"]
-    if intent not in valid_intents:
+    if intent not in VALID_INTENTS:
         intent = "UNKNOWN"
-    
+    return intent
+
+
+# Local classifications below this confidence are escalated to the LLM (set
+# above 1 to always use the LLM). Calibrated with
+# `scripts/eval_intent_classifier.py --calibrate` on held-out utterances: the
+# local answers accepted at 0.55 were all correct there.
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.55"))
+# Inbox actions change the mailbox, so they need a near-certain local answer;
+# kept well above their calibrated value, which rests on few examples
+INTENT_ACTION_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_ACTION_CONFIDENCE_THRESHOLD", "0.85"))
+
+
+def _classify_locally(state: AgentState) -> bool:
+    """Try the local classifier; return True if its answer is confident enough."""
+    text = state["user_input"]
+    intent, confidence = get_classifier().classify(text)
+    state["context"]["intent_confidence"] = confidence
+    if not is_confident(text, intent, confidence, INTENT_CONFIDENCE_THRESHOLD, INTENT_ACTION_CONFIDENCE_THRESHOLD):
+        return False
     state["intent"] = intent
+    state["context"]["intent_source"] = "local"
+    return True
+
+
+def classify_intent(state: AgentState) -> AgentState:
+    """
+    Classify user intent.
+    The local example-based classifier answers confident cases; ambiguous
+    requests fall back to the LLM. Either way the output is strictly
+    constrained to one of the defined intents.
+    """
+    if _classify_locally(state):
+        return state
+    
+    response = llm.invoke(_intent_messages(state["user_input"]))
+    state["intent"] = _parse_intent(response.content)
+    state["context"]["intent_source"] = "llm"
+    return state
+
+
+async def aclassify_intent(state: AgentState) -> AgentState:
+    """Async variant of classify_intent."""
+    if _classify_locally(state):
+        return state
+    
+    response = await llm.ainvoke(_intent_messages(state["user_input"]))
+    state["intent"] = _parse_intent(response.content)
+    state["context"]["intent_source"] = "llm"
     return state
 
 
@@ -79,20 +132,7 @@ def route_by_intent(state: AgentState) -> str:
         return "handle_unknown"
 
 
-def draft_email(state: AgentState) -> AgentState:
-    """Handle email drafting workflow."""
-    user_input = state["user_input"]
-    
-    # Step 1: Search RAG for relevant templates/context
-    rag_result = subprocess.run(
-        ["python", "tools/rag_cli.py", "search", "--query", user_input, "--limit", "3"],
-        capture_output=True,
-        text=True
-    )
-    
-    rag_data = json.loads(rag_result.stdout) if rag_result.returncode == 0 else {"results": []}
-    
-    # Step 2: Use LLM to generate draft with RAG context
+def _draft_messages(user_input: str, rag_data: dict) -> list:
     context_text = "\n\n".join([r["content"] for r in rag_data.get("results", [])])
     
     system_prompt = f"""You are an email drafting assistant.
@@ -105,33 +145,49 @@ Relevant context from knowledge base:
 Draft a professional email based on the user's request and the provided context.
 Include appropriate subject line and body."""
     
-    messages = [SystemMessage(content=system_prompt)]
-    response = llm.invoke(messages)
+    return [SystemMessage(content=system_prompt)]
+
+
+DRAFT_PREFIX = "I've drafted an email for you:\n\n"
+DRAFT_SUFFIX = "\n\nWould you like me to send it or make changes?"
+
+
+def _apply_draft(state: AgentState, draft: str) -> AgentState:
+    state["draft"] = draft
+    state["final_response"] = f"{DRAFT_PREFIX}{draft}{DRAFT_SUFFIX}"
+    return state
+
+
+def draft_email(state: AgentState) -> AgentState:
+    """Handle email drafting workflow."""
+    user_input = state["user_input"]
+    
+    # Step 1: Search RAG for relevant templates/context
+    rag_data = executor.search_knowledge(user_input, limit=3)
     
-    state["draft"] = response.content
-    state["final_response"] = f"I've drafted an email for you:\n\n{response.content}\n\nWould you like me to send it or make changes?"
+    # Step 2: Use LLM to generate draft with RAG context
+    response = llm.invoke(_draft_messages(user_input, rag_data))
     
-    return state
+    return _apply_draft(state, response.content)
 
 
-def retrieve_info(state: AgentState) -> AgentState:
-    """Handle information retrieval from RAG."""
+async def adraft_email(state: AgentState) -> AgentState:
+    """Async variant of draft_email."""
     user_input = state["user_input"]
     
-    # Search RAG knowledge base
-    rag_result = subprocess.run(
-        ["python", "tools/rag_cli.py", "search", "--query", user_input, "--limit", "5"],
-        capture_output=True,
-        text=True
-    )
+    rag_data = await executor.asearch_knowledge(user_input, limit=3)
+    response = await llm.ainvoke(_draft_messages(user_input, rag_data))
     
-    rag_data = json.loads(rag_result.stdout) if rag_result.returncode == 0 else {"results": []}
+    return _apply_draft(state, response.content)
+
+
+NO_INFO_RESPONSE = "I couldn't find relevant information in the knowledge base for that question."
+
+
+def _answer_messages(user_input: str, rag_data: dict) -> list:
+    context_text = "\n\n".join([f"- {r['content']}" for r in rag_data["results"]])
     
-    if rag_data.get("results"):
-        # Use LLM to synthesize answer from results
-        context_text = "\n\n".join([f"- {r['content']}" for r in rag_data["results"]])
-        
-        system_prompt = f"""You are a helpful assistant with access to the company knowledge base.
+    system_prompt = f"""You are a helpful assistant with access to the company knowledge base.
 
 User question: {user_input}
 
@@ -139,22 +195,60 @@ Relevant information from knowledge base:
 {context_text}
 
 Provide a clear, concise answer to the user's question based on this information."""
-        
-        messages = [SystemMessage(content=system_prompt)]
-        response = llm.invoke(messages)
-        
+    
+    return [SystemMessage(content=system_prompt)]
+
+
+def _apply_faq(state: AgentState, faq_data: dict) -> bool:
+    """Answer with a matched FAQ's stored answer; False when nothing matched."""
+    match = faq_data.get("match") if faq_data.get("status") == "success" else None
+    if not match:
+        return False
+    state["context"]["faq_id"] = match["id"]
+    state["final_response"] = match["answer"]
+    return True
+
+
+def retrieve_info(state: AgentState) -> AgentState:
+    """Handle information retrieval from RAG."""
+    user_input = state["user_input"]
+    
+    # Common questions are answered from the FAQs without search or LLM
+    if _apply_faq(state, executor.match_faq(user_input)):
+        return state
+    
+    # Search RAG knowledge base
+    rag_data = executor.search_knowledge(user_input, limit=5)
+    
+    if rag_data.get("results"):
+        # Use LLM to synthesize answer from results
+        response = llm.invoke(_answer_messages(user_input, rag_data))
         state["final_response"] = response.content
     else:
-        state["final_response"] = "I couldn't find relevant information in the knowledge base for that question."
+        state["final_response"] = NO_INFO_RESPONSE
     
     return state
 
 
-def manage_inbox(state: AgentState) -> AgentState:
-    """Handle inbox management tasks (label, archive, etc.)."""
+async def aretrieve_info(state: AgentState) -> AgentState:
+    """Async variant of retrieve_info."""
     user_input = state["user_input"]
     
-    # Use LLM to extract action and parameters
+    if _apply_faq(state, await executor.amatch_faq(user_input)):
+        return state
+    
+    rag_data = await executor.asearch_knowledge(user_input, limit=5)
+    
+    if rag_data.get("results"):
+        response = await llm.ainvoke(_answer_messages(user_input, rag_data))
+        state["final_response"] = response.content
+    else:
+        state["final_response"] = NO_INFO_RESPONSE
+    
+    return state
+
+
+def _inbox_action_messages(user_input: str) -> list:
     system_prompt = f"""Extract the email management action from this request: "{user_input}"
 
 Respond in JSON format:
@@ -164,8 +258,20 @@ Respond in JSON format:
   "label_name": "label name if action is label"
 }}"""
     
-    messages = [SystemMessage(content=system_prompt)]
-    response = llm.invoke(messages)
+    return [SystemMessage(content=system_prompt)]
+
+
+INBOX_ERROR_RESPONSE = "I encountered an error while managing your inbox."
+ARCHIVED_RESPONSE = "I've archived the email."
+UNKNOWN_INBOX_ACTION_RESPONSE = "I'm not sure how to handle that inbox management request."
+
+
+def manage_inbox(state: AgentState) -> AgentState:
+    """Handle inbox management tasks (label, archive, etc.)."""
+    user_input = state["user_input"]
+    
+    # Use LLM to extract action and parameters
+    response = llm.invoke(_inbox_action_messages(user_input))
     
     try:
         action_data = json.loads(response.content)
@@ -174,55 +280,68 @@ Respond in JSON format:
         
         if not message_id:
             # Try to get the latest email
-            list_result = subprocess.run(
-                ["python", "tools/email_cli.py", "list", "--query", "", "--max-results", "1"],
-                capture_output=True,
-                text=True
-            )
-            list_data = json.loads(list_result.stdout)
+            list_data = executor.list_emails(query="", max_results=1)
             if list_data.get("emails"):
                 message_id = list_data["emails"][0]["id"]
         
         if action == "label":
             label_name = action_data.get("label_name", "Important")
-            result = subprocess.run(
-                ["python", "tools/email_cli.py", "label", "--message-id", message_id, "--label", label_name],
-                capture_output=True,
-                text=True
-            )
+            result = executor.label_email(message_id, label_name)
             state["final_response"] = f"I've labeled the email with '{label_name}'."
         
         elif action == "archive":
-            result = subprocess.run(
-                ["python", "tools/email_cli.py", "archive", "--message-id", message_id],
-                capture_output=True,
-                text=True
-            )
-            state["final_response"] = "I've archived the email."
+            result = executor.archive_email(message_id)
+            state["final_response"] = ARCHIVED_RESPONSE
         
         else:
-            state["final_response"] = "I'm not sure how to handle that inbox management request."
+            state["final_response"] = UNKNOWN_INBOX_ACTION_RESPONSE
     
     except Exception as e:
         state["error"] = str(e)
-        state["final_response"] = "I encountered an error while managing your inbox."
+        state["final_response"] = INBOX_ERROR_RESPONSE
     
     return state
 
 
-def read_email(state: AgentState) -> AgentState:
-    """Handle reading emails aloud."""
+async def amanage_inbox(state: AgentState) -> AgentState:
+    """Async variant of manage_inbox."""
     user_input = state["user_input"]
     
-    # Get recent emails
-    list_result = subprocess.run(
-        ["python", "tools/email_cli.py", "list", "--query", "is:unread", "--max-results", "5"],
-        capture_output=True,
-        text=True
-    )
+    response = await llm.ainvoke(_inbox_action_messages(user_input))
     
-    list_data = json.loads(list_result.stdout) if list_result.returncode == 0 else {"emails": []}
+    try:
+        action_data = json.loads(response.content)
+        action = action_data.get("action")
+        message_id = action_data.get("message_id")
+        
+        if not message_id:
+            list_data = await executor.alist_emails(query="", max_results=1)
+            if list_data.get("emails"):
+                message_id = list_data["emails"][0]["id"]
+        
+        if action == "label":
+            label_name = action_data.get("label_name", "Important")
+            result = await executor.alabel_email(message_id, label_name)
+            state["final_response"] = f"I've labeled the email with '{label_name}'."
+        
+        elif action == "archive":
+            result = await executor.aarchive_email(message_id)
+            state["final_response"] = ARCHIVED_RESPONSE
+        
+        else:
+            state["final_response"] = UNKNOWN_INBOX_ACTION_RESPONSE
     
+    except Exception as e:
+        state["error"] = str(e)
+        state["final_response"] = INBOX_ERROR_RESPONSE
+    
+    return state
+
+
+NO_UNREAD_RESPONSE = "You have no unread emails."
+
+
+def _apply_unread_summary(state: AgentState, list_data: dict) -> AgentState:
     if list_data.get("emails"):
         # Summarize the emails
         email_summaries = []
@@ -232,29 +351,50 @@ def read_email(state: AgentState) -> AgentState:
         summary_text = "\n".join(email_summaries)
         state["final_response"] = f"Here are your recent unread emails:\n\n{summary_text}"
     else:
-        state["final_response"] = "You have no unread emails."
+        state["final_response"] = NO_UNREAD_RESPONSE
     
     return state
 
 
+def read_email(state: AgentState) -> AgentState:
+    """Handle reading emails aloud."""
+    # Get recent emails
+    list_data = executor.list_emails(query="is:unread", max_results=5)
+    return _apply_unread_summary(state, list_data)
+
+
+async def aread_email(state: AgentState) -> AgentState:
+    """Async variant of read_email."""
+    list_data = await executor.alist_emails(query="is:unread", max_results=5)
+    return _apply_unread_summary(state, list_data)
+
+
+UNKNOWN_RESPONSE = "I'm not sure how to help with that. Could you rephrase your request?"
+
+
 def handle_unknown(state: AgentState) -> AgentState:
     """Handle unknown or unclear intents."""
-    state["final_response"] = "I'm not sure how to help with that. Could you rephrase your request?"
+    state["final_response"] = UNKNOWN_RESPONSE
     return state
 
 
+async def ahandle_unknown(state: AgentState) -> AgentState:
+    """Async variant of handle_unknown."""
+    return handle_unknown(state)
+
+
 # Build the workflow graph
 def create_workflow() -> StateGraph:
     """Create and return the LangGraph workflow."""
     workflow = StateGraph(AgentState)
     
-    # Add nodes
-    workflow.add_node("classify_intent", classify_intent)
-    workflow.add_node("draft_email", draft_email)
-    workflow.add_node("retrieve_info", retrieve_info)
-    workflow.add_node("manage_inbox", manage_inbox)
-    workflow.add_node("read_email", read_email)
-    workflow.add_node("handle_unknown", handle_unknown)
+    # Add nodes (sync implementation for invoke, async for ainvoke)
+    workflow.add_node("classify_intent", RunnableLambda(classify_intent, afunc=aclassify_intent))
+    workflow.add_node("draft_email", RunnableLambda(draft_email, afunc=adraft_email))
+    workflow.add_node("retrieve_info", RunnableLambda(retrieve_info, afunc=aretrieve_info))
+    workflow.add_node("manage_inbox", RunnableLambda(manage_inbox, afunc=amanage_inbox))
+    workflow.add_node("read_email", RunnableLambda(read_email, afunc=aread_email))
+    workflow.add_node("handle_unknown", RunnableLambda(handle_unknown, afunc=ahandle_unknown))
     
     # Set entry point
     workflow.set_entry_point("classify_intent")
@@ -286,6 +426,17 @@ def create_workflow() -> StateGraph:
 agent_workflow = create_workflow()
 
 
+def _initial_state(user_input: str) -> AgentState:
+    return {
+        "user_input": user_input,
+        "intent": "UNKNOWN",
+        "context": {},
+        "draft": "",
+        "final_response": "",
+        "error": ""
+    }
+
+
 def process_user_input(user_input: str) -> str:
     """
     Process user input through the workflow and return the final response.
@@ -296,14 +447,70 @@ def process_user_input(user_input: str) -> str:
     Returns:
         The agent's text response (to be converted to speech)
     """
-    initial_state = {
-        "user_input": user_input,
-        "intent": "UNKNOWN",
-        "context": {},
-        "draft": "",
-        "final_response": "",
-        "error": ""
-    }
-    
-    result = agent_workflow.invoke(initial_state)
+    result = agent_workflow.invoke(_initial_state(user_input))
     return result["final_response"]
+
+
+async def aprocess_user_input(user_input: str) -> str:
+    """Async variant of process_user_input, for use from the API server."""
+    result = await agent_workflow.ainvoke(_initial_state(user_input))
+    return result["final_response"]
+
+
+# Fixed response texts, pre-rendered to speech at startup
+CONSTANT_RESPONSES = [
+    DRAFT_PREFIX,
+    DRAFT_SUFFIX,
+    NO_INFO_RESPONSE,
+    INBOX_ERROR_RESPONSE,
+    ARCHIVED_RESPONSE,
+    UNKNOWN_INBOX_ACTION_RESPONSE,
+    NO_UNREAD_RESPONSE,
+    UNKNOWN_RESPONSE,
+]
+
+
+# Nodes whose LLM output is the spoken answer, with the text that precedes
+# their tokens in final_response
+STREAMED_NODES = {
+    "draft_email": DRAFT_PREFIX,
+    "retrieve_info": "",
+}
+
+
+async def astream_response(user_input: str) -> AsyncIterator[str]:
+    """
+    Stream the agent's response as text deltas.
+    
+    Tokens from the draft_email and retrieve_info LLM calls are yielded as
+    they arrive; whatever final_response holds beyond them (the draft's
+    closing question, or the whole response of the other nodes) follows
+    once the workflow ends. The concatenated deltas equal the string
+    aprocess_user_input returns.
+    """
+    streamed = ""
+    final_state = None
+    
+    async for mode, payload in agent_workflow.astream(
+        _initial_state(user_input), stream_mode=["messages", "values"]
+    ):
+        if mode == "values":
+            final_state = payload
+            continue
+        
+        chunk, metadata = payload
+        node = metadata.get("langgraph_node")
+        if node not in STREAMED_NODES or not isinstance(chunk.content, str) or not chunk.content:
+            continue
+        
+        delta = chunk.content
+        if not streamed:
+            delta = STREAMED_NODES[node] + delta
+        streamed += delta
+        yield delta
+    
+    final_response = final_state["final_response"] if final_state else ""
+    if final_response.startswith(streamed):
+        rest = final_response[len(streamed):]
+        if rest:
+            yield rest
@@ -0,0 +1,42 @@
+"""
+Shared rows and queries for the knowledge base index tests.
+"""
+import numpy as np
+
+
+def make_rows(n, dim=8, seed=0, clusters=0):
+    """
+    `n` document rows with random embeddings, alternating faq/policy doc_types.
+    With `clusters`, the embeddings are spread around that many centres.
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim)) if clusters else None
+
+    def embedding(i):
+        if centres is None:
+            return rng.normal(size=dim)
+        return centres[i % clusters] + 0.5 * rng.normal(size=dim)
+
+    return [
+        {
+            "id": f"doc-{i}",
+            "content": f"content {i}",
+            "metadata": {"n": i},
+            "doc_type": "faq" if i % 2 else "policy",
+            "category": "billing",
+            "title": None,
+            "embedding": embedding(i).tolist(),
+        }
+        for i in range(n)
+    ]
+
+
+def random_query(dim, seed=1):
+    return np.random.default_rng(seed).normal(size=dim).astype(np.float32)
+
+
+def exact_top(rows, query, limit):
+    """Ids of the `limit` rows most cosine-similar to `query`."""
+    matrix = np.array([r["embedding"] for r in rows], dtype=np.float32)
+    scores = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query))
+    return [rows[i]["id"] for i in np.argsort(-scores)[:limit]]
@@ -0,0 +1,89 @@
+"""
+Tests for batched embedding generation.
+"""
+import sys
+import os
+import threading
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from openai import BadRequestError, RateLimitError
+
+# Add tools directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tools')))
+
+from batch_embedder import BatchEmbedder, pack_batches
+from embedding_cache import EmbeddingCache
+
+
+def api_error(cls, status):
+    request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+    return cls("error", response=httpx.Response(status, request=request), body=None)
+
+
+class FakeEmbeddings:
+    """Embeds a text as [len(text)], returning items out of order like the API may."""
+
+    def __init__(self, fail=None):
+        self.calls = []
+        self.fail = fail or (lambda batch, attempt: None)
+        self._lock = threading.Lock()
+
+    def create(self, model, input):
+        with self._lock:
+            self.calls.append(list(input))
+            error = self.fail(input, len(self.calls))
+        if error is not None:
+            raise error
+        data = [SimpleNamespace(index=i, embedding=[float(len(text))]) for i, text in enumerate(input)]
+        return SimpleNamespace(data=list(reversed(data)))
+
+
+def embedder(embeddings, **params):
+    client = SimpleNamespace(embeddings=embeddings)
+    return BatchEmbedder(client, cache=EmbeddingCache(path=""), backoff=0, **params)
+
+
+def test_pack_batches_respects_token_and_input_limits():
+    texts = ["x" * 40] * 5  # 10 tokens each
+
+    assert pack_batches(texts, max_tokens=25, max_inputs=10) == [[0, 1], [2, 3], [4]]
+    assert pack_batches(texts, max_tokens=1000, max_inputs=3) == [[0, 1, 2], [3, 4]]
+
+
+def test_embed_keeps_order_and_deduplicates():
+    embeddings = FakeEmbeddings()
+    batcher = embedder(embeddings, max_batch_tokens=1000, max_batch_inputs=2)
+
+    texts = ["a", "bb", "A ", "ccc", "bb", "dddd"]
+    assert batcher.embed(texts) == [[1.0], [2.0], [1.0], [3.0], [2.0], [4.0]]
+    assert sorted(text for call in embeddings.calls for text in call) == ["a", "bb", "ccc", "dddd"]
+    assert len(embeddings.calls) == 2
+
+    # Everything is cached now
+    assert batcher.embed(["ccc", "a"]) == [[3.0], [1.0]]
+    assert len(embeddings.calls) == 2
+
+
+def test_transient_errors_are_retried():
+    embeddings = FakeEmbeddings(fail=lambda batch, n: api_error(RateLimitError, 429) if n < 3 else None)
+
+    assert embedder(embeddings, max_retries=3).embed(["one", "three"]) == [[3.0], [5.0]]
+    assert len(embeddings.calls) == 3
+
+    down = FakeEmbeddings(fail=lambda batch, n: api_error(RateLimitError, 429))
+    with pytest.raises(RateLimitError):
+        embedder(down, max_retries=2).embed(["one"])
+    assert len(down.calls) == 3
+
+
+def test_rejected_batch_is_split_to_the_bad_input():
+    embeddings = FakeEmbeddings(fail=lambda batch, n: api_error(BadRequestError, 400) if "bad" in batch else None)
+    batcher = embedder(embeddings)
+
+    with pytest.raises(BadRequestError):
+        batcher.embed(["one", "two", "bad", "four"])
+    assert ["bad"] in embeddings.calls
+    # The good inputs were embedded and cached on the way
+    assert batcher.cache.get(batcher.model, "one") == [3.0]
@@ -0,0 +1,135 @@
+"""
+Tests for the bulk COPY / multi-row REST writers.
+"""
+import sys
+import os
+import json
+import struct
+import uuid
+
+import psycopg2
+
+# Add tools directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tools')))
+
+from bulk_writer import COPY_SIGNATURE, CopyWriter, encode_binary, encode_csv, rest_insert, with_ids
+
+
+COLUMNS = {"id": "uuid", "content": "text", "metadata": "jsonb", "embedding": "vector", "chunk_index": "int4"}
+DOC_ID = "2f1c4a8e-54b4-4b8e-9a63-0c3b4e0f2d11"
+
+
+def decode_binary(data):
+    """Parse a COPY binary stream back into lists of raw field bytes."""
+    assert data.startswith(COPY_SIGNATURE)
+    position = len(COPY_SIGNATURE) + 8
+    rows = []
+    while True:
+        (count,) = struct.unpack_from(">h", data, position)
+        position += 2
+        if count == -1:
+            assert position == len(data)
+            return rows
+        fields = []
+        for _ in range(count):
+            (length,) = struct.unpack_from(">i", data, position)
+            position += 4
+            fields.append(None if length == -1 else data[position:position + length])
+            position += max(length, 0)
+        rows.append(fields)
+
+
+def test_binary_encoding_uses_pgvector_wire_format():
+    rows = [{"id": DOC_ID, "content": "héllo", "metadata": {"a": 1}, "embedding": [0.5, -1.0, 2.0], "chunk_index": 3},
+            {"id": DOC_ID, "content": "", "metadata": None, "embedding": None}]
+
+    first, second = decode_binary(encode_binary(rows, COLUMNS))
+
+    assert first[0] == uuid.UUID(DOC_ID).bytes
+    assert first[1] == "héllo".encode("utf-8")
+    assert first[2][:1] == b"\x01" and json.loads(first[2][1:]) == {"a": 1}
+    assert first[3] == struct.pack(">hhfff", 3, 0, 0.5, -1.0, 2.0)
+    assert first[4] == struct.pack(">i", 3)
+    assert second == [uuid.UUID(DOC_ID).bytes, b"", None, None, None]
+
+
+def test_csv_encoding_distinguishes_null_from_empty():
+    data = encode_csv([{"id": DOC_ID, "content": 'say "hi"', "metadata": {}, "embedding": [0.1, 2.0]},
+                       {"id": DOC_ID, "content": ""}], COLUMNS)
+
+    assert data.decode("utf-8").split("\n") == [
+        f'"{DOC_ID}","say ""hi""","{{}}","[0.1,2]",',
+        f'"{DOC_ID}","",,,',
+        "",
+    ]
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def copy_expert(self, sql, stream):
+        if "binary" in sql and self.conn.reject_binary:
+            raise psycopg2.DataError("incorrect binary data format")
+        self.conn.copies.append((sql, stream.read()))
+
+
+class FakeConnection:
+    def __init__(self, reject_binary=False):
+        self.reject_binary = reject_binary
+        self.copies = []
+        self.transactions = 0
+
+    def __enter__(self):
+        self.transactions += 1
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+def test_copy_writer_batches_and_falls_back_to_csv():
+    rows = with_ids({"content": f"doc {i}", "embedding": [float(i)]} for i in range(5))
+    assert all(uuid.UUID(row["id"]) for row in rows)
+
+    conn = FakeConnection()
+    assert CopyWriter(conn, columns=COLUMNS, batch_size=2).write(rows) == 5
+    assert [len(decode_binary(data)) for _, data in conn.copies] == [2, 2, 1]
+    assert conn.transactions == 3
+
+    legacy = FakeConnection(reject_binary=True)
+    writer = CopyWriter(legacy, columns=COLUMNS, batch_size=2)
+    assert writer.write(rows) == 5
+    assert not writer.binary
+    assert all("FORMAT csv" in sql for sql, _ in legacy.copies)
+    assert legacy.copies[0][1].decode("utf-8").count("\n") == 2
+
+
+def test_rest_insert_sends_multi_row_batches():
+    calls = []
+
+    class Table:
+        def insert(self, payload, **options):
+            calls.append((payload, options))
+            return self
+
+        def execute(self):
+            return None
+
+    supabase = type("Supabase", (), {"table": lambda self, name: Table()})()
+    rows = [{"id": str(i), "content": "x", "embedding": [0.25, 1.0] if i else None} for i in range(3)]
+
+    assert rest_insert(supabase, "documents", rows, batch_size=2) == 3
+    assert [len(payload) for payload, _ in calls] == [2, 1]
+    assert calls[0][0][0]["embedding"] is None
+    assert calls[0][0][1]["embedding"] == "[0.25,1]"
+    assert str(calls[0][1]["returning"].value) == "minimal"
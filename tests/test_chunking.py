@@ -0,0 +1,68 @@
+"""
+Tests for token-budgeted document chunking.
+"""
+import sys
+import os
+
+# Add tools directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tools')))
+
+from chunking import chunk_csv, chunk_document, chunk_rows, chunk_text, count_tokens, parent_row
+
+
+def sentences(n):
+    return " ".join(f"Sentence number {i} talks about refunds and invoices." for i in range(n))
+
+
+def test_chunks_respect_budget_and_overlap():
+    text = "\n\n".join(sentences(6) for _ in range(5))
+    chunks = chunk_text(text, max_tokens=80, overlap_tokens=20)
+
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 80 for chunk in chunks)
+    # Each chunk repeats the end of the previous one
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.split(". ")[0].rstrip(".") in previous
+    assert chunk_text("Short text.", max_tokens=80) == ["Short text."]
+
+
+def test_markdown_chunks_carry_heading_path_and_keep_code_whole():
+    text = (
+        "# Guide\n\nIntro paragraph.\n\n"
+        "## Install\n\n" + sentences(20) + "\n\n"
+        "```\npip install x\n\n# not a heading\n```\n\n"
+        "## Usage\n\nRun it."
+    )
+    chunks = chunk_document(text, ".md", max_tokens=100, overlap_tokens=0)
+
+    assert chunks[0]["content"] == "# Guide\n\nIntro paragraph."
+    install = [c for c in chunks if c.get("section") == "Guide > Install"]
+    assert len(install) > 1
+    assert all(c["content"].startswith("# Guide\n## Install\n\n") for c in install)
+    assert any("pip install x\n\n# not a heading" in c["content"] for c in install)
+    assert chunks[-1]["section"] == "Guide > Usage"
+    assert [c["chunk_index"] for c in chunks] == list(range(len(chunks)))
+
+
+def test_csv_chunks_repeat_header_and_never_split_rows():
+    rows = "\n".join(f"{i},Customer {i},\"Note, with comma {i}\"" for i in range(60))
+    chunks = chunk_csv("id,name,note\n" + rows, max_tokens=60)
+
+    assert len(chunks) > 1
+    assert all(chunk.startswith("id,name,note\n") for chunk in chunks)
+    body = [line for chunk in chunks for line in chunk.split("\n")[1:]]
+    assert body == rows.split("\n")
+
+
+def test_chunk_rows_link_to_parent():
+    document = {"content": sentences(30), "metadata": {"file_type": ".txt"}, "doc_type": "policy"}
+    chunks = chunk_document(document["content"], ".txt", max_tokens=100, overlap_tokens=10)
+    parent = parent_row(document, len(chunks))
+    rows = chunk_rows(document, chunks, "parent-1")
+
+    assert parent["embedding"] is None and parent["metadata"]["chunk_count"] == len(chunks)
+    assert [row["chunk_index"] for row in rows] == list(range(len(chunks)))
+    assert all(row["parent_id"] == "parent-1" and row["doc_type"] == "policy" for row in rows)
+    assert rows[1]["metadata"] == {"file_type": ".txt", "parent_id": "parent-1",
+                                   "chunk_index": 1, "chunk_count": len(chunks)}
+    assert "chunk_count" not in document["metadata"]
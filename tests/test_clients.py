@@ -0,0 +1,65 @@
+"""
+Tests for the process-wide client registry.
+"""
+import sys
+import os
+import threading
+
+# Add tools directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tools')))
+
+from clients import ClientRegistry
+
+
+class FakeClient:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def make_registry(per_thread=False):
+    built = []
+
+    def factory():
+        client = FakeClient()
+        built.append(client)
+        return client
+
+    registry = ClientRegistry()
+    registry.register("fake", factory, close=FakeClient.close, check=lambda c: not c.closed, per_thread=per_thread)
+    return registry, built
+
+
+def test_client_is_built_lazily_and_shared():
+    registry, built = make_registry()
+
+    assert built == []
+    assert registry.get("fake") is registry.get("fake")
+    assert len(built) == 1
+    assert registry.health()["fake"] == {"initialized": True, "instances": 1, "healthy": True}
+
+
+def test_per_thread_clients():
+    registry, built = make_registry(per_thread=True)
+    seen = []
+
+    thread = threading.Thread(target=lambda: seen.append(registry.get("fake")))
+    thread.start()
+    thread.join()
+
+    assert registry.get("fake") is not seen[0]
+    assert registry.get("fake") is registry.get("fake")
+    assert registry.health()["fake"]["instances"] == 2
+
+
+def test_close_releases_clients():
+    registry, built = make_registry()
+    first = registry.get("fake")
+
+    registry.close()
+
+    assert first.closed
+    assert registry.health()["fake"]["initialized"] is False
+    assert registry.get("fake") is not first
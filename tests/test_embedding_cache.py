@@ -0,0 +1,55 @@
+"""
+Tests for the persistent embedding cache.
+"""
+import sys
+import os
+import time
+
+# Add tools directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tools')))
+
+from embedding_cache import EmbeddingCache, cache_key
+
+
+def test_key_uses_model_and_normalized_text():
+    assert cache_key("m", "What's our  refund policy") == cache_key("m", "what's our refund policy ")
+    assert cache_key("m", "refund policy") != cache_key("other", "refund policy")
+
+
+def test_vectors_persist_as_float32(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    EmbeddingCache(path).put("m", "hello", [0.5, -0.25, 0.1])
+
+    cache = EmbeddingCache(path)
+    vector = cache.get("m", "Hello")
+
+    assert vector[:2] == [0.5, -0.25]
+    assert abs(vector[2] - 0.1) < 1e-7
+    assert cache.get("m", "hello") == vector
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_expired_entries_are_misses(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    EmbeddingCache(path).put("m", "hello", [1.0])
+    time.sleep(0.01)
+
+    cache = EmbeddingCache(path, ttl_seconds=0.001)
+
+    assert cache.get("m", "hello") is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_get_or_create_computes_once():
+    cache = EmbeddingCache(None)
+    calls = []
+
+    def create(text):
+        calls.append(text)
+        return [1.0, 2.0]
+
+    assert cache.get_or_create("m", "q", create) == [1.0, 2.0]
+    assert cache.get_or_create("m", "q", create) == [1.0, 2.0]
+    assert calls == ["q"]
+    assert cache.stats()["hit_rate"] == 0.5
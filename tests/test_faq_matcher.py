@@ -0,0 +1,63 @@
+"""
+Tests for the FAQ matcher and its write-behind usage counter.
+"""
+import sys
+import os
+
+import numpy as np
+
+# Add tools directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tools')))
+
+from faq_matcher import FAQMatcher, UsageRecorder
+
+
+FAQS = [
+    {"id": "1", "question": "How do I update my payment method?", "answer": "Settings > Billing.",
+     "keywords": ["payment", "billing", "credit card"], "category": "Billing"},
+    {"id": "2", "question": "How do I reset my password?", "answer": "Use 'Forgot Password'.",
+     "keywords": ["password", "reset", "login"], "category": "Account"},
+]
+EMBEDDINGS = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]]
+
+
+def test_exact_question_needs_no_embedding():
+    matcher = FAQMatcher(FAQS, EMBEDDINGS)
+
+    assert matcher.exact("  how do I RESET my password? ")["id"] == "2"
+    assert matcher.exact("How do I change my password?") is None
+
+
+def test_match_adds_keyword_coverage_to_similarity():
+    matcher = FAQMatcher(FAQS, EMBEDDINGS, keyword_weight=0.1)
+
+    coverage = matcher.keyword_coverage("My credit card changed, where is billing?")
+    faq, score = matcher.match("I forgot my password and can't login", [0.2, 0.9, 0.0])
+
+    assert np.allclose(coverage, [2 / 3, 0.0])
+    assert faq["id"] == "2"
+    assert abs(score - (0.9 / np.hypot(0.2, 0.9) + 0.1 * 2 / 3)) < 1e-5
+    assert FAQMatcher([], []).match("anything", [1.0]) == (None, 0.0)
+
+
+def test_usage_is_batched_and_retried_after_failure():
+    written = []
+    fail = [True]
+
+    def flush(rows):
+        if fail[0]:
+            raise RuntimeError("database unavailable")
+        written.extend(rows)
+
+    recorder = UsageRecorder(flush, interval=3600)
+    for faq_id in ["1", "2", "1"]:
+        recorder.record(faq_id)
+
+    assert recorder.flush() == 0
+    assert recorder.pending() == 3
+
+    fail[0] = False
+    recorder.record("1")
+    assert recorder.flush() == 2
+    assert {row["id"]: row["count"] for row in written} == {"1": 3, "2": 1}
+    assert recorder.pending() == 0
@@ -0,0 +1,136 @@
+"""
+Tests for the HNSW approximate knowledge base index.
+"""
+import sys
+import os
+
+import numpy as np
+import pytest
+
+# Add tools directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tools')))
+
+import hnsw_index
+from hnsw_index import HNSWIndex, HnswlibIndex, load_hnsw_index
+from vector_index import VectorIndex, create_index
+from index_rows import make_rows
+
+
+def test_recall_against_exact_search():
+    rows = make_rows(500, dim=16, clusters=10)
+    exact = VectorIndex.from_rows(rows, dim=16)
+    hnsw = HNSWIndex.from_rows(rows, dim=16, M=8, ef_construction=64, seed=1)
+    queries = np.random.default_rng(2).normal(size=(20, 16))
+
+    hits = 0
+    for query in queries:
+        truth = {r["id"] for r in exact.search(query, limit=10, threshold=-1.0)}
+        found = {r["id"] for r in hnsw.search(query, limit=10, threshold=-1.0)}
+        hits += len(truth & found)
+
+    assert hits / 200 >= 0.95
+
+
+def test_remove_upsert_and_compaction():
+    rows = make_rows(50, dim=16, clusters=10)
+    index = HNSWIndex.from_rows(rows, dim=16, seed=1)
+
+    assert index.remove("doc-3")
+    assert not index.remove("doc-3")
+    assert "doc-3" not in index
+    assert all(r["id"] != "doc-3" for r in index.search(rows[3]["embedding"], limit=50, threshold=-1.0))
+
+    index.upsert({**rows[4], "content": "updated"})
+    assert len(index) == 49
+    assert index.search(rows[4]["embedding"], limit=1, threshold=0.99)[0]["content"] == "updated"
+
+    compacted = index.compacted()
+    assert compacted.deleted_fraction == 0.0
+    assert sorted(compacted.ids()) == sorted(index.ids())
+
+
+def test_filtered_search():
+    index = HNSWIndex.from_rows(make_rows(100, dim=16, clusters=10), dim=16, seed=1)
+    results = index.search(np.ones(16), limit=5, threshold=-1.0, doc_type="faq")
+
+    assert len(results) == 5
+    assert all(r["doc_type"] == "faq" for r in results)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    rows = make_rows(60, dim=16, clusters=10)
+    index = create_index("hnsw", dim=16, M=8, seed=1)
+    for row in rows:
+        index.upsert(row)
+    index.remove("doc-0")
+    path = str(tmp_path / "index.npz")
+
+    index.save(path)
+    loaded = load_hnsw_index(path)
+
+    assert sorted(loaded.ids()) == sorted(index.ids())
+    query = rows[7]["embedding"]
+    assert loaded.search(query, limit=5, threshold=-1.0) == index.search(query, limit=5, threshold=-1.0)
+
+
+def test_pure_python_fallback_without_hnswlib(monkeypatch, tmp_path):
+    monkeypatch.setattr(hnsw_index, "hnswlib", None)
+    index = create_index("hnsw", dim=16, M=8, seed=1)
+    path = str(tmp_path / "index.npz")
+    index.upsert(make_rows(1, dim=16, clusters=10)[0])
+    index.save(path)
+
+    assert isinstance(index, HNSWIndex)
+    assert isinstance(load_hnsw_index(path), HNSWIndex)
+    with pytest.raises(ImportError):
+        HnswlibIndex(dim=16)
+
+
+def test_hnswlib_engine_has_the_same_behaviour(tmp_path):
+    pytest.importorskip("hnswlib")
+    rows = make_rows(300, dim=16, clusters=10)
+    exact = VectorIndex.from_rows(rows, dim=16)
+    index = HnswlibIndex.from_rows(rows[:100], dim=16, M=8, seed=1)
+    for row in rows[100:]:
+        index.upsert(row)
+    query = rows[7]["embedding"]
+
+    found = {r["id"] for r in index.search(query, limit=10, threshold=-1.0)}
+    assert len(found & {r["id"] for r in exact.search(query, limit=10, threshold=-1.0)}) >= 9
+    assert all(r["doc_type"] == "faq" for r in index.search(query, limit=5, threshold=-1.0, doc_type="faq"))
+
+    assert index.remove("doc-7") and "doc-7" not in index
+    index.upsert({**rows[8], "content": "updated"})
+    assert index.search(rows[8]["embedding"], limit=1, threshold=0.99)[0]["content"] == "updated"
+    assert all(r["id"] != "doc-7" for r in index.search(query, limit=20, threshold=-1.0))
+
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+    loaded = load_hnsw_index(path)
+    assert isinstance(loaded, HnswlibIndex)
+    assert sorted(loaded.ids()) == sorted(index.ids())
+    assert loaded.search(query, limit=5, threshold=-1.0) == index.search(query, limit=5, threshold=-1.0)
+    with pytest.raises(ValueError):
+        HNSWIndex.load(path)
+    assert sorted(index.compacted().ids()) == sorted(index.ids())
+
+
+def test_large_cold_builds_need_hnswlib(monkeypatch):
+    monkeypatch.setattr(hnsw_index, "hnswlib", None)
+
+    assert hnsw_index.python_build_fits(hnsw_index.PYTHON_BUILD_LIMIT)
+    assert not hnsw_index.python_build_fits(hnsw_index.PYTHON_BUILD_LIMIT + 1)
+
+
+def test_hnswlib_filters_during_the_walk(monkeypatch):
+    pytest.importorskip("hnswlib")
+    rows = make_rows(300, dim=16, clusters=10)
+    index = HnswlibIndex.from_rows(rows, dim=16, M=8, seed=1)
+    # No exact scan of the filtered subset
+    monkeypatch.setattr(hnsw_index, "EXACT_SUBSET_LIMIT", 0)
+    query = rows[8]["embedding"]
+
+    results = index.search(query, limit=10, threshold=-1.0, doc_type="policy")
+
+    assert len(results) == 10
+    assert all(r["doc_type"] == "policy" for r in results)
@@ -0,0 +1,134 @@
+"""
+Tests for the bulk contact and FAQ imports (scripts/ingest_business_data.py), against
+the in-memory Supabase stand-in of test_sync_documents.py.
+"""
+import sys
+import os
+
+# Add tools and scripts directories to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tools')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'scripts')))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import ingest_business_data
+from ingest_business_data import (ensure_faq_categories, ingest_contacts, ingest_faqs, load_faq_categories,
+                                  merge_contacts, normalize_email)
+from test_sync_documents import FakeSupabase
+
+
+def test_merge_contacts_combines_duplicates_by_normalized_email():
+    contacts = [
+        {"email": " Ann@Example.com ", "name": "Ann", "company": "Acme", "metadata": {"a": 1}},
+        {"email": "bob@example.com", "name": "Bob"},
+        {"email": "ann@example.COM", "name": "", "role": "CTO", "metadata": {"b": 2}},
+        {"email": "not-an-address", "name": "Nobody"},
+        {"name": "No email"},
+    ]
+
+    merged, duplicates, invalid = merge_contacts(contacts)
+
+    assert normalize_email("@") is None
+    assert (duplicates, invalid) == (1, 2)
+    assert [c["email"] for c in merged] == ["ann@example.com", "bob@example.com"]
+    assert merged[0]["name"] == "Ann" and merged[0]["role"] == "CTO"
+    assert merged[0]["metadata"] == {"a": 1, "b": 2}
+
+
+def test_existing_addresses_are_updated_whatever_their_case(monkeypatch):
+    monkeypatch.setattr(ingest_business_data, "BULK_BATCH_SIZE", 5)
+    monkeypatch.setattr(ingest_business_data, "EMAIL_LOOKUP_SIZE", 2)
+    supabase = FakeSupabase()
+    supabase.tables["contacts"] = [{"id": "c1", "email": "ann@example.com", "name": "Ann"}]
+    contacts = [{"email": "ANN@example.com", "role": "CTO"}] + [
+        {"email": f"user{i}@example.com"} for i in range(6)
+    ]
+
+    stats = ingest_contacts(supabase, contacts)
+
+    assert stats == {"inserted": 6, "updated": 1, "merged": 0, "errors": 0}
+    assert len(supabase.tables["contacts"]) == 7
+    ann = supabase.tables["contacts"][0]
+    assert (ann["id"], ann["email"], ann["role"]) == ("c1", "ann@example.com", "CTO")
+    # Batches of 5 and 2 contacts, looked up 2 addresses at a time
+    assert supabase.calls.count(("contacts", "select")) == 3 + 1
+    assert supabase.calls.count(("contacts", "upsert")) == 2
+
+
+def test_a_failed_batch_counts_its_contacts_as_errors(monkeypatch):
+    monkeypatch.setattr(ingest_business_data, "BULK_BATCH_SIZE", 3)
+
+    class FailingSupabase(FakeSupabase):
+        def before_write(self, table, payload):
+            if any(row["email"] == "bad@example.com" for row in payload):
+                raise RuntimeError("constraint violation")
+
+    supabase = FailingSupabase()
+    contacts = [{"email": f"user{i}@example.com"} for i in range(3)] + [
+        {"email": "bad@example.com"}, {"email": "user3@example.com"}, {"email": ""}
+    ]
+
+    stats = ingest_contacts(supabase, contacts)
+
+    assert stats == {"inserted": 3, "updated": 0, "merged": 0, "errors": 2 + 1}
+    assert [row["email"] for row in supabase.tables["contacts"]] == [f"user{i}@example.com" for i in range(3)]
+
+
+def test_faq_categories_are_loaded_a_page_at_a_time(monkeypatch):
+    monkeypatch.setattr(ingest_business_data, "PAGE_SIZE", 2)
+    supabase = FakeSupabase()
+    supabase.tables["faq_categories"] = [{"id": f"cat-{i}", "name": f"Category {i}"} for i in range(5)]
+
+    categories = load_faq_categories(supabase)
+
+    assert categories == {f"Category {i}": f"cat-{i}" for i in range(5)}
+    assert supabase.calls.count(("faq_categories", "select")) == 3
+
+
+def test_missing_categories_are_created_in_one_upsert():
+    supabase = FakeSupabase()
+    supabase.tables["faq_categories"] = [{"id": "cat-1", "name": "Billing"}]
+    categories = {"Billing": "cat-1"}
+
+    ensure_faq_categories(supabase, ["Billing", "Shipping", "General", "Shipping"], categories)
+    ensure_faq_categories(supabase, ["Billing", "General"], categories)
+
+    assert supabase.calls == [("faq_categories", "upsert")]
+    assert sorted(row["name"] for row in supabase.tables["faq_categories"]) == ["Billing", "General", "Shipping"]
+    assert set(categories) == {"Billing", "General", "Shipping"}
+
+
+def test_faqs_are_written_in_batches_under_their_category(monkeypatch):
+    monkeypatch.setattr(ingest_business_data, "BULK_BATCH_SIZE", 2)
+    monkeypatch.setattr(ingest_business_data, "generate_embeddings",
+                        lambda texts, client: [[0.5, 0.5]] * len(texts))
+    supabase = FakeSupabase()
+    faqs = [{"question": f"Question {i}?", "answer": "Yes", "category": "Billing" if i % 2 else None}
+            for i in range(5)] + [{"question": "No answer?"}]
+
+    assert ingest_faqs(supabase, None, faqs) == (5, 1)
+
+    categories = {row["name"]: row["id"] for row in supabase.tables["faq_categories"]}
+    stored = supabase.tables["faqs"]
+    assert set(categories) == {"Billing", "General"}
+    general, billing = categories["General"], categories["Billing"]
+    assert [row["category_id"] for row in stored] == [general, billing, general, billing, general]
+    assert stored[0]["question_embedding"] == "[0.5,0.5]"
+    assert supabase.calls.count(("faqs", "insert")) == 3
+
+
+def test_failed_batch_embedding_falls_back_per_question(monkeypatch):
+    requests = []
+
+    def generate_embeddings(texts, client):
+        requests.append(list(texts))
+        if len(texts) > 1 or texts[0] == "Bad?":
+            raise RuntimeError("invalid input")
+        return [[1.0, 0.0]]
+
+    monkeypatch.setattr(ingest_business_data, "generate_embeddings", generate_embeddings)
+    supabase = FakeSupabase()
+    faqs = [{"question": question, "answer": "A"} for question in ("Good?", "Bad?", "Fine?")]
+
+    assert ingest_faqs(supabase, None, faqs) == (2, 1)
+    assert requests == [["Good?", "Bad?", "Fine?"], ["Good?"], ["Bad?"], ["Fine?"]]
+    assert [row["question"] for row in supabase.tables["faqs"]] == ["Good?", "Fine?"]
@@ -0,0 +1,93 @@
+"""
+Tests for the staged ingestion pipeline: fan-out, batching, errors and backpressure.
+"""
+import sys
+import os
+import threading
+
+# Add tools directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tools')))
+
+from ingest_pipeline import Pipeline, Stage
+
+
+def quiet(_message):
+    pass
+
+
+def test_items_flow_through_all_stages():
+    written = []
+    lock = threading.Lock()
+
+    def write(item):
+        with lock:
+            written.append(item)
+
+    pipeline = Pipeline([
+        Stage("read", lambda n: [n] if n % 3 else [], workers=3),
+        Stage("chunk", lambda n: [(n, 0), (n, 1)], workers=2),
+        Stage("write", write, workers=2),
+    ], report=quiet)
+
+    counters = pipeline.run(range(30))
+
+    assert sorted(written) == sorted((n, i) for n in range(30) if n % 3 for i in (0, 1))
+    assert counters["read"] == {"processed": 30, "emitted": 20, "errors": 0}
+    assert counters["write"]["processed"] == 40
+
+
+def test_batched_stage_groups_items():
+    sizes = []
+
+    def embed(batch):
+        sizes.append(len(batch))
+        return batch
+
+    pipeline = Pipeline([Stage("embed", embed, batch_size=4)], report=quiet)
+    pipeline.run(range(10))
+
+    assert sum(sizes) == 10
+    assert max(sizes) <= 4
+
+
+def test_failures_are_counted_and_do_not_stop_the_run():
+    messages = []
+
+    def read(n):
+        if n == 2:
+            raise ValueError("unreadable")
+        return [n]
+
+    pipeline = Pipeline([Stage("read", read, workers=2), Stage("write", lambda n: None)],
+                        report=messages.append)
+    counters = pipeline.run(range(5))
+
+    assert counters["read"]["errors"] == 1
+    assert counters["write"]["processed"] == 4
+    assert any("unreadable" in m for m in messages)
+
+
+def test_bounded_queues_hold_back_the_source():
+    release = threading.Event()
+    consumed = []
+
+    def source():
+        for n in range(100):
+            consumed.append(n)
+            yield n
+
+    def slow_write(n):
+        release.wait()
+
+    pipeline = Pipeline([Stage("read", lambda n: [n]), Stage("write", slow_write)],
+                        queue_size=2, report=quiet)
+    runner = threading.Thread(target=pipeline.run, args=(source(),))
+    runner.start()
+    runner.join(timeout=0.5)
+
+    # 2 queued per stage plus one item in each worker, then the feeder blocks
+    assert runner.is_alive()
+    assert len(consumed) <= 8
+    release.set()
+    runner.join(timeout=5)
+    assert len(consumed) == 100
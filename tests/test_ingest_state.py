@@ -0,0 +1,90 @@
+"""
+Tests for incremental ingestion state: hashes, sync plans and the manifest.
+"""
+import sys
+import os
+
+# Add tools directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tools')))
+
+from ingest_state import IngestState, content_hash, fetch_sources, sync_action
+
+
+def test_content_hash_covers_stored_fields_only():
+    row = {"content": "Refunds within 30 days.", "title": "Refunds", "metadata": {"b": 1, "a": 2}}
+
+    assert content_hash(row) == content_hash({**row, "metadata": {"a": 2, "b": 1}, "embedding": [0.1]})
+    assert content_hash(row) != content_hash({**row, "content": "Refunds within 60 days."})
+    assert content_hash(row) != content_hash({**row, "category": "billing"})
+
+
+def test_sync_action_classifies_sources():
+    assert sync_action("h1", None) == "new"
+    assert sync_action("h1", {"id": "1", "content_hash": "h1"}) == "unchanged"
+    assert sync_action("h2", {"id": "1", "content_hash": "h1"}) == "changed"
+    # An unfinished parent (no stored hash) is redone
+    assert sync_action("h1", {"id": "1", "content_hash": None}) == "changed"
+
+
+def test_manifest_round_trip_and_file_check(tmp_path):
+    path = str(tmp_path / "state" / "docs.json")
+    data_file = tmp_path / "policy.md"
+    data_file.write_text("v1")
+    stat = data_file.stat()
+
+    state = IngestState(path)
+    state.record("policy.md", "h1", "doc-1", stat)
+    state.record("old.md", "h0", "doc-0")
+    state.forget(["old.md"])
+    state.save()
+
+    reloaded = IngestState(path)
+    assert reloaded.file_unchanged("policy.md", stat) == "h1"
+    assert "old.md" not in reloaded
+    data_file.write_text("version 2")
+    assert reloaded.file_unchanged("policy.md", data_file.stat()) is None
+
+    with open(path, "w") as f:
+        f.write("{not json")
+    assert IngestState(path).entries == {}
+
+
+class FakeQuery:
+    def __init__(self, rows):
+        self.rows = rows
+        self.prefix = None
+        self.offset = self.end = 0
+
+    def __getattr__(self, name):
+        # select / is_ / not_ / order pass through
+        return self
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+    def like(self, column, pattern):
+        self.prefix = pattern.rstrip("%")
+        return self
+
+    def range(self, start, end):
+        self.offset, self.end = start, end
+        return self
+
+    def execute(self):
+        # LIKE wildcards: "_" matches any character
+        rows = [r for r in self.rows if self.prefix is None or
+                all(p in ("_", c) for p, c in zip(self.prefix, r["source_key"]))]
+        return type("Response", (), {"data": rows[self.offset:self.end + 1]})()
+
+
+def test_fetch_sources_pages_and_filters_prefix(monkeypatch):
+    import ingest_state
+    monkeypatch.setattr(ingest_state, "PAGE_SIZE", 2)
+    rows = [{"id": str(i), "source_key": f"/data/my_docs/{i}.md", "content_hash": f"h{i}"} for i in range(5)]
+    rows.append({"id": "x", "source_key": "/data/myXdocs/other.md", "content_hash": "hx"})
+    supabase = type("Supabase", (), {"table": lambda self, name: FakeQuery(rows)})()
+
+    sources = fetch_sources(supabase, "/data/my_docs/")
+
+    assert sorted(sources) == [f"/data/my_docs/{i}.md" for i in range(5)]
+    assert sources["/data/my_docs/3.md"] == {"id": "3", "content_hash": "h3"}
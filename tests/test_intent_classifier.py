@@ -0,0 +1,84 @@
+"""
+Tests for the local intent classifier and its LLM fallback.
+"""
+import sys
+import os
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+import src.workflow as workflow
+from src.intent_classifier import IntentClassifier, get_classifier, is_confident
+
+
+@pytest.mark.parametrize("text, intent", [
+    ("Draft a proposal email for Acme Corp about our new product", "DRAFT_EMAIL"),
+    ("What is our refund policy?", "RETRIEVE_INFO"),
+    ("Label the last email as important and archive it", "MANAGE_INBOX"),
+    ("Read me the subject lines of my unread emails", "READ_EMAIL"),
+    ("Send Tom an email about rescheduling our call", "DRAFT_EMAIL"),
+    ("Do I have any new emails?", "READ_EMAIL"),
+])
+def test_common_requests_are_classified_confidently(text, intent):
+    predicted, confidence = get_classifier().classify(text)
+
+    assert predicted == intent
+    assert is_confident(text, predicted, confidence, workflow.INTENT_CONFIDENCE_THRESHOLD,
+                        workflow.INTENT_ACTION_CONFIDENCE_THRESHOLD)
+
+
+def test_unrelated_text_has_low_confidence():
+    classifier = IntentClassifier({"A": ["archive the email"], "B": ["draft a reply"]})
+
+    assert classifier.classify("")[1] == 0.0
+    assert classifier.classify("quantum chromodynamics")[1] < 0.35
+
+
+@pytest.mark.parametrize("text", [
+    "What's our archive retention policy?",
+    "Don't archive anything",
+    "What does the important label mean?",
+    "no, don't label it",
+    "hi",
+])
+def test_questions_negations_and_chit_chat_are_not_inbox_actions(text):
+    predicted, confidence = get_classifier().classify(text)
+
+    assert predicted == "UNKNOWN" or not is_confident(
+        text, predicted, confidence, workflow.INTENT_CONFIDENCE_THRESHOLD, workflow.INTENT_ACTION_CONFIDENCE_THRESHOLD)
+
+
+def _state(user_input):
+    return {"user_input": user_input, "intent": "UNKNOWN", "context": {}, "draft": "", "final_response": "", "error": ""}
+
+
+def test_confident_requests_skip_the_llm(monkeypatch):
+    monkeypatch.setattr(workflow, "llm", FakeListChatModel(responses=[]))
+
+    result = workflow.classify_intent(_state("Archive this email"))
+
+    assert result["intent"] == "MANAGE_INBOX"
+    assert result["context"]["intent_source"] == "local"
+
+
+def test_ambiguous_requests_escalate_to_the_llm(monkeypatch):
+    monkeypatch.setattr(workflow, "llm", FakeListChatModel(responses=["RETRIEVE_INFO"]))
+
+    result = workflow.classify_intent(_state("zxqv"))
+
+    assert result["intent"] == "RETRIEVE_INFO"
+    assert result["context"]["intent_source"] == "llm"
+
+
+def test_negated_commands_escalate_however_confident(monkeypatch):
+    monkeypatch.setattr(workflow, "llm", FakeListChatModel(responses=["UNKNOWN"]))
+
+    result = workflow.classify_intent(_state("Don't archive anything"))
+
+    assert result["context"]["intent_confidence"] >= workflow.INTENT_ACTION_CONFIDENCE_THRESHOLD
+    assert result["context"]["intent_source"] == "llm"
+    assert result["intent"] == "UNKNOWN"
@@ -0,0 +1,64 @@
+"""
+Tests for the incremental business data readers (JSON sections and JSON Lines).
+"""
+import sys
+import os
+import io
+import json
+
+import pytest
+
+# Add tools directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tools')))
+
+import json_stream
+from json_stream import iter_json_lines, iter_json_sections, iter_records
+
+
+DATA = {
+    "version": 2,
+    "documents": [{"title": "Refunds", "content": "Within 30 days [see \"terms\"] {ok}"},
+                  {"title": "Hours", "content": "9–6, Mon\\Fri", "metadata": {"tags": [1, 2.5e3]}}],
+    "meta": [{"ignored": True}],
+    "contacts": [],
+    "faqs": [{"question": "Refunds?", "answer": "30 days"}],
+}
+
+
+def test_sections_match_json_load_across_small_reads(monkeypatch):
+    monkeypatch.setattr(json_stream, "READ_SIZE", 7)
+    text = json.dumps(DATA, indent=2)
+
+    records = list(iter_json_sections(io.StringIO(text)))
+
+    assert records == [("documents", DATA["documents"][0]), ("documents", DATA["documents"][1]),
+                       ("faqs", DATA["faqs"][0])]
+
+
+def test_malformed_and_empty_input():
+    assert list(iter_json_sections(io.StringIO(" { } "))) == []
+    with pytest.raises(ValueError, match="offset"):
+        list(iter_json_sections(io.StringIO('{"documents": [{"title": "a"}, {"title": ')))
+    with pytest.raises(ValueError):
+        list(iter_json_sections(io.StringIO('[{"title": "a"}]')))
+
+
+def test_json_lines_sections_by_type():
+    text = '{"type": "contact", "email": "a@b.co"}\n\n{"type": "FAQ", "question": "q"}\n{"type": "note"}\n'
+
+    records = list(iter_json_lines(io.StringIO(text)))
+
+    assert records == [("contacts", {"email": "a@b.co"}), ("faqs", {"question": "q"}), (None, {})]
+    with pytest.raises(ValueError, match="line 2"):
+        list(iter_json_lines(io.StringIO('{"type": "faq"}\n{oops\n')))
+
+
+def test_iter_records_picks_reader_by_suffix(tmp_path):
+    json_file = tmp_path / "data.json"
+    json_file.write_text(json.dumps({"proposals": [{"title": "T", "content": "C"}]}))
+    lines_file = tmp_path / "data.jsonl"
+    lines_file.write_text('{"type": "proposal", "title": "T", "content": "C"}\n')
+
+    expected = [("proposals", {"title": "T", "content": "C"})]
+    assert list(iter_records(json_file)) == expected
+    assert list(iter_records(lines_file)) == expected
@@ -0,0 +1,78 @@
+"""
+Tests for the BM25 keyword index and rank fusion.
+"""
+import sys
+import os
+
+# Add tools directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tools')))
+
+from lexical_index import BM25Index, exact_terms, fuse, tokenize
+
+
+def row(doc_id, content, title=None, doc_type="general", keywords=None):
+    return {"id": doc_id, "content": content, "metadata": {"keywords": keywords or []},
+            "doc_type": doc_type, "category": None, "title": title}
+
+
+CORPUS = [
+    row("1", "Invoice INV-2024-0042 was sent to Acme Corp in March.", title="Acme invoice"),
+    row("2", "Our refund policy allows returns within 30 days of purchase."),
+    row("3", "Refunds for annual plans are prorated.", doc_type="policy"),
+    row("4", "Product SKU-7731 is the wireless headset.", keywords=["headset", "audio"]),
+    row("5", "Contact Priya Raman for enterprise pricing."),
+    row("6", "Shipping takes three to five business days."),
+    row("7", "Password resets are done from the login page."),
+    row("8", "Business hours are nine to five on weekdays."),
+]
+
+
+def test_tokenize_keeps_identifiers_and_their_parts():
+    assert tokenize("What is the status of INV-2024-0042?") == ["status", "inv-2024-0042", "inv", "2024", "0042"]
+    assert exact_terms("Who handles Globex pricing, SKU-7731?") == ["sku-7731", "globex"]
+
+
+def test_identifier_query_is_decisive():
+    index = BM25Index.from_rows(CORPUS)
+
+    query = "status of invoice INV-2024-0042"
+    results = index.search(query, limit=3)
+
+    assert results[0]["id"] == "1"
+    assert index.is_decisive(query, results)
+    assert index.search("sku-7731")[0]["id"] == "4"
+    assert index.search("audio")[0]["id"] == "4"
+
+
+def test_common_terms_are_not_decisive():
+    index = BM25Index.from_rows(CORPUS)
+
+    results = index.search("What is our refund policy?", limit=3)
+
+    assert results[0]["id"] == "2"
+    assert not index.is_decisive("What is our refund policy?", results)
+    assert [r["id"] for r in index.search("refunds", doc_type="policy")] == ["3"]
+
+
+def test_incremental_updates():
+    index = BM25Index.from_rows(CORPUS)
+
+    index.upsert(row("5", "Contact Jordan Lee for enterprise pricing."))
+    assert index.search("priya") == []
+    assert index.search("jordan")[0]["id"] == "5"
+
+    assert index.remove("1")
+    assert not index.remove("1")
+    assert index.search("inv-2024-0042") == []
+    assert len(index) == 7
+
+
+def test_fuse_rewards_documents_in_both_rankings():
+    lexical = [{"id": "a", "content": "", "score": 5.0}, {"id": "b", "content": "", "score": 1.0}]
+    vector = [{"id": "b", "content": "", "similarity": 0.9}, {"id": "c", "content": "", "similarity": 0.8}]
+
+    fused = fuse(lexical, vector, limit=3)
+
+    assert [r["id"] for r in fused] == ["b", "a", "c"]
+    assert fused[0]["similarity"] == 0.9
+    assert fused[1]["similarity"] is None
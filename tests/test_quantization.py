@@ -0,0 +1,89 @@
+"""
+Tests for the quantized (sq8 / pq) knowledge base index.
+"""
+import sys
+import os
+
+import numpy as np
+import pytest
+
+# Add tools directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tools')))
+
+from quantization import ProductQuantizer, QuantizedIndex, ScalarQuantizer
+from vector_index import VectorIndex, create_index
+from index_rows import make_rows, random_query
+
+
+def test_scalar_quantizer_round_trip_is_close():
+    vectors = np.random.default_rng(0).normal(size=(200, 32)).astype(np.float32)
+    quantizer = ScalarQuantizer(32)
+    quantizer.train(vectors)
+
+    decoded = quantizer.decode(quantizer.encode(vectors))
+    query = vectors[0]
+
+    assert np.abs(decoded - vectors).max() < 0.05
+    assert np.allclose(quantizer.scores(quantizer.encode(vectors), query), decoded @ query, atol=1e-3)
+
+
+def test_product_quantizer_scores_match_decoded_vectors():
+    vectors = np.random.default_rng(0).normal(size=(300, 32)).astype(np.float32)
+    quantizer = ProductQuantizer(32, subspaces=8, iterations=5)
+    quantizer.train(vectors)
+    codes = quantizer.encode(vectors)
+
+    assert codes.shape == (300, 8)
+    assert np.allclose(quantizer.scores(codes, vectors[0]), quantizer.decode(codes) @ vectors[0], atol=1e-4)
+    with pytest.raises(ValueError):
+        ProductQuantizer(30, subspaces=8)
+
+
+@pytest.mark.parametrize("method,params", [("sq8", {}), ("pq", {"subspaces": 8})])
+def test_results_are_rescored_exactly(method, params):
+    rows = make_rows(400, dim=32, clusters=8)
+    exact = VectorIndex.from_rows(rows, dim=32)
+    index = QuantizedIndex.from_rows(rows, dim=32, method=method, rerank=10, **params)
+    query = random_query(32)
+
+    expected = exact.search(query, limit=5, threshold=-1.0)
+    results = index.search(query, limit=5, threshold=-1.0)
+
+    assert [r["id"] for r in results] == [r["id"] for r in expected]
+    assert [r["similarity"] for r in results] == pytest.approx([r["similarity"] for r in expected])
+    assert all(r["doc_type"] == "faq" for r in index.search(query, limit=5, threshold=-1.0, doc_type="faq"))
+
+
+def test_trains_after_train_size_and_tracks_removals():
+    rows = make_rows(40, dim=32, clusters=8)
+    index = create_index("sq8", dim=32, train_size=20)
+    for row in rows[:19]:
+        index.upsert(row)
+    assert not index.quantizer.trained
+
+    for row in rows[19:]:
+        index.upsert(row)
+    assert index.quantizer.trained
+
+    assert index.remove("doc-0")
+    assert len(index) == 39
+    own = index.search(rows[39]["embedding"], limit=1, threshold=0.99)
+    assert [r["id"] for r in own] == ["doc-39"]
+    assert index.memory_usage()["codes"] == 39 * 32
+
+
+def test_full_vectors_stay_on_disk_and_retraining_follows_growth(tmp_path):
+    rows = make_rows(100, dim=32, clusters=8)
+    index = create_index("pq", dim=32, train_size=20, train_sample=30, subspaces=8,
+                         iterations=3, vectors_dir=str(tmp_path))
+    for row in rows[:39]:
+        index.upsert(row)
+    assert isinstance(index._matrix, np.memmap)
+    assert index.trained_on == 20
+
+    for row in rows[39:]:
+        index.upsert(row)
+    assert index.trained_on == 80
+
+    results = index.search(rows[90]["embedding"], limit=1, threshold=0.99)
+    assert [r["id"] for r in results] == ["doc-90"]
@@ -0,0 +1,103 @@
+"""
+Tests for sentence-chunked speech synthesis.
+"""
+import sys
+import os
+import asyncio
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.speech_pipeline import (SentenceSplitter, delta_sentences, run_ahead, split_sentences,
+                                 synthesize_sentences, text_sentences)
+
+
+def test_split_sentences_merges_short_fragments():
+    text = "Hi John.\n\nThanks for reaching out about the proposal. I'll send it over today! Best."
+
+    assert split_sentences(text) == [
+        "Hi John. Thanks for reaching out about the proposal.",
+        "I'll send it over today!",
+        "Best.",
+    ]
+
+
+def test_splitter_handles_streamed_deltas():
+    text = "Hi John.\n\nThanks for reaching out about the proposal. I'll send it over today! Best."
+    splitter = SentenceSplitter()
+    sentences = []
+    for i in range(0, len(text), 3):
+        sentences.extend(splitter.feed(text[i:i + 3]))
+    sentences.extend(splitter.flush())
+
+    assert sentences == split_sentences(text)
+
+
+@pytest.mark.asyncio
+async def test_chunks_are_yielded_in_order_with_bounded_concurrency():
+    active = 0
+    peak = 0
+
+    async def synthesize(sentence):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        # Later sentences finish first
+        await asyncio.sleep(0.05 / len(sentence))
+        active -= 1
+        return sentence.encode()
+
+    text = " ".join(f"Sentence number {'x' * i} is here." for i in range(1, 7))
+    chunks = [chunk async for chunk in synthesize_sentences(text_sentences(text), synthesize, max_concurrency=2)]
+
+    assert [seq for seq, _, _ in chunks] == list(range(6))
+    assert [audio.decode() for _, _, audio in chunks] == split_sentences(text)
+    assert peak <= 2
+
+
+@pytest.mark.asyncio
+async def test_synthesis_error_is_raised():
+    async def synthesize(sentence):
+        raise RuntimeError("tts down")
+
+    with pytest.raises(RuntimeError):
+        async for _ in synthesize_sentences(text_sentences("A sentence long enough to speak."), synthesize):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_deltas_run_ahead_of_a_blocked_synthesis():
+    forwarded = []
+    release = asyncio.Event()
+
+    async def deltas():
+        for i in range(6):
+            forwarded.append(i)
+            yield f"Sentence number {i} is long enough. "
+
+    async def synthesize(sentence):
+        await release.wait()
+        return sentence.encode()
+
+    chunks = synthesize_sentences(delta_sentences(run_ahead(deltas())), synthesize, max_concurrency=1)
+    first = asyncio.ensure_future(chunks.__anext__())
+    await asyncio.sleep(0.05)
+
+    # Every delta went out although synthesis holds the only slot
+    assert forwarded == list(range(6))
+    release.set()
+    assert (await first)[0] == 0
+    assert len([chunk async for chunk in chunks]) == 5
+
+
+@pytest.mark.asyncio
+async def test_run_ahead_raises_source_errors():
+    async def failing():
+        yield "a"
+        raise RuntimeError("llm down")
+
+    with pytest.raises(RuntimeError):
+        async for _ in run_ahead(failing()):
+            pass
@@ -0,0 +1,251 @@
+"""
+Tests for incremental document sync (scripts/ingest_business_data.py) against
+an in-memory stand-in for the Supabase client.
+"""
+import sys
+import os
+import threading
+import uuid
+
+import pytest
+
+# Add tools and scripts directories to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tools')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'scripts')))
+
+import ingest_business_data
+from ingest_business_data import sync_documents
+from ingest_state import IngestState
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    """The chained PostgREST calls the ingestion code makes, on a list of dicts."""
+
+    def __init__(self, db, table):
+        self.db, self.table = db, table
+        self.op, self.payload, self.filters = "select", None, []
+        self.negate = False
+        self.bounds = None
+
+    @property
+    def not_(self):
+        self.negate = True
+        return self
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def insert(self, payload, **kwargs):
+        self.op, self.payload = "insert", payload
+        return self
+
+    def upsert(self, payload, on_conflict="", **kwargs):
+        self.op, self.payload, self.conflict = "upsert", payload, on_conflict
+        return self
+
+    def update(self, payload):
+        self.op, self.payload = "update", payload
+        return self
+
+    def delete(self):
+        self.op = "delete"
+        return self
+
+    def is_(self, column, value):
+        negate, self.negate = self.negate, False
+        self.filters.append(lambda row: (row.get(column) is None) != negate)
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def like(self, column, pattern):
+        self.filters.append(lambda row: str(row.get(column) or "").startswith(pattern.rstrip("%")))
+        return self
+
+    def order(self, *args, **kwargs):
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end)
+        return self
+
+    def execute(self):
+        with self.db.lock:
+            return self._execute()
+
+    def _execute(self):
+        rows = self.db.tables.setdefault(self.table, [])
+        self.db.calls.append((self.table, self.op))
+        if self.op in ("insert", "upsert"):
+            payload = self.payload if isinstance(self.payload, list) else [self.payload]
+            self.db.before_write(self.table, payload)
+            written = []
+            for new in payload:
+                old = None
+                if self.op == "upsert":
+                    old = next((row for row in rows if row.get(self.conflict) == new[self.conflict]), None)
+                if old is not None:
+                    old.update(new)
+                    written.append(old)
+                else:
+                    rows.append({"id": str(uuid.uuid4()), **new})
+                    written.append(rows[-1])
+            return FakeResponse(written)
+        matched = [row for row in rows if all(f(row) for f in self.filters)]
+        if self.op == "update":
+            for row in matched:
+                row.update(self.payload)
+        elif self.op == "delete":
+            ids = {row["id"] for row in matched}
+            # ON DELETE CASCADE from parents to chunks
+            self.db.tables[self.table] = [row for row in rows
+                                          if row["id"] not in ids and row.get("parent_id") not in ids]
+        elif self.bounds:
+            matched = matched[self.bounds[0]:self.bounds[1] + 1]
+        return FakeResponse(matched)
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.tables = {}
+        self.calls = []
+        self.lock = threading.RLock()
+        self.fail_writes = 0
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def before_write(self, table, payload):
+        # Fails a write of chunks only, i.e. one after their parent's
+        if self.fail_writes and all(row.get("parent_id") for row in payload):
+            self.fail_writes -= 1
+            raise RuntimeError("connection reset")
+
+    def documents(self):
+        return self.tables.get("documents", [])
+
+    def top(self, title):
+        return next(row for row in self.documents() if row.get("title") == title and not row.get("parent_id"))
+
+
+@pytest.fixture
+def embedded(monkeypatch):
+    """Counts the texts embedded; embeddings are constant vectors."""
+    texts = []
+
+    def generate_embeddings(batch, openai_client):
+        texts.extend(batch)
+        return [[0.1, 0.2, 0.3] for _ in batch]
+
+    monkeypatch.setattr(ingest_business_data, "generate_embeddings", generate_embeddings)
+    return texts
+
+
+LONG = "\n\n".join(f"Paragraph {i}: " + " ".join(["policy"] * 120) for i in range(12))
+
+
+def documents(**changes):
+    docs = {"Refunds": "Refunds within 30 days.", "Hours": "Open 9 to 6.", "Handbook": LONG}
+    docs.update(changes)
+    return [{"title": title, "content": content} for title, content in docs.items() if content is not None]
+
+
+def test_sync_skips_unchanged_updates_in_place_and_deletes_removed(embedded, tmp_path):
+    supabase = FakeSupabase()
+    state = IngestState(str(tmp_path / "state.json"))
+
+    first = sync_documents(supabase, None, documents(), "file#", state)
+    handbook = supabase.top("Handbook")
+    chunks = [row for row in supabase.documents() if row.get("parent_id") == handbook["id"]]
+
+    assert first == {"new": 3, "changed": 0, "unchanged": 0, "removed": 0, "errors": 0}
+    assert handbook["content_hash"] and handbook.get("embedding") is None
+    assert len(chunks) == handbook["metadata"]["chunk_count"] > 1
+    assert IngestState(state.path).get("file#Handbook")["id"] == handbook["id"]
+
+    embedded.clear()
+    assert sync_documents(supabase, None, documents(), "file#", state)["unchanged"] == 3
+    assert embedded == []
+
+    refunds_id = supabase.top("Refunds")["id"]
+    third = sync_documents(supabase, None, documents(Refunds="Refunds within 60 days.", Hours=None),
+                           "file#", state)
+
+    assert third == {"new": 0, "changed": 1, "unchanged": 1, "removed": 1, "errors": 0}
+    assert embedded == ["Refunds within 60 days."]
+    assert supabase.top("Refunds")["id"] == refunds_id
+    assert supabase.top("Refunds")["content"] == "Refunds within 60 days."
+    assert [row["title"] for row in supabase.documents() if not row.get("parent_id")] == ["Refunds", "Handbook"]
+    assert "file#Hours" not in IngestState(state.path)
+
+
+def test_interrupted_chunk_write_is_redone_on_the_next_run(embedded, monkeypatch, tmp_path):
+    supabase = FakeSupabase()
+    state = IngestState(str(tmp_path / "state.json"))
+    # Small transactions, so a parent and its chunks are committed separately
+    rest_insert = ingest_business_data.rest_insert
+    monkeypatch.setattr(ingest_business_data, "rest_insert",
+                        lambda client, table, rows: rest_insert(client, table, rows, batch_size=2))
+    supabase.fail_writes = 1
+
+    first = sync_documents(supabase, None, documents(), "file#", state)
+
+    # The parent made it without its chunks and is not marked current
+    assert first["errors"] >= 1
+    assert supabase.top("Handbook").get("content_hash") is None
+    assert "file#Handbook" not in IngestState(state.path)
+
+    second = sync_documents(supabase, None, documents(), "file#", state)
+    handbook = supabase.top("Handbook")
+    chunks = [row for row in supabase.documents() if row.get("parent_id") == handbook["id"]]
+
+    assert second["errors"] == 0
+    assert second["changed"] == 1 and second["new"] + second["unchanged"] == 2
+    assert handbook["content_hash"] and len(chunks) == handbook["metadata"]["chunk_count"]
+    assert len([row for row in supabase.documents() if row.get("title") == "Handbook" and not row.get("parent_id")]) == 1
+
+    assert sync_documents(supabase, None, documents(), "file#", state)["unchanged"] == 3
+
+
+def test_repeated_titles_get_stable_keys(embedded):
+    supabase = FakeSupabase()
+    docs = [{"title": "FAQ", "content": f"version {i}"} for i in range(3)] + [{"content": "untitled"}]
+
+    sync_documents(supabase, None, docs, "file#")
+    keys = {row["source_key"]: row["content"] for row in supabase.documents()}
+
+    assert keys["file#FAQ"] == "version 0"
+    assert keys["file#FAQ#2"] == "version 1"
+    assert keys["file#FAQ#3"] == "version 2"
+    assert sync_documents(supabase, None, docs, "file#")["unchanged"] == 4
+
+
+def test_sync_needs_a_scope():
+    with pytest.raises(ValueError):
+        sync_documents(FakeSupabase(), None, [], "")
+
+
+def test_reimported_faqs_and_proposals_are_upserted(embedded):
+    supabase = FakeSupabase()
+    faqs = [{"question": "Refunds?", "answer": "30 days"}, {"question": "Hours?", "answer": "9-6"},
+            {"question": "Refunds?", "answer": "60 days"}]
+    proposal = {"title": "Consulting", "content": "Scope..."}
+
+    for _ in range(2):
+        assert ingest_business_data.ingest_faqs(supabase, None, faqs, scope="file#") == (2, 0)
+        assert ingest_business_data.ingest_proposal_template(supabase, proposal, "file#")
+
+    stored = {row["source_key"]: row["answer"] for row in supabase.tables["faqs"]}
+    assert stored == {"file#Refunds?": "60 days", "file#Hours?": "9-6"}
+    assert [row["source_key"] for row in supabase.tables["proposals"]] == ["file#Consulting"]
@@ -0,0 +1,100 @@
+"""
+Tests for the two-tier TTS audio cache.
+"""
+import sys
+import os
+
+# Add tools directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tools')))
+
+from tts_cache import TTSCache, cache_key
+
+
+def test_key_depends_on_text_voice_and_config():
+    base = cache_key("Hello.", b"voice-a", b"mp3")
+
+    assert base == cache_key("Hello.", b"voice-a", b"mp3")
+    assert base != cache_key("Hello!", b"voice-a", b"mp3")
+    assert base != cache_key("Hello.", b"voice-b", b"mp3")
+    assert base != cache_key("Hello.", b"voice-a", b"wav")
+
+
+def test_memory_lru_eviction():
+    cache = TTSCache(directory=None, memory_bytes=10)
+    cache.put("a", b"12345")
+    cache.put("b", b"12345")
+    cache.get("a")
+    cache.put("c", b"12345")
+
+    assert cache.get("a") == b"12345"
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert stats["memory_hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["evictions"] == 1
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    TTSCache(directory=str(tmp_path)).put("a", b"audio")
+
+    cache = TTSCache(directory=str(tmp_path))
+
+    assert cache.get("a") == b"audio"
+    assert cache.get("a") == b"audio"
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_disk_tier_is_size_bounded(tmp_path):
+    cache = TTSCache(directory=str(tmp_path), memory_bytes=0, disk_bytes=10)
+    cache.put("a", b"123456")
+    os.utime(tmp_path / "a.mp3", (0, 0))
+    cache.put("b", b"123456")
+
+    assert not (tmp_path / "a.mp3").exists()
+    assert cache.get("b") == b"123456"
+    assert cache.stats()["disk_bytes"] == 6
+
+
+def test_disk_limit_holds_across_processes(tmp_path):
+    first = TTSCache(directory=str(tmp_path), memory_bytes=0, disk_bytes=10)
+    # Rescan on every write to see the other process's files
+    second = TTSCache(directory=str(tmp_path), memory_bytes=0, disk_bytes=10, rescan_seconds=0)
+    first.put("a", b"123456")
+    os.utime(tmp_path / "a.mp3", (0, 0))
+    second.put("b", b"123456")
+
+    assert not (tmp_path / "a.mp3").exists()
+    assert (tmp_path / "b.mp3").exists()
+    assert second.stats()["disk_bytes"] == 6
+
+
+def test_writes_under_the_limit_do_not_rescan(tmp_path, monkeypatch):
+    cache = TTSCache(directory=str(tmp_path), memory_bytes=0, disk_bytes=100)
+    scans = []
+    scandir = os.scandir
+    monkeypatch.setattr(os, "scandir", lambda path: scans.append(path) or scandir(path))
+
+    for key in "abcde":
+        cache.put(key, b"123456")
+
+    assert scans == []
+    assert cache.stats()["disk_bytes"] == 30
+
+    cache.put("f", b"x" * 80)
+
+    assert len(scans) == 1
+    assert cache.stats()["disk_bytes"] <= 90
+
+
+def test_failed_disk_write_leaves_no_temp_file(tmp_path, monkeypatch):
+    cache = TTSCache(directory=str(tmp_path), memory_bytes=0)
+
+    def replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", replace)
+    cache.put("a", b"audio")
+
+    assert list(tmp_path.iterdir()) == []
+    assert cache.get("a") is None
@@ -0,0 +1,50 @@
+"""
+Tests for the in-memory knowledge base vector index.
+"""
+import sys
+import os
+
+# Add tools directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tools')))
+
+from vector_index import VectorIndex
+from index_rows import make_rows, exact_top, random_query
+
+
+def test_search_matches_exact_cosine_ranking():
+    rows = make_rows(50)
+    index = VectorIndex.from_rows(rows, dim=8)
+    query = random_query(8)
+
+    results = index.search(query, limit=5, threshold=-1.0)
+
+    assert [r["id"] for r in results] == exact_top(rows, query, 5)
+    assert results[0]["similarity"] >= results[-1]["similarity"]
+
+
+def test_threshold_and_filters():
+    rows = make_rows(20)
+    index = VectorIndex.from_rows(rows, dim=8)
+
+    own = index.search(rows[3]["embedding"], limit=3, threshold=0.99)
+    faqs = index.search(rows[3]["embedding"], limit=20, threshold=-1.0, doc_type="faq")
+
+    assert [r["id"] for r in own] == ["doc-3"]
+    assert len(faqs) == 10
+    assert all(r["doc_type"] == "faq" for r in faqs)
+
+
+def test_upsert_and_remove():
+    rows = make_rows(3)
+    index = VectorIndex(dim=8, capacity=1)
+    for row in rows:
+        index.upsert(row)
+
+    assert index.remove("doc-0")
+    assert not index.remove("doc-0")
+    assert len(index) == 2
+    assert "doc-0" not in index
+    assert index.search(rows[2]["embedding"], limit=1, threshold=0.99)[0]["id"] == "doc-2"
+
+    index.upsert({**rows[1], "embedding": "[" + ",".join(str(x) for x in rows[2]["embedding"]) + "]"})
+    assert {r["id"] for r in index.search(rows[2]["embedding"], limit=2, threshold=0.99)} == {"doc-1", "doc-2"}
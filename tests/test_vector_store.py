@@ -0,0 +1,89 @@
+"""
+Tests for the memory-mapped knowledge base snapshot.
+"""
+import sys
+import os
+
+import numpy as np
+import pytest
+
+# Add tools directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tools')))
+
+from vector_index import VectorIndex
+from vector_store import MappedVectorIndex, VectorStore, write_store
+from index_rows import make_rows, random_query
+
+
+def test_snapshot_searches_like_the_in_memory_index(tmp_path):
+    rows = make_rows(40)
+    path = str(tmp_path / "kb.vectors")
+    assert write_store(path, rows, dim=8) == 40
+
+    index = MappedVectorIndex(path)
+    expected = VectorIndex.from_rows(rows, dim=8)
+    query = random_query(8)
+
+    assert isinstance(index.store.vectors, np.memmap)
+    assert len(index) == 40
+    assert index.search(query, limit=5, threshold=-1.0) == pytest.approx(expected.search(query, limit=5, threshold=-1.0))
+    assert all(r["doc_type"] == "faq" for r in index.search(query, limit=5, threshold=-1.0, doc_type="faq"))
+
+
+def test_overlay_applies_changes_after_the_snapshot(tmp_path):
+    rows = make_rows(10)
+    path = str(tmp_path / "kb.vectors")
+    write_store(path, rows, dim=8)
+    index = MappedVectorIndex(path)
+
+    assert index.remove("doc-0")
+    assert not index.remove("doc-0")
+    index.upsert({**rows[1], "content": "updated"})
+    index.upsert({**rows[2], "id": "doc-new"})
+
+    assert len(index) == 10
+    assert "doc-0" not in index and "doc-new" in index
+    assert sorted(index.ids()) == sorted([f"doc-{i}" for i in range(1, 10)] + ["doc-new"])
+    assert index.search(rows[1]["embedding"], limit=1, threshold=0.99)[0]["content"] == "updated"
+    assert {r["id"] for r in index.search(rows[2]["embedding"], limit=2, threshold=0.99)} == {"doc-2", "doc-new"}
+
+
+def test_replacing_the_snapshot_is_detected(tmp_path):
+    path = str(tmp_path / "kb.vectors")
+    write_store(path, make_rows(5), dim=8)
+    store = VectorStore(path)
+    assert not store.replaced
+
+    write_store(path, make_rows(6), dim=8)
+
+    assert store.replaced
+    assert len(store) == 5
+    assert len(VectorStore(path)) == 6
+    assert os.listdir(tmp_path) == ["kb.vectors"]
+
+
+def test_records_are_read_only_for_hits(tmp_path, monkeypatch):
+    rows = make_rows(30)
+    path = str(tmp_path / "kb.vectors")
+    write_store(path, rows, dim=8)
+    store = VectorStore(path)
+    decoded = []
+    payload = VectorStore.payload
+    monkeypatch.setattr(VectorStore, "payload", lambda self, position: decoded.append(position) or payload(self, position))
+
+    index = MappedVectorIndex(path)
+    hits = index.search(rows[7]["embedding"], limit=3, threshold=-1.0)
+
+    assert hits[0]["id"] == "doc-7" and hits[0]["metadata"] == {"n": 7}
+    assert len(decoded) == 3
+    assert store.position("doc-29") == 29 and store.position("doc-30") is None
+    assert store.ids() == [f"doc-{i}" for i in range(30)]
+    assert index.search(rows[7]["embedding"], limit=3, threshold=-1.0, category="other") == []
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "not-a-store"
+    path.write_bytes(b"x" * 100)
+
+    with pytest.raises(ValueError):
+        VectorStore(str(path))
@@ -0,0 +1,71 @@
+"""
+Tests for the JSON-lines tool worker supervisor.
+
+Uses a throwaway tool script served through tools/jsonl_worker.py, so no API
+credentials are needed.
+"""
+import sys
+import os
+import textwrap
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.worker_pool import WorkerSupervisor
+
+
+TOOLS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tools'))
+
+
+@pytest.fixture
+def supervisor(tmp_path):
+    script = tmp_path / "echo_cli.py"
+    script.write_text(textwrap.dedent(f"""
+        import os
+        import sys
+        sys.path.insert(0, {TOOLS_DIR!r})
+        from jsonl_worker import serve
+
+        def echo(text):
+            print("noise that must not reach the protocol stream")
+            return {{"status": "success", "text": text, "pid": os.getpid()}}
+
+        def crash():
+            os._exit(1)
+
+        if __name__ == "__main__":
+            serve({{"echo": echo, "crash": crash}})
+    """))
+    supervisor = WorkerSupervisor(tmp_path, ["echo"], size=1, timeout=10, monitor_interval=0.1)
+    supervisor.start()
+    yield supervisor
+    supervisor.shutdown()
+
+
+def test_worker_is_reused(supervisor):
+    first = supervisor.call("echo", "echo", {"text": "hello"})
+    second = supervisor.call("echo", "echo", {"text": "again"})
+
+    assert first["text"] == "hello"
+    assert second["text"] == "again"
+    assert first["pid"] == second["pid"]
+
+
+def test_unknown_command(supervisor):
+    result = supervisor.call("echo", "missing", {})
+
+    assert result["status"] == "error"
+
+
+def test_crashed_worker_is_restarted(supervisor):
+    before = supervisor.call("echo", "echo", {"text": "x"})["pid"]
+
+    crashed = supervisor.call("echo", "crash", {})
+    after = supervisor.call("echo", "echo", {"text": "y"})
+
+    assert crashed["status"] == "error"
+    assert after["status"] == "success"
+    assert after["pid"] != before
+    assert supervisor.stats()["echo"]["restarts"] == 1
@@ -10,6 +10,9 @@ import os
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+import src.workflow as workflow
 from src.workflow import process_user_input, classify_intent, AgentState
 
 
@@ -130,6 +133,87 @@ class TestWorkflowEndToEnd:
         assert len(response) > 0
 
 
+class TestAsyncWorkflow:
+    """Test the async execution path with a fake LLM and fake tools."""
+    
+    @pytest.mark.asyncio
+    async def test_retrieve_info_async(self, monkeypatch):
+        """Test that ainvoke runs the async nodes end to end."""
+        monkeypatch.setattr(workflow, "llm", FakeListChatModel(responses=["Refunds within 30 days."]))
+        
+        async def fake_search(query, limit=5):
+            return {"status": "success", "results": [{"content": "Refund policy: 30 days."}]}
+        
+        async def no_faq(question):
+            return {"status": "success", "match": None, "confidence": 0.4}
+        
+        monkeypatch.setattr(workflow.executor, "asearch_knowledge", fake_search)
+        monkeypatch.setattr(workflow.executor, "amatch_faq", no_faq)
+        
+        response = await workflow.aprocess_user_input("What is our refund policy?")
+        
+        assert response == "Refunds within 30 days."
+    
+    @pytest.mark.asyncio
+    async def test_faq_match_skips_search_and_llm(self, monkeypatch):
+        """Test that a matched FAQ is answered with its stored answer."""
+        monkeypatch.setattr(workflow, "llm", FakeListChatModel(responses=[]))
+        
+        async def fake_faq(question):
+            match = {"id": "faq-1", "question": "What is our refund policy?",
+                     "answer": "Refunds are accepted within 30 days.", "category": "Billing"}
+            return {"status": "success", "match": match, "confidence": 0.93}
+        
+        async def fail_search(query, limit=5):
+            raise AssertionError("knowledge base searched despite an FAQ match")
+        
+        monkeypatch.setattr(workflow.executor, "amatch_faq", fake_faq)
+        monkeypatch.setattr(workflow.executor, "asearch_knowledge", fail_search)
+        
+        response = await workflow.aprocess_user_input("What is our refund policy?")
+        
+        assert response == "Refunds are accepted within 30 days."
+    
+    @pytest.mark.asyncio
+    async def test_read_email_async(self, monkeypatch):
+        """Test the async read_email node."""
+        monkeypatch.setattr(workflow, "llm", FakeListChatModel(responses=[]))
+        
+        async def fake_list(query="", max_results=10):
+            return {"status": "success", "emails": []}
+        
+        monkeypatch.setattr(workflow.executor, "alist_emails", fake_list)
+        
+        response = await workflow.aprocess_user_input("Read me my unread emails")
+        
+        assert response == workflow.NO_UNREAD_RESPONSE
+    
+    @pytest.mark.asyncio
+    async def test_draft_email_streams_tokens(self, monkeypatch):
+        """Test that the streamed deltas add up to the final response."""
+        monkeypatch.setattr(workflow, "llm", FakeListChatModel(responses=["Subject: Hi\n\nHello Acme."]))
+        
+        async def fake_search(query, limit=5):
+            return {"status": "success", "results": []}
+        
+        monkeypatch.setattr(workflow.executor, "asearch_knowledge", fake_search)
+        
+        deltas = [delta async for delta in workflow.astream_response("Draft an email to Acme")]
+        
+        assert len(deltas) > 2
+        assert deltas[0].startswith(workflow.DRAFT_PREFIX)
+        assert "".join(deltas) == workflow.DRAFT_PREFIX + "Subject: Hi\n\nHello Acme." + workflow.DRAFT_SUFFIX
+    
+    @pytest.mark.asyncio
+    async def test_non_llm_response_is_one_delta(self, monkeypatch):
+        """Test that responses without LLM output arrive as a single delta."""
+        monkeypatch.setattr(workflow, "llm", FakeListChatModel(responses=[]))
+        
+        deltas = [delta async for delta in workflow.astream_response("Sing me a song")]
+        
+        assert deltas == [workflow.UNKNOWN_RESPONSE]
+
+
 class TestErrorHandling:
     """Test error handling and edge cases."""
     
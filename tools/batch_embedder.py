@@ -0,0 +1,115 @@
+"""
+Batch Embedder - Many texts per OpenAI embeddings request
+
+The embeddings endpoint takes a list of inputs, yet ingestion used to send
+one request per document, so re-embedding the knowledge base was bound by
+round trips. `BatchEmbedder.embed()` instead:
+
+- looks every text up in the embedding cache and embeds each distinct
+  (normalized) text once
+- packs the rest into requests of at most EMBEDDING_BATCH_TOKENS tokens
+  and EMBEDDING_BATCH_INPUTS inputs
+- sends up to EMBEDDING_BATCH_CONCURRENCY requests at a time
+- retries a request that failed on rate limits or server errors with
+  exponential backoff, and splits a rejected one in halves to pin the
+  error on the offending input
+- returns the vectors in input order and stores them in the cache
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+from openai import BadRequestError
+
+from chunking import count_tokens
+from embedding_cache import EmbeddingCache, get_embedding_cache, normalize_text
+
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+# The endpoint allows 2048 inputs and 300k tokens per request
+EMBEDDING_BATCH_TOKENS = int(os.getenv("EMBEDDING_BATCH_TOKENS", "100000"))
+EMBEDDING_BATCH_INPUTS = int(os.getenv("EMBEDDING_BATCH_INPUTS", "2048"))
+EMBEDDING_BATCH_CONCURRENCY = int(os.getenv("EMBEDDING_BATCH_CONCURRENCY", "4"))
+
+
+def pack_batches(texts: Sequence[str], max_tokens: int, max_inputs: int) -> List[List[int]]:
+    """Group text positions into consecutive batches under both limits."""
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+    for position, text in enumerate(texts):
+        tokens = count_tokens(text)
+        if current and (current_tokens + tokens > max_tokens or len(current) == max_inputs):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(position)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+class BatchEmbedder:
+    """Cached, deduplicated, concurrent batch embedding with retries."""
+
+    def __init__(self, client: Any, model: str = EMBEDDING_MODEL,
+                 max_batch_tokens: int = EMBEDDING_BATCH_TOKENS,
+                 max_batch_inputs: int = EMBEDDING_BATCH_INPUTS,
+                 concurrency: int = EMBEDDING_BATCH_CONCURRENCY,
+                 max_retries: int = 3, backoff: float = 1.0,
+                 cache: Optional[EmbeddingCache] = None):
+        self.client = client
+        self.model = model
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_inputs = max_batch_inputs
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.cache = cache if cache is not None else get_embedding_cache()
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        """Embeddings of `texts`, in order."""
+        vectors: Dict[str, List[float]] = {}
+        missing: Dict[str, str] = {}
+        for text in texts:
+            key = normalize_text(text)
+            if key in vectors or key in missing:
+                continue
+            vector = self.cache.get(self.model, text)
+            if vector is None:
+                missing[key] = text
+            else:
+                vectors[key] = vector
+
+        if missing:
+            pending = list(missing.values())
+            batches = [[pending[i] for i in batch]
+                       for batch in pack_batches(pending, self.max_batch_tokens, self.max_batch_inputs)]
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(batches))) as pool:
+                for batch, embeddings in zip(batches, pool.map(self._embed_batch, batches)):
+                    for text, vector in zip(batch, embeddings):
+                        vectors[normalize_text(text)] = vector
+
+        return [vectors[normalize_text(text)] for text in texts]
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.client.embeddings.create(model=self.model, input=batch)
+                embeddings = [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+                # Cached as soon as they arrive, so a failed run's work is not lost
+                for text, vector in zip(batch, embeddings):
+                    self.cache.put(self.model, text, vector)
+                return embeddings
+            except BadRequestError:
+                # Retrying the same inputs cannot help; find the one the API rejects
+                if len(batch) == 1:
+                    raise
+                middle = len(batch) // 2
+                return self._embed_batch(batch[:middle]) + self._embed_batch(batch[middle:])
+            except Exception:
+                # Rate limits, timeouts, 5xx
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
@@ -0,0 +1,184 @@
+"""
+Bulk Writer - Few round trips for large knowledge base imports
+
+Ingestion used to insert one row per request and send each embedding as a
+JSON list of 1536 floats (~30 KB). This module writes rows in batches of
+BULK_BATCH_SIZE instead:
+
+- `CopyWriter` streams each batch into Postgres with `COPY ... FROM STDIN`
+  inside its own transaction (psycopg2 connection, SUPABASE_DB_URL). It uses
+  the binary COPY format, where an embedding is 4 bytes per dimension in
+  pgvector's wire format, and falls back to CSV with vector literals if the
+  server rejects binary input.
+- `rest_insert` is the fallback without a database connection: one
+  multi-row PostgREST insert per batch, with embeddings sent as compact
+  vector literals and no rows echoed back.
+
+Rows without an `id` get a client-side UUID, so chunk rows can reference a
+parent written in the same batch (parents are written first).
+"""
+import io
+import json
+import os
+import struct
+import uuid
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from psycopg2 import DataError, NotSupportedError
+
+
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "500"))
+
+# Column -> Postgres type of the `documents` columns ingestion writes
+DOCUMENT_COLUMNS = {
+    "id": "uuid",
+    "content": "text",
+    "metadata": "jsonb",
+    "embedding": "vector",
+    "doc_type": "text",
+    "category": "text",
+    "title": "text",
+    "source": "text",
+    "parent_id": "uuid",
+    "chunk_index": "int4",
+    "source_key": "text",
+    "content_hash": "text",
+}
+
+COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+
+
+def with_ids(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Rows with an `id` (a new UUID where missing)."""
+    return [row if row.get("id") else {**row, "id": str(uuid.uuid4())} for row in rows]
+
+
+def batches(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch: List[Dict[str, Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def vector_literal(embedding: Sequence[float]) -> str:
+    """pgvector text form with float32 precision (about half the size of a JSON list)."""
+    return "[" + ",".join(f"{float(x):.7g}" for x in embedding) + "]"
+
+
+# ============================================================================
+# Binary COPY encoding
+# ============================================================================
+
+def _binary_value(value: Any, pg_type: str) -> bytes:
+    if pg_type == "vector":
+        values = [float(x) for x in value]
+        # dim, unused, then big-endian float4s (pgvector's vector_recv)
+        return struct.pack(f">hh{len(values)}f", len(values), 0, *values)
+    if pg_type == "uuid":
+        return uuid.UUID(str(value)).bytes
+    if pg_type == "int4":
+        return struct.pack(">i", int(value))
+    if pg_type == "jsonb":
+        return b"\x01" + json.dumps(value, default=str).encode("utf-8")
+    return str(value).encode("utf-8")
+
+
+def encode_binary(rows: Sequence[Dict[str, Any]], columns: Dict[str, str]) -> bytes:
+    """A COPY binary-format stream of `rows` for `columns`."""
+    out = io.BytesIO()
+    out.write(COPY_SIGNATURE + struct.pack(">ii", 0, 0))
+    field_count = struct.pack(">h", len(columns))
+    for row in rows:
+        out.write(field_count)
+        for column, pg_type in columns.items():
+            value = row.get(column)
+            if value is None:
+                out.write(struct.pack(">i", -1))
+                continue
+            data = _binary_value(value, pg_type)
+            out.write(struct.pack(">i", len(data)))
+            out.write(data)
+    out.write(struct.pack(">h", -1))
+    return out.getvalue()
+
+
+def _csv_value(value: Any, pg_type: str) -> str:
+    if value is None:
+        # An unquoted empty field is NULL in CSV COPY
+        return ""
+    if pg_type == "vector":
+        text = vector_literal(value)
+    elif pg_type == "jsonb":
+        text = json.dumps(value, default=str)
+    else:
+        text = str(value)
+    return '"' + text.replace('"', '""') + '"'
+
+
+def encode_csv(rows: Sequence[Dict[str, Any]], columns: Dict[str, str]) -> bytes:
+    """A COPY CSV stream of `rows` for `columns` (every non-NULL value quoted)."""
+    lines = [",".join(_csv_value(row.get(column), pg_type) for column, pg_type in columns.items())
+             for row in rows]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+# ============================================================================
+# Writers
+# ============================================================================
+
+class CopyWriter:
+    """Batched `COPY FROM STDIN` into a table over a psycopg2 connection."""
+
+    def __init__(self, conn: Any, table: str = "documents", columns: Optional[Dict[str, str]] = None,
+                 batch_size: int = BULK_BATCH_SIZE, binary: bool = True):
+        self.conn = conn
+        self.table = table
+        self.columns = dict(columns or DOCUMENT_COLUMNS)
+        self.batch_size = max(1, batch_size)
+        self.binary = binary
+
+    def write(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Write all rows, one transaction per batch; returns the number written."""
+        written = 0
+        for batch in batches(rows, self.batch_size):
+            self._copy(batch)
+            written += len(batch)
+        return written
+
+    def _copy(self, batch: List[Dict[str, Any]]) -> None:
+        columns = ", ".join(self.columns)
+        if self.binary:
+            try:
+                self._execute(f"COPY {self.table} ({columns}) FROM STDIN WITH (FORMAT binary)",
+                              encode_binary(batch, self.columns))
+                return
+            except (DataError, NotSupportedError):
+                # e.g. a pgvector build without binary input; the batch was rolled back
+                self.binary = False
+        self._execute(f"COPY {self.table} ({columns}) FROM STDIN WITH (FORMAT csv)",
+                      encode_csv(batch, self.columns))
+
+    def _execute(self, sql: str, data: bytes) -> None:
+        with self.conn:
+            with self.conn.cursor() as cursor:
+                cursor.copy_expert(sql, io.BytesIO(data))
+
+
+def rest_insert(supabase: Any, table: str, rows: Iterable[Dict[str, Any]],
+                batch_size: int = BULK_BATCH_SIZE) -> int:
+    """Multi-row PostgREST inserts of `batch_size` rows; returns the number written."""
+    from postgrest.types import ReturnMethod
+
+    written = 0
+    for batch in batches(rows, max(1, batch_size)):
+        payload = [
+            {**row, "embedding": vector_literal(row["embedding"])} if row.get("embedding") is not None else row
+            for row in batch
+        ]
+        supabase.table(table).insert(payload, returning=ReturnMethod.minimal, default_to_null=False).execute()
+        written += len(batch)
+    return written
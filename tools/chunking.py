@@ -0,0 +1,257 @@
+"""
+Chunking - Token-budgeted document chunks with parent links
+
+Embedding a whole file as one vector dilutes it (and long files exceed the
+embedding model's input limit), and retrieve_info then pastes whole documents
+into the prompt. Documents are instead split into chunks of at most
+RAG_CHUNK_TOKENS tokens (cl100k_base, the text-embedding-3-small tokenizer),
+each sharing up to RAG_CHUNK_OVERLAP tokens with the previous one so a fact
+that straddles a boundary is still found:
+
+- text:     paragraphs, then sentences, then words, packed greedily
+- markdown: split at headings; every chunk starts with its heading path, and
+            fenced code blocks are never split at blank lines
+- csv:      rows packed under a repeated header line (no overlap)
+
+The full document is stored as a parent row without an embedding; chunk rows
+point to it through `parent_id`/`chunk_index` (also copied into their
+metadata, which search results carry).
+"""
+import csv
+import io
+import math
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+
+DEFAULT_MAX_TOKENS = int(os.getenv("RAG_CHUNK_TOKENS", "400"))
+DEFAULT_OVERLAP_TOKENS = int(os.getenv("RAG_CHUNK_OVERLAP", "50"))
+
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+HEADING = re.compile(r"^(#{1,6})\s+(.*\S)\s*$")
+FENCE = re.compile(r"^\s*(```|~~~)")
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # tiktoken missing, or its encoding file cannot be downloaded
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Token count under cl100k_base (about 4 characters per token without tiktoken)."""
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / 4)
+
+
+# ============================================================================
+# Splitting into pieces no larger than the budget
+# ============================================================================
+
+# A piece is (separator to put before it, text)
+Piece = Tuple[str, str]
+
+
+def _paragraphs(text: str) -> List[str]:
+    """Blank-line separated blocks, keeping fenced code blocks whole."""
+    blocks, current, in_fence = [], [], False
+    for line in text.split("\n"):
+        if FENCE.match(line):
+            in_fence = not in_fence
+        if not in_fence and not line.strip():
+            if current:
+                blocks.append("\n".join(current))
+                current = []
+            continue
+        current.append(line)
+    if current:
+        blocks.append("\n".join(current))
+    return [block.strip("\n") for block in blocks if block.strip()]
+
+
+def _split_words(text: str, max_tokens: int) -> List[str]:
+    parts, current = [], []
+    for word in text.split():
+        if current and count_tokens(" ".join(current + [word])) > max_tokens:
+            parts.append(" ".join(current))
+            current = []
+        current.append(word)
+    if current:
+        parts.append(" ".join(current))
+    return parts
+
+
+def _pieces(text: str, max_tokens: int) -> List[Piece]:
+    pieces: List[Piece] = []
+    for paragraph in _paragraphs(text):
+        if count_tokens(paragraph) <= max_tokens:
+            pieces.append(("\n\n", paragraph))
+            continue
+        separator = "\n\n"
+        for sentence in SENTENCE_BREAK.split(paragraph):
+            parts = [sentence] if count_tokens(sentence) <= max_tokens else _split_words(sentence, max_tokens)
+            for part in parts:
+                pieces.append((separator, part))
+                separator = " "
+    return pieces
+
+
+def _pack(pieces: List[Piece], max_tokens: int, overlap_tokens: int) -> List[str]:
+    """Greedily join pieces up to the budget, repeating a tail of each chunk in the next."""
+    chunks: List[str] = []
+    current: List[Tuple[Piece, int]] = []
+
+    def join(items):
+        return "".join((sep if i else "") + text for i, ((sep, text), _) in enumerate(items))
+
+    for piece in pieces:
+        tokens = count_tokens(piece[1])
+        if current and sum(t for _, t in current) + tokens > max_tokens:
+            chunks.append(join(current))
+            tail: List[Tuple[Piece, int]] = []
+            for item in reversed(current):
+                if sum(t for _, t in tail) + item[1] > overlap_tokens:
+                    break
+                tail.insert(0, item)
+            # The overlap must leave room for the new piece
+            while tail and sum(t for _, t in tail) + tokens > max_tokens:
+                tail.pop(0)
+            current = tail
+        current.append((piece, tokens))
+    if current:
+        chunks.append(join(current))
+    return chunks
+
+
+# ============================================================================
+# Format-aware chunkers
+# ============================================================================
+
+def chunk_text(text: str, max_tokens: int = DEFAULT_MAX_TOKENS,
+               overlap_tokens: int = DEFAULT_OVERLAP_TOKENS) -> List[str]:
+    return _pack(_pieces(text, max_tokens), max_tokens, overlap_tokens)
+
+
+def _sections(text: str) -> List[Tuple[List[str], str]]:
+    """(heading path, body) per markdown section; headings inside code fences are ignored."""
+    sections: List[Tuple[List[str], str]] = []
+    path: List[Tuple[int, str]] = []
+    body: List[str] = []
+    in_fence = False
+    for line in text.split("\n"):
+        if FENCE.match(line):
+            in_fence = not in_fence
+        heading = None if in_fence else HEADING.match(line)
+        if heading is None:
+            body.append(line)
+            continue
+        if "\n".join(body).strip():
+            sections.append(([h for _, h in path], "\n".join(body)))
+        body = []
+        level = len(heading.group(1))
+        path = [(l, h) for l, h in path if l < level] + [(level, line.strip())]
+    if "\n".join(body).strip():
+        sections.append(([h for _, h in path], "\n".join(body)))
+    return sections
+
+
+def chunk_markdown(text: str, max_tokens: int = DEFAULT_MAX_TOKENS,
+                   overlap_tokens: int = DEFAULT_OVERLAP_TOKENS) -> List[Tuple[str, str]]:
+    """(section title, chunk) pairs; each chunk is prefixed with its heading lines."""
+    chunks = []
+    for path, body in _sections(text):
+        prefix = "\n".join(path)
+        budget = max(max_tokens - count_tokens(prefix), max_tokens // 2) if prefix else max_tokens
+        title = " > ".join(h.lstrip("#").strip() for h in path)
+        for chunk in chunk_text(body, budget, overlap_tokens):
+            chunks.append((title, f"{prefix}\n\n{chunk}" if prefix else chunk))
+    return chunks
+
+
+def chunk_csv(text: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> List[str]:
+    """Rows packed under the header line; rows are never split."""
+    rows = list(csv.reader(io.StringIO(text)))
+    if not rows:
+        return []
+
+    def line(row):
+        out = io.StringIO()
+        csv.writer(out, lineterminator="").writerow(row)
+        return out.getvalue()
+
+    header = line(rows[0])
+    budget = max_tokens - count_tokens(header)
+    chunks, current, current_tokens = [], [], 0
+    for row in rows[1:]:
+        if not any(cell.strip() for cell in row):
+            continue
+        text_row = line(row)
+        tokens = count_tokens(text_row)
+        if current and current_tokens + tokens > budget:
+            chunks.append("\n".join([header] + current))
+            current, current_tokens = [], 0
+        current.append(text_row)
+        current_tokens += tokens
+    if current or not chunks:
+        chunks.append("\n".join([header] + current))
+    return chunks
+
+
+def chunk_document(text: str, file_type: Optional[str] = None, max_tokens: int = DEFAULT_MAX_TOKENS,
+                   overlap_tokens: int = DEFAULT_OVERLAP_TOKENS) -> List[Dict[str, Any]]:
+    """
+    Chunks of a document as {content, chunk_index, token_count[, section]};
+    `file_type` is a suffix such as ".md" or ".csv" (anything else is text).
+    """
+    file_type = (file_type or "").lower().lstrip(".")
+    if file_type in ("md", "markdown"):
+        pairs = chunk_markdown(text, max_tokens, overlap_tokens)
+    elif file_type == "csv":
+        pairs = [(None, chunk) for chunk in chunk_csv(text, max_tokens)]
+    else:
+        pairs = [(None, chunk) for chunk in chunk_text(text, max_tokens, overlap_tokens)]
+
+    chunks = []
+    for index, (section, content) in enumerate(pairs):
+        chunk = {"content": content, "chunk_index": index, "token_count": count_tokens(content)}
+        if section:
+            chunk["section"] = section
+        chunks.append(chunk)
+    return chunks
+
+
+def parent_row(document: Dict[str, Any], chunk_count: int) -> Dict[str, Any]:
+    """The full document as a `documents` row without an embedding."""
+    metadata = {**(document.get("metadata") or {}), "chunk_count": chunk_count}
+    return {**document, "metadata": metadata, "embedding": None}
+
+
+def chunk_rows(document: Dict[str, Any], chunks: List[Dict[str, Any]],
+               parent_id: Optional[str]) -> List[Dict[str, Any]]:
+    """`documents` rows for the chunks of `document` (embeddings still to be added)."""
+    rows = []
+    for chunk in chunks:
+        metadata = {
+            **(document.get("metadata") or {}),
+            "parent_id": parent_id,
+            "chunk_index": chunk["chunk_index"],
+            "chunk_count": len(chunks),
+        }
+        if "section" in chunk:
+            metadata["section"] = chunk["section"]
+        rows.append({
+            **document,
+            "content": chunk["content"],
+            "metadata": metadata,
+            "parent_id": parent_id,
+            "chunk_index": chunk["chunk_index"],
+        })
+    return rows
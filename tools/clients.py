@@ -0,0 +1,257 @@
+"""
+Client Registry - Process-wide, lazily constructed API clients
+
+Every tool call used to build its own Supabase, OpenAI, Gmail and Google
+Speech/TTS client, paying a TLS handshake (and, for Gmail, a discovery
+document parse) per request. The registry builds each client once on first
+use and hands the same instance to every caller, so HTTP keep-alive pools and
+gRPC channels are reused across requests. `close()` releases them on shutdown.
+
+Clients that are not thread-safe (the httplib2-based Gmail service) are
+registered per thread; they still share credentials and the parsed discovery
+document. Async clients (AsyncOpenAI, the async Supabase client and the gRPC
+asyncio Speech/TTS clients) are bound to the event loop that first uses them
+and are released by `aclose()`.
+"""
+import inspect
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class ClientRegistry:
+    """Lazily constructs named clients and keeps them for the process lifetime."""
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._closers: Dict[str, Callable[[Any], None]] = {}
+        self._checks: Dict[str, Callable[[Any], bool]] = {}
+        self._per_thread: Dict[str, bool] = {}
+        self._clients: Dict[str, Any] = {}
+        self._thread_clients: Dict[str, Dict[int, Any]] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any],
+                 close: Optional[Callable[[Any], None]] = None,
+                 check: Optional[Callable[[Any], bool]] = None,
+                 per_thread: bool = False) -> None:
+        """Register how to build, close and health-check a client."""
+        self._factories[name] = factory
+        self._per_thread[name] = per_thread
+        if close:
+            self._closers[name] = close
+        if check:
+            self._checks[name] = check
+
+    def get(self, name: str) -> Any:
+        """Return the shared client, constructing it on first use."""
+        if self._per_thread[name]:
+            return self._get_thread_client(name)
+
+        client = self._clients.get(name)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(name)
+                if client is None:
+                    client = self._factories[name]()
+                    self._clients[name] = client
+        return client
+
+    def _get_thread_client(self, name: str) -> Any:
+        clients = self._local.__dict__.setdefault("clients", {})
+        client = clients.get(name)
+        if client is None:
+            client = self._factories[name]()
+            clients[name] = client
+            with self._lock:
+                self._thread_clients.setdefault(name, {})[threading.get_ident()] = client
+        return client
+
+    def health(self) -> Dict[str, Dict[str, Any]]:
+        """Report which clients are constructed and whether they look usable."""
+        report = {}
+        for name in self._factories:
+            if self._per_thread[name]:
+                instances = list(self._thread_clients.get(name, {}).values())
+            else:
+                instances = [self._clients[name]] if name in self._clients else []
+
+            check = self._checks.get(name, lambda client: True)
+            try:
+                healthy = all(check(client) for client in instances)
+            except Exception:
+                healthy = False
+            report[name] = {"initialized": bool(instances), "instances": len(instances), "healthy": healthy}
+        return report
+
+    def close(self) -> None:
+        """Close every constructed client; they are rebuilt if used again.
+
+        Closers of async clients return awaitables, which need `aclose()`;
+        here those clients are only dropped.
+        """
+        for name, client in self._drain():
+            closer = self._closers.get(name)
+            if closer:
+                try:
+                    result = closer(client)
+                    if inspect.iscoroutine(result):
+                        result.close()
+                except Exception:
+                    pass
+
+    async def aclose(self) -> None:
+        """Close every constructed client, awaiting async closers."""
+        for name, client in self._drain():
+            closer = self._closers.get(name)
+            if closer:
+                try:
+                    result = closer(client)
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception:
+                    pass
+
+    def _drain(self):
+        """Forget every constructed client and return them for closing."""
+        with self._lock:
+            instances = [(name, client) for name, client in self._clients.items()]
+            for name, clients in self._thread_clients.items():
+                instances.extend((name, client) for client in clients.values())
+            self._clients.clear()
+            self._thread_clients.clear()
+            self._local = threading.local()
+        return instances
+
+
+# ============================================================================
+# Factories
+# ============================================================================
+
+def _http_limits():
+    import httpx
+    return httpx.Limits(
+        max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20")),
+        keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60")),
+    )
+
+
+def create_supabase_client():
+    from supabase import create_client
+
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_SERVICE_KEY")
+    if not url or not key:
+        raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set")
+    return create_client(url, key)
+
+
+def create_async_supabase_client():
+    from supabase import AsyncClient
+
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_SERVICE_KEY")
+    if not url or not key:
+        raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set")
+    # The service key is sent as-is, so the auth session lookup that
+    # acreate_client() performs is not needed and the client can be built
+    # synchronously.
+    return AsyncClient(url, key)
+
+
+def create_openai_client():
+    import httpx
+    from openai import OpenAI
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY must be set")
+    return OpenAI(api_key=api_key, http_client=httpx.Client(limits=_http_limits(), timeout=60.0))
+
+
+def create_async_openai_client():
+    import httpx
+    from openai import AsyncOpenAI
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY must be set")
+    return AsyncOpenAI(api_key=api_key, http_client=httpx.AsyncClient(limits=_http_limits(), timeout=60.0))
+
+
+_gmail_credentials = None
+_gmail_discovery_doc = None
+_gmail_lock = threading.Lock()
+
+
+def _gmail_shared_state():
+    """Credentials and the bundled discovery document, built once per process."""
+    global _gmail_credentials, _gmail_discovery_doc
+    with _gmail_lock:
+        if _gmail_credentials is None:
+            from google.oauth2.credentials import Credentials
+            from googleapiclient import discovery_cache
+
+            client_id = os.getenv("GMAIL_CLIENT_ID")
+            client_secret = os.getenv("GMAIL_CLIENT_SECRET")
+            refresh_token = os.getenv("GMAIL_REFRESH_TOKEN")
+            if not all([client_id, client_secret, refresh_token]):
+                raise ValueError("Gmail OAuth credentials not configured")
+
+            _gmail_discovery_doc = discovery_cache.get_static_doc("gmail", "v1")
+            _gmail_credentials = Credentials(
+                token=None,
+                refresh_token=refresh_token,
+                token_uri="https://oauth2.googleapis.com/token",
+                client_id=client_id,
+                client_secret=client_secret
+            )
+        return _gmail_credentials, _gmail_discovery_doc
+
+
+def create_gmail_service():
+    import google_auth_httplib2
+    import httplib2
+    from googleapiclient.discovery import build_from_document
+
+    creds, discovery_doc = _gmail_shared_state()
+    http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http(timeout=60))
+    return build_from_document(discovery_doc, http=http)
+
+
+def _check_gmail(service) -> bool:
+    return _gmail_credentials is not None and (_gmail_credentials.valid or bool(_gmail_credentials.refresh_token))
+
+
+def create_speech_client():
+    from google.cloud import speech
+    return speech.SpeechClient()
+
+
+def create_async_speech_client():
+    from google.cloud import speech
+    return speech.SpeechAsyncClient()
+
+
+def create_tts_client():
+    from google.cloud import texttospeech
+    return texttospeech.TextToSpeechClient()
+
+
+def create_async_tts_client():
+    from google.cloud import texttospeech
+    return texttospeech.TextToSpeechAsyncClient()
+
+
+registry = ClientRegistry()
+registry.register("supabase", create_supabase_client, close=lambda c: c.postgrest.aclose())
+registry.register("openai", create_openai_client, close=lambda c: c.close(), check=lambda c: not c.is_closed())
+registry.register("gmail", create_gmail_service, close=lambda s: s.close(), check=_check_gmail, per_thread=True)
+registry.register("speech", create_speech_client, close=lambda c: c.transport.close())
+registry.register("tts", create_tts_client, close=lambda c: c.transport.close())
+registry.register("supabase_async", create_async_supabase_client, close=lambda c: c.postgrest.aclose())
+registry.register("openai_async", create_async_openai_client, close=lambda c: c.close(), check=lambda c: not c.is_closed())
+registry.register("speech_async", create_async_speech_client, close=lambda c: c.transport.close())
+registry.register("tts_async", create_async_tts_client, close=lambda c: c.transport.close())
@@ -11,39 +11,24 @@ Usage:
     python email_cli.py get --message-id "abc123"
     python email_cli.py label --message-id "abc123" --label "Important"
     python email_cli.py archive --message-id "abc123"
+    python email_cli.py serve    # JSON-lines worker mode (see jsonl_worker.py)
 """
 import argparse
 import json
 import sys
-import os
 import base64
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import Dict, Any, List
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
+from clients import registry
+from jsonl_worker import serve
+
 
 def get_gmail_service():
-    """Initialize and return Gmail API service."""
-    # Use OAuth refresh token to get credentials
-    client_id = os.getenv("GMAIL_CLIENT_ID")
-    client_secret = os.getenv("GMAIL_CLIENT_SECRET")
-    refresh_token = os.getenv("GMAIL_REFRESH_TOKEN")
-    
-    if not all([client_id, client_secret, refresh_token]):
-        raise ValueError("Gmail OAuth credentials not configured")
-    
-    creds = Credentials(
-        token=None,
-        refresh_token=refresh_token,
-        token_uri="https://oauth2.googleapis.com/token",
-        client_id=client_id,
-        client_secret=client_secret
-    )
-    
-    return build('gmail', 'v1', credentials=creds)
+    """Return the Gmail API service for the current thread (built once, then reused)."""
+    return registry.get("gmail")
 
 
 def send_email(to: str, subject: str, body: str, cc: str = None, bcc: str = None) -> Dict[str, Any]:
@@ -222,6 +207,16 @@ def archive_email(message_id: str) -> Dict[str, Any]:
         return {"status": "error", "message": str(e)}
 
 
+# Commands exposed by `serve` (argument names match the function signatures)
+COMMANDS = {
+    "send": send_email,
+    "list": list_emails,
+    "get": get_email,
+    "label": label_email,
+    "archive": archive_email,
+}
+
+
 def main():
     parser = argparse.ArgumentParser(description="Email CLI Tool")
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
@@ -252,12 +247,20 @@ def main():
     archive_parser = subparsers.add_parser("archive", help="Archive an email")
     archive_parser.add_argument("--message-id", required=True, help="Message ID")
     
+    # Serve command
+    subparsers.add_parser("serve", help="Serve JSON-lines requests on stdin/stdout")
+    
     args = parser.parse_args()
     
     if not args.command:
         parser.print_help()
         sys.exit(1)
     
+    if args.command == "serve":
+        serve(COMMANDS)
+        registry.close()
+        return
+    
     # Execute command
     result = {}
     if args.command == "send":
@@ -0,0 +1,215 @@
+"""
+Embedding Cache - Persistent cache for text embeddings
+
+Every knowledge base search embeds the query with OpenAI, and voice users ask
+the same handful of questions ("what's our refund policy") over and over. The
+cache keys embeddings by model and normalized text and keeps them in two
+tiers:
+
+- memory: an in-process LRU of EMBEDDING_CACHE_MEMORY_ENTRIES vectors
+- disk:   a SQLite database at EMBEDDING_CACHE_PATH (WAL mode, so the API
+          server, tool workers and ingestion scripts can share it), storing
+          vectors as float32 blobs, with a TTL (EMBEDDING_CACHE_TTL_DAYS) and
+          an entry cap (EMBEDDING_CACHE_MAX_ENTRIES, least recently used
+          entries are evicted first)
+
+Set EMBEDDING_CACHE_PATH to an empty string to keep the cache in memory only.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "voice-email-agent", "embeddings.sqlite3")
+
+# Disk entries are pruned to the cap every this many writes
+PRUNE_INTERVAL = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    dim INTEGER NOT NULL,
+    vector BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used);
+"""
+
+
+def normalize_text(text: str) -> str:
+    """Case- and whitespace-insensitive form used for cache keys."""
+    return " ".join(text.casefold().split())
+
+
+def cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+def pack_vector(vector: List[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def unpack_vector(blob: bytes) -> List[float]:
+    vector = array("f")
+    vector.frombytes(blob)
+    return vector.tolist()
+
+
+class EmbeddingCache:
+    """Two-tier (memory LRU + SQLite) embedding cache with hit/miss counters."""
+
+    def __init__(self, path: Optional[str] = None, memory_entries: int = 2048,
+                 ttl_seconds: float = 30 * 86400, max_entries: int = 100_000):
+        self.path = path or None
+        self.memory_entries = memory_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+        self._db: Optional[sqlite3.Connection] = None
+
+        if self.path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._db = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute("PRAGMA synchronous=NORMAL")
+                self._db.executescript(SCHEMA)
+            except sqlite3.Error:
+                # Unusable location: run with the memory tier only
+                self._db = None
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """Return the cached embedding, or None."""
+        key = cache_key(model, text)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return vector
+
+            vector = self._read_disk(key)
+            if vector is None:
+                self._counters["misses"] += 1
+                return None
+            self._counters["disk_hits"] += 1
+            self._remember(key, vector)
+            return vector
+
+    def put(self, model: str, text: str, vector: List[float]) -> None:
+        """Store an embedding in both tiers."""
+        key = cache_key(model, text)
+        with self._lock:
+            self._remember(key, vector)
+            self._write_disk(key, model, vector)
+
+    def get_or_create(self, model: str, text: str, create: Callable[[str], List[float]]) -> List[float]:
+        """Return the cached embedding, computing and storing it on a miss."""
+        vector = self.get(model, text)
+        if vector is None:
+            vector = create(text)
+            self.put(model, text, vector)
+        return vector
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, key: str) -> Optional[List[float]]:
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute("SELECT vector, created_at FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if now - row[1] > self.ttl_seconds:
+                self._db.execute("DELETE FROM embeddings WHERE key = ?", (key,))
+                self._counters["expired"] += 1
+                return None
+            self._db.execute("UPDATE embeddings SET last_used = ? WHERE key = ?", (now, key))
+            return unpack_vector(row[0])
+        except sqlite3.Error:
+            return None
+
+    def _write_disk(self, key: str, model: str, vector: List[float]) -> None:
+        if self._db is None:
+            return
+        now = time.time()
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO embeddings (key, model, dim, vector, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, len(vector), pack_vector(vector), now, now),
+            )
+            self._writes += 1
+            if self._writes % PRUNE_INTERVAL == 0:
+                self._prune()
+        except sqlite3.Error:
+            pass
+
+    def _prune(self) -> None:
+        """Drop expired entries and the least recently used ones beyond the cap."""
+        self._db.execute("DELETE FROM embeddings WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+            self._counters["evictions"] += excess
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["memory_hits"] + self._counters["disk_hits"] + self._counters["misses"]
+            hits = lookups - self._counters["misses"]
+            disk_entries = None
+            if self._db is not None:
+                try:
+                    disk_entries = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                except sqlite3.Error:
+                    pass
+            return {
+                **self._counters,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """The process-wide cache configured from EMBEDDING_CACHE_* variables."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache(
+                path=os.path.expanduser(os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH)),
+                memory_entries=int(os.getenv("EMBEDDING_CACHE_MEMORY_ENTRIES", "2048")),
+                ttl_seconds=float(os.getenv("EMBEDDING_CACHE_TTL_DAYS", "30")) * 86400,
+                max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "100000")),
+            )
+        return _cache
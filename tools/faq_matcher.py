@@ -0,0 +1,152 @@
+"""
+FAQ Matcher - Answer common questions straight from the `faqs` table
+
+Most support questions ("how do I reset my password?") have a curated answer
+in `faqs`, yet retrieve_info used to run a knowledge base search and a GPT-4
+synthesis call for each of them. The matcher holds every FAQ in memory with:
+
+- its question embedding (`faqs.question_embedding`, computed at load time
+  for rows that predate the column), in one normalized float32 matrix
+- a keyword index from each FAQ keyword (single words or phrases) to FAQs
+- a lookup of normalized question texts, so repeating a question verbatim
+  needs no embedding at all
+
+A question's score against an FAQ is the cosine similarity of the embeddings
+plus `keyword_weight` times the share of the FAQ's keywords it contains;
+callers answer with the stored text when the best score clears their
+threshold.
+
+`UsageRecorder` batches the resulting `usage_count`/`last_used` updates and
+writes them behind the request path.
+"""
+import atexit
+import re
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from embedding_cache import normalize_text
+from vector_index import as_vector
+
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def _words(text: str) -> List[str]:
+    return WORD_PATTERN.findall(text.lower())
+
+
+class FAQMatcher:
+    """In-memory FAQ lookup by exact question, keywords and question embedding."""
+
+    def __init__(self, faqs: Sequence[Dict[str, Any]], embeddings: Sequence[Any], keyword_weight: float = 0.1):
+        self.faqs = list(faqs)
+        self.keyword_weight = keyword_weight
+        dim = len(as_vector(embeddings[0])) if self.faqs else 0
+        matrix = np.array([as_vector(e) for e in embeddings], dtype=np.float32).reshape(len(self.faqs), dim)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self._matrix = matrix / np.where(norms > 0, norms, 1.0)
+
+        self._questions = {normalize_text(faq["question"]): i for i, faq in enumerate(self.faqs)}
+        # first word of a keyword -> (faq, all words of the keyword)
+        self._keywords: Dict[str, List[Tuple[int, Tuple[str, ...]]]] = defaultdict(list)
+        self._keyword_counts = np.zeros(len(self.faqs), dtype=np.float32)
+        for i, faq in enumerate(self.faqs):
+            phrases = {tuple(_words(k)) for k in faq.get("keywords") or []} - {()}
+            for phrase in phrases:
+                self._keywords[phrase[0]].append((i, phrase))
+            self._keyword_counts[i] = len(phrases)
+
+    def __len__(self) -> int:
+        return len(self.faqs)
+
+    def exact(self, question: str) -> Optional[Dict[str, Any]]:
+        """The FAQ whose question is `question` up to case and whitespace."""
+        i = self._questions.get(normalize_text(question))
+        return None if i is None else self.faqs[i]
+
+    def keyword_coverage(self, question: str) -> np.ndarray:
+        """Per FAQ, the share of its keywords that occur in `question`."""
+        words = _words(question)
+        present = set(words)
+        joined = f" {' '.join(words)} "
+        hits = np.zeros(len(self.faqs), dtype=np.float32)
+        for word in present:
+            for i, phrase in self._keywords.get(word, ()):
+                if len(phrase) == 1 or f" {' '.join(phrase)} " in joined:
+                    hits[i] += 1
+        return np.divide(hits, self._keyword_counts, out=np.zeros_like(hits), where=self._keyword_counts > 0)
+
+    def match(self, question: str, embedding: Any) -> Tuple[Optional[Dict[str, Any]], float]:
+        """Best FAQ for `question` and its score (cosine plus keyword bonus)."""
+        if not self.faqs:
+            return None, 0.0
+        query = as_vector(embedding)
+        norm = np.linalg.norm(query)
+        scores = self._matrix @ (query / norm if norm else query)
+        scores = scores + self.keyword_weight * self.keyword_coverage(question)
+        best = int(np.argmax(scores))
+        return self.faqs[best], float(scores[best])
+
+
+class UsageRecorder:
+    """
+    Write-behind counter of FAQ hits: `record()` only updates memory, and a
+    background thread hands the accumulated {id, count, last_used} rows to
+    `flush` every `interval` seconds (or once `max_pending` FAQs are waiting).
+    Rows of a failed flush are kept for the next one.
+    """
+
+    def __init__(self, flush: Callable[[List[Dict[str, Any]]], None],
+                 interval: float = 30.0, max_pending: int = 100):
+        self._flush = flush
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, faq_id: str) -> None:
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            entry = self._pending.setdefault(str(faq_id), {"id": str(faq_id), "count": 0})
+            entry["count"] += 1
+            entry["last_used"] = now
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+            if len(self._pending) >= self.max_pending:
+                self._wake.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(entry["count"] for entry in self._pending.values())
+
+    def flush(self) -> int:
+        """Write the pending counts now; returns the number of FAQs written."""
+        with self._lock:
+            rows, self._pending = list(self._pending.values()), {}
+        if not rows:
+            return 0
+        try:
+            self._flush(rows)
+        except Exception:
+            # Merge back so the counts go out with the next flush
+            with self._lock:
+                for row in rows:
+                    entry = self._pending.setdefault(row["id"], {"id": row["id"], "count": 0})
+                    entry["count"] += row["count"]
+                    entry["last_used"] = max(entry.get("last_used", ""), row["last_used"])
+            return 0
+        return len(rows)
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
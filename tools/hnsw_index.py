@@ -0,0 +1,580 @@
+"""
+HNSW Index - Approximate nearest-neighbour search for large knowledge bases
+
+Exact search (vector_index.py) touches every embedding per query, and the
+ivfflat index in setup_supabase_complete.sql (`lists = 100`) degrades once
+whole mailboxes and archives are loaded into `documents`. This module is a
+Hierarchical Navigable Small World graph (Malkov & Yashunin) over the same
+normalized float32 vectors:
+
+- M:               links per node on the upper layers (2*M on layer 0)
+- ef_construction: candidate list size while inserting (build quality)
+- ef_search:       candidate list size while querying (recall vs. latency)
+
+Inserts are incremental. Deletes leave a tombstone that is still used for
+navigation but never returned; `compacted()` rebuilds the graph without them.
+`save()`/`load()` persist the graph, vectors and payloads to one .npz file so
+a restart does not have to rebuild it.
+
+The index has the same interface as `VectorIndex` (upsert / remove / search)
+and is selected with RAG_INDEX_BACKEND=hnsw.
+
+`HNSWIndex` is pure Python. At 1536 dimensions an insert takes 10-15 ms
+(a 12k-document build over two minutes), and a query only matches the exact
+NumPy scan at around 3k documents (1.6 ms each, scripts/benchmark_ann.py).
+It pays off from about FALLBACK_BREAK_EVEN documents (1.6 ms against 7 ms
+at 12k) with the graph persisted to RAG_INDEX_PATH, so it is not rebuilt
+per start; below that, RAG_INDEX_BACKEND=exact is the better choice. When
+hnswlib (requirements.txt) is installed, `create_hnsw_index()` /
+`load_hnsw_index()` use `HnswlibIndex` instead: the same graph in C++ behind
+the same interface, worthwhile at any size where an approximate index is
+(RAG_HNSW_ENGINE=python keeps the fallback). Without it, rag_cli.py builds
+the exact index rather than a pure-Python graph beyond PYTHON_BUILD_LIMIT
+documents.
+"""
+import heapq
+import json
+import math
+import os
+import random
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from vector_index import PAYLOAD_FIELDS, Vector, as_vector, normalize
+
+try:
+    import hnswlib
+except ImportError:
+    # Declared in requirements.txt; HNSWIndex is the fallback without it
+    hnswlib = None
+
+
+# "auto" uses hnswlib when it is installed, "python" always HNSWIndex
+HNSW_ENGINE = os.getenv("RAG_HNSW_ENGINE", "auto")
+# Documents (at 1536 dimensions) from which the pure-Python graph is worth
+# its build time over the exact scan; see scripts/benchmark_ann.py
+FALLBACK_BREAK_EVEN = 10_000
+# Without hnswlib, a cold build of more documents than this would take well
+# over ten minutes; rag_cli.py uses the exact index instead
+PYTHON_BUILD_LIMIT = 5 * FALLBACK_BREAK_EVEN
+# Largest filtered subset HnswlibIndex scans exactly when the graph walk
+# comes up short
+EXACT_SUBSET_LIMIT = 4096
+
+
+class HNSWIndex:
+    """HNSW graph over cosine similarity with tombstone deletes and persistence."""
+
+    def __init__(self, dim: int = 1536, M: int = 16, ef_construction: int = 200,
+                 ef_search: int = 64, capacity: int = 1024, seed: Optional[int] = None):
+        self.dim = dim
+        self.M = M
+        self.M0 = 2 * M
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self._level_mult = 1 / math.log(M)
+        self._random = random.Random(seed)
+
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._doc_types = np.empty(capacity, dtype=object)
+        self._categories = np.empty(capacity, dtype=object)
+        self._deleted = np.zeros(capacity, dtype=bool)
+        self._payloads: List[Dict[str, Any]] = []
+        # node -> layer -> neighbour nodes
+        self._links: List[List[List[int]]] = []
+        self._nodes: Dict[str, int] = {}
+        self._entry = -1
+        self._max_level = -1
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return str(doc_id) in self._nodes
+
+    @property
+    def node_count(self) -> int:
+        """Graph nodes including tombstones."""
+        return len(self._links)
+
+    @property
+    def deleted_fraction(self) -> float:
+        return 1 - len(self._nodes) / self.node_count if self.node_count else 0.0
+
+    def ids(self) -> List[str]:
+        return list(self._nodes)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]], dim: int = 1536, **params) -> "HNSWIndex":
+        """Build an index from `documents` rows (embedding plus payload columns)."""
+        rows = [row for row in rows if row.get("embedding") is not None]
+        index = cls(dim=dim, capacity=max(len(rows), 1), **params)
+        for row in rows:
+            index.upsert(row)
+        return index
+
+    # ------------------------------------------------------------------
+    # Graph construction
+    # ------------------------------------------------------------------
+
+    def upsert(self, row: Dict[str, Any]) -> None:
+        """Insert a document; an existing one with the same id is replaced."""
+        vector = normalize(as_vector(row["embedding"]))
+        if vector.shape != (self.dim,):
+            raise ValueError(f"Expected a {self.dim}-dimensional embedding, got {vector.shape}")
+        payload = {field: row.get(field) for field in PAYLOAD_FIELDS}
+
+        with self._lock:
+            self.remove(payload["id"])
+            node = self.node_count
+            if node == len(self._vectors):
+                self._grow()
+            self._vectors[node] = vector
+            self._doc_types[node] = payload["doc_type"]
+            self._categories[node] = payload["category"]
+            self._payloads.append(payload)
+            self._nodes[str(payload["id"])] = node
+            self._insert(node, vector)
+
+    def _grow(self) -> None:
+        capacity = 2 * len(self._vectors)
+        size = self.node_count
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[:size] = self._vectors[:size]
+        deleted = np.zeros(capacity, dtype=bool)
+        deleted[:size] = self._deleted[:size]
+        doc_types = np.empty(capacity, dtype=object)
+        doc_types[:size] = self._doc_types[:size]
+        categories = np.empty(capacity, dtype=object)
+        categories[:size] = self._categories[:size]
+        self._vectors, self._deleted = vectors, deleted
+        self._doc_types, self._categories = doc_types, categories
+
+    def _random_level(self) -> int:
+        return int(-math.log(1.0 - self._random.random()) * self._level_mult)
+
+    def _insert(self, node: int, vector: np.ndarray) -> None:
+        level = self._random_level()
+        self._links.append([[] for _ in range(level + 1)])
+
+        if self._entry < 0:
+            self._entry, self._max_level = node, level
+            return
+
+        entry_points = [self._entry]
+        for layer in range(self._max_level, level, -1):
+            entry_points = [self._search_layer(vector, entry_points, 1, layer)[0][1]]
+
+        for layer in range(min(level, self._max_level), -1, -1):
+            found = self._search_layer(vector, entry_points, self.ef_construction, layer)
+            neighbours = self._select_neighbours(vector, found, self.M)
+            self._links[node][layer] = neighbours
+
+            max_links = self.M0 if layer == 0 else self.M
+            for neighbour in neighbours:
+                links = self._links[neighbour][layer]
+                links.append(node)
+                if len(links) > max_links:
+                    own = self._vectors[neighbour]
+                    ranked = sorted(zip((self._vectors[links] @ own).tolist(), links), reverse=True)
+                    self._links[neighbour][layer] = self._select_neighbours(own, ranked, max_links)
+
+            entry_points = [n for _, n in found]
+
+        if level > self._max_level:
+            self._entry, self._max_level = node, level
+
+    def _search_layer(self, query: np.ndarray, entry_points: List[int],
+                      ef: int, layer: int) -> List[Tuple[float, int]]:
+        """Greedy best-first search of one layer; (similarity, node), best first."""
+        visited = set(entry_points)
+        sims = (self._vectors[entry_points] @ query).tolist()
+        candidates = [(-s, n) for s, n in zip(sims, entry_points)]
+        heapq.heapify(candidates)
+        results = [(s, n) for s, n in zip(sims, entry_points)]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            negative_sim, node = heapq.heappop(candidates)
+            if -negative_sim < results[0][0] and len(results) >= ef:
+                break
+            neighbours = [n for n in self._links[node][layer] if n not in visited]
+            if not neighbours:
+                continue
+            visited.update(neighbours)
+            for sim, neighbour in zip((self._vectors[neighbours] @ query).tolist(), neighbours):
+                if len(results) < ef or sim > results[0][0]:
+                    heapq.heappush(candidates, (-sim, neighbour))
+                    heapq.heappush(results, (sim, neighbour))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+
+        return sorted(results, reverse=True)
+
+    def _select_neighbours(self, vector: np.ndarray, ranked: List[Tuple[float, int]], m: int) -> List[int]:
+        """
+        Neighbour selection heuristic: keep a candidate only if it is closer to
+        the new node than to every neighbour kept so far (spreads links across
+        directions), then top up with the closest discarded candidates.
+        """
+        selected: List[int] = []
+        discarded: List[int] = []
+        for sim, candidate in ranked:
+            if len(selected) >= m:
+                break
+            if selected and np.any(self._vectors[selected] @ self._vectors[candidate] >= sim):
+                discarded.append(candidate)
+            else:
+                selected.append(candidate)
+        return selected + discarded[:m - len(selected)]
+
+    def remove(self, doc_id: str) -> bool:
+        """Tombstone a document; it keeps routing searches but is never returned."""
+        with self._lock:
+            node = self._nodes.pop(str(doc_id), None)
+            if node is None:
+                return False
+            self._deleted[node] = True
+            return True
+
+    def compacted(self) -> "HNSWIndex":
+        """A rebuilt copy of the index without tombstones."""
+        with self._lock:
+            rows = [{**self._payloads[node], "embedding": self._vectors[node]} for node in self._nodes.values()]
+        return HNSWIndex.from_rows(rows, dim=self.dim, M=self.M, ef_construction=self.ef_construction,
+                                   ef_search=self.ef_search)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def search(self, query_embedding: Vector, limit: int = 5, threshold: float = 0.7,
+               doc_type: Optional[str] = None, category: Optional[str] = None,
+               ef_search: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Approximate top `limit` documents with similarity above `threshold`."""
+        query = normalize(as_vector(query_embedding))
+
+        with self._lock:
+            if not self._nodes or limit <= 0:
+                return []
+
+            entry_points = [self._entry]
+            for layer in range(self._max_level, 0, -1):
+                entry_points = [self._search_layer(query, entry_points, 1, layer)[0][1]]
+            found = self._search_layer(query, entry_points, max(ef_search or self.ef_search, limit), 0)
+
+            def wanted(node: int) -> bool:
+                return not self._deleted[node] \
+                    and (doc_type is None or self._doc_types[node] == doc_type) \
+                    and (category is None or self._categories[node] == category)
+
+            hits = [(sim, node) for sim, node in found if wanted(node)][:limit]
+
+            if len(hits) < limit and (doc_type is not None or category is not None):
+                # Selective filters can starve the graph walk; scan the subset exactly
+                size = self.node_count
+                mask = ~self._deleted[:size]
+                if doc_type is not None:
+                    mask &= self._doc_types[:size] == doc_type
+                if category is not None:
+                    mask &= self._categories[:size] == category
+                subset = np.nonzero(mask)[0]
+                sims = self._vectors[subset] @ query
+                order = np.argsort(-sims)[:limit]
+                hits = [(float(sims[i]), int(subset[i])) for i in order]
+
+            return [
+                {**self._payloads[node], "similarity": float(sim)}
+                for sim, node in hits
+                if sim > threshold
+            ]
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def save(self, path: str) -> None:
+        """Write the index to `path` (.npz), replacing any previous file atomically."""
+        with self._lock:
+            size = self.node_count
+            levels = np.array([len(layers) for layers in self._links], dtype=np.int32)
+            lists = [links for layers in self._links for links in layers]
+            offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(links) for links in lists])
+            neighbours = np.fromiter((n for links in lists for n in links), dtype=np.int32, count=int(offsets[-1]))
+            params = {
+                "engine": "python", "dim": self.dim, "M": self.M, "ef_construction": self.ef_construction,
+                "ef_search": self.ef_search, "entry": self._entry, "max_level": self._max_level,
+            }
+            payloads = json.dumps(self._payloads, default=str).encode("utf-8")
+
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(
+                    f,
+                    vectors=self._vectors[:size],
+                    deleted=self._deleted[:size],
+                    levels=levels,
+                    offsets=offsets,
+                    neighbours=neighbours,
+                    params=np.frombuffer(json.dumps(params).encode("utf-8"), dtype=np.uint8),
+                    payloads=np.frombuffer(payloads, dtype=np.uint8),
+                )
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "HNSWIndex":
+        with np.load(path, allow_pickle=False) as data:
+            params = json.loads(data["params"].tobytes())
+            if params.get("engine", "python") != "python":
+                raise ValueError(f"{path} holds an {params['engine']} graph")
+            index = cls(dim=params["dim"], M=params["M"], ef_construction=params["ef_construction"],
+                        ef_search=params["ef_search"], capacity=max(len(data["vectors"]), 1))
+            size = len(data["vectors"])
+            index._vectors[:size] = data["vectors"]
+            index._deleted[:size] = data["deleted"]
+            index._payloads = json.loads(data["payloads"].tobytes())
+
+            offsets, neighbours = data["offsets"].tolist(), data["neighbours"].tolist()
+            position = 0
+            for level_count in data["levels"].tolist():
+                layers = []
+                for _ in range(level_count):
+                    layers.append(neighbours[offsets[position]:offsets[position + 1]])
+                    position += 1
+                index._links.append(layers)
+
+        for node, payload in enumerate(index._payloads):
+            index._doc_types[node] = payload["doc_type"]
+            index._categories[node] = payload["category"]
+            if not index._deleted[node]:
+                index._nodes[str(payload["id"])] = node
+        index._entry, index._max_level = params["entry"], params["max_level"]
+        return index
+
+
+class HnswlibIndex:
+    """`HNSWIndex` interface over an hnswlib graph (inner product on normalized vectors)."""
+
+    def __init__(self, dim: int = 1536, M: int = 16, ef_construction: int = 200,
+                 ef_search: int = 64, capacity: int = 1024, seed: Optional[int] = None):
+        if hnswlib is None:
+            raise ImportError("HnswlibIndex needs the hnswlib package (pip install hnswlib)")
+        self.dim = dim
+        self.M = M
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self._graph = hnswlib.Index(space="ip", dim=dim)
+        self._graph.init_index(max_elements=max(capacity, 1), M=M, ef_construction=ef_construction,
+                               random_seed=100 if seed is None else seed)
+        self._graph.set_ef(ef_search)
+        # Labels are node numbers, as in HNSWIndex
+        self._doc_types = np.empty(max(capacity, 1), dtype=object)
+        self._categories = np.empty(max(capacity, 1), dtype=object)
+        self._deleted = np.zeros(max(capacity, 1), dtype=bool)
+        self._payloads: List[Dict[str, Any]] = []
+        self._nodes: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return str(doc_id) in self._nodes
+
+    @property
+    def node_count(self) -> int:
+        return len(self._payloads)
+
+    @property
+    def deleted_fraction(self) -> float:
+        return 1 - len(self._nodes) / self.node_count if self.node_count else 0.0
+
+    def ids(self) -> List[str]:
+        return list(self._nodes)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]], dim: int = 1536, **params) -> "HnswlibIndex":
+        rows = [row for row in rows if row.get("embedding") is not None]
+        index = cls(dim=dim, capacity=max(len(rows), 1), **params)
+        for row in rows:
+            index.upsert(row)
+        return index
+
+    def upsert(self, row: Dict[str, Any]) -> None:
+        """Insert a document; an existing one with the same id is replaced."""
+        vector = normalize(as_vector(row["embedding"]))
+        if vector.shape != (self.dim,):
+            raise ValueError(f"Expected a {self.dim}-dimensional embedding, got {vector.shape}")
+        payload = {field: row.get(field) for field in PAYLOAD_FIELDS}
+
+        with self._lock:
+            self.remove(payload["id"])
+            node = self.node_count
+            if node == len(self._deleted):
+                self._grow()
+            self._graph.add_items(vector[None, :], [node])
+            self._doc_types[node] = payload["doc_type"]
+            self._categories[node] = payload["category"]
+            self._payloads.append(payload)
+            self._nodes[str(payload["id"])] = node
+
+    def _grow(self) -> None:
+        capacity = 2 * len(self._deleted)
+        size = self.node_count
+        self._graph.resize_index(capacity)
+        deleted = np.zeros(capacity, dtype=bool)
+        deleted[:size] = self._deleted[:size]
+        doc_types = np.empty(capacity, dtype=object)
+        doc_types[:size] = self._doc_types[:size]
+        categories = np.empty(capacity, dtype=object)
+        categories[:size] = self._categories[:size]
+        self._deleted, self._doc_types, self._categories = deleted, doc_types, categories
+
+    def remove(self, doc_id: str) -> bool:
+        """Tombstone a document (hnswlib's mark_deleted)."""
+        with self._lock:
+            node = self._nodes.pop(str(doc_id), None)
+            if node is None:
+                return False
+            self._graph.mark_deleted(node)
+            self._deleted[node] = True
+            return True
+
+    def compacted(self) -> "HnswlibIndex":
+        """A rebuilt copy of the index without tombstones."""
+        with self._lock:
+            nodes = list(self._nodes.values())
+            vectors = np.asarray(self._graph.get_items(nodes), dtype=np.float32) if nodes else []
+            rows = [{**self._payloads[node], "embedding": vector} for node, vector in zip(nodes, vectors)]
+        return HnswlibIndex.from_rows(rows, dim=self.dim, M=self.M, ef_construction=self.ef_construction,
+                                      ef_search=self.ef_search)
+
+    def search(self, query_embedding: Vector, limit: int = 5, threshold: float = 0.7,
+               doc_type: Optional[str] = None, category: Optional[str] = None,
+               ef_search: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Approximate top `limit` documents with similarity above `threshold`."""
+        query = normalize(as_vector(query_embedding))
+
+        with self._lock:
+            if not self._nodes or limit <= 0:
+                return []
+            size = self.node_count
+            mask = ~self._deleted[:size]
+            if doc_type is not None:
+                mask &= self._doc_types[:size] == doc_type
+            if category is not None:
+                mask &= self._categories[:size] == category
+            k = min(limit, int(mask.sum()))
+            if k == 0:
+                return []
+
+            filtered = doc_type is not None or category is not None
+            self._graph.set_ef(max(ef_search or self.ef_search, k))
+            try:
+                # Filters are applied during the walk; the callback needs a single thread
+                labels, distances = self._graph.knn_query(
+                    query[None, :], k=k, num_threads=1,
+                    filter=(lambda node: bool(mask[node])) if filtered else None)
+                # Inner product space: distance = 1 - similarity
+                hits = [(1.0 - float(d), int(n)) for n, d in zip(labels[0], distances[0])]
+            except RuntimeError:
+                # Too few reachable matching nodes for k
+                hits = []
+            if len(hits) < k:
+                # A selective filter can starve the walk; a small subset is scanned exactly
+                subset = np.nonzero(mask)[0]
+                if len(subset) <= EXACT_SUBSET_LIMIT:
+                    sims = np.asarray(self._graph.get_items(subset.tolist()), dtype=np.float32) @ query
+                    order = np.argsort(-sims)[:limit]
+                    hits = [(float(sims[i]), int(subset[i])) for i in order]
+
+            return [
+                {**self._payloads[node], "similarity": sim}
+                for sim, node in hits
+                if sim > threshold
+            ]
+
+    def save(self, path: str) -> None:
+        """Write the graph and payloads to `path` (.npz), replacing any previous file atomically."""
+        with self._lock:
+            fd, graph_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".hnswlib")
+            os.close(fd)
+            try:
+                self._graph.save_index(graph_path)
+                with open(graph_path, "rb") as f:
+                    graph = f.read()
+            finally:
+                os.remove(graph_path)
+            params = {"engine": "hnswlib", "dim": self.dim, "M": self.M,
+                      "ef_construction": self.ef_construction, "ef_search": self.ef_search}
+            payloads = json.dumps(self._payloads, default=str).encode("utf-8")
+
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(
+                    f,
+                    graph=np.frombuffer(graph, dtype=np.uint8),
+                    deleted=self._deleted[:self.node_count],
+                    params=np.frombuffer(json.dumps(params).encode("utf-8"), dtype=np.uint8),
+                    payloads=np.frombuffer(payloads, dtype=np.uint8),
+                )
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "HnswlibIndex":
+        with np.load(path, allow_pickle=False) as data:
+            params = json.loads(data["params"].tobytes())
+            if params.get("engine") != "hnswlib":
+                raise ValueError(f"{path} does not hold an hnswlib graph")
+            deleted = data["deleted"]
+            index = cls(dim=params["dim"], M=params["M"], ef_construction=params["ef_construction"],
+                        ef_search=params["ef_search"], capacity=max(len(deleted), 1))
+            fd, graph_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".hnswlib")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data["graph"].tobytes())
+                index._graph.load_index(graph_path, max_elements=max(len(deleted), 1))
+            finally:
+                os.remove(graph_path)
+            index._graph.set_ef(index.ef_search)
+            index._deleted[:len(deleted)] = deleted
+            index._payloads = json.loads(data["payloads"].tobytes())
+
+        for node, payload in enumerate(index._payloads):
+            index._doc_types[node] = payload["doc_type"]
+            index._categories[node] = payload["category"]
+            if not index._deleted[node]:
+                index._nodes[str(payload["id"])] = node
+        return index
+
+
+AnyHNSWIndex = Union[HNSWIndex, HnswlibIndex]
+
+
+def _native() -> bool:
+    return hnswlib is not None and HNSW_ENGINE != "python"
+
+
+def python_build_fits(size: int) -> bool:
+    """Whether a cold build of `size` documents is affordable: hnswlib is installed or it is small."""
+    return hnswlib is not None or size <= PYTHON_BUILD_LIMIT
+
+
+def create_hnsw_index(dim: int = 1536, **params) -> AnyHNSWIndex:
+    """An empty HNSW index: hnswlib's when installed, the pure-Python one otherwise."""
+    return HnswlibIndex(dim=dim, **params) if _native() else HNSWIndex(dim=dim, **params)
+
+
+def load_hnsw_index(path: str) -> AnyHNSWIndex:
+    """
+    Load a saved index with the engine create_hnsw_index() would use; a file
+    written by the other engine raises ValueError (rebuild it).
+    """
+    return HnswlibIndex.load(path) if _native() else HNSWIndex.load(path)
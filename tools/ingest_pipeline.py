@@ -0,0 +1,168 @@
+"""
+Ingest Pipeline - Staged, concurrent ingestion with bounded queues
+
+A sequential read -> embed -> write loop leaves the CPU idle while waiting
+on OpenAI and the database, and the network idle while parsing files. A
+`Pipeline` runs each stage in its own pool of threads instead, connected by
+bounded queues:
+
+    source -> [read] -> queue -> [chunk] -> queue -> [embed] -> queue -> [write]
+
+- a full queue blocks the stage feeding it (backpressure), so at most
+  `queue_size` items wait between two stages and memory stays flat however
+  many items the source yields
+- each stage has its own worker count, and can take its input in batches
+  (e.g. one embedding request for many documents)
+- a failing item is counted as an error of its stage and the rest go on
+- a reporter prints items done, throughput and queue depth per stage every
+  `progress_interval` seconds
+
+A stage function takes one item (or a list of items when `batch_size` > 1)
+and returns an iterable of items for the next stage (empty to drop it).
+"""
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "64"))
+INGEST_PROGRESS_SECONDS = float(os.getenv("INGEST_PROGRESS_SECONDS", "5"))
+
+_DONE = object()
+
+
+class Stage:
+    """One pipeline step: `fn` run by `workers` threads, `batch_size` items at a time."""
+
+    def __init__(self, name: str, fn: Callable[[Any], Optional[Iterable[Any]]],
+                 workers: int = 1, batch_size: int = 1, linger: float = 0.2):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        # How long a batching worker waits for more input before running a partial batch
+        self.linger = linger
+        self.processed = 0
+        self.emitted = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+
+class Pipeline:
+    """Stages connected by bounded queues, each served by its own threads."""
+
+    def __init__(self, stages: List[Stage], queue_size: int = INGEST_QUEUE_SIZE,
+                 progress_interval: float = INGEST_PROGRESS_SECONDS,
+                 report: Callable[[str], None] = print):
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.progress_interval = progress_interval
+        self.report = report
+        self._queues: List["queue.Queue[Any]"] = []
+        self._finished: List[int] = []
+        self._lock = threading.Lock()
+        self._started = 0.0
+
+    def run(self, items: Iterable[Any]) -> Dict[str, Dict[str, int]]:
+        """Push `items` through every stage; returns per-stage counters."""
+        self._queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        self._finished = [0] * len(self.stages)
+        self._started = time.monotonic()
+
+        threads = []
+        for index, stage in enumerate(self.stages):
+            for n in range(stage.workers):
+                thread = threading.Thread(target=self._work, args=(index,), daemon=True,
+                                          name=f"ingest-{stage.name}-{n}")
+                thread.start()
+                threads.append(thread)
+
+        stop = threading.Event()
+        reporter = threading.Thread(target=self._report_loop, args=(stop,), daemon=True)
+        reporter.start()
+        try:
+            for item in items:
+                self._queues[0].put(item)
+        finally:
+            for _ in range(self.stages[0].workers):
+                self._queues[0].put(_DONE)
+            for thread in threads:
+                thread.join()
+            stop.set()
+            reporter.join()
+
+        self.report(self.progress(final=True))
+        return self.counters()
+
+    def counters(self) -> Dict[str, Dict[str, int]]:
+        return {stage.name: {"processed": stage.processed, "emitted": stage.emitted, "errors": stage.errors}
+                for stage in self.stages}
+
+    def progress(self, final: bool = False) -> str:
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        parts = []
+        for stage, pending in zip(self.stages, self._queues):
+            part = f"{stage.name} {stage.processed} ({stage.processed / elapsed:.1f}/s"
+            part += ")" if final else f", {pending.qsize()} queued)"
+            if stage.errors:
+                part += f" {stage.errors} errors"
+            parts.append(part)
+        prefix = "✅ Done" if final else "⏳"
+        return f"{prefix} {elapsed:.1f}s | " + " | ".join(parts)
+
+    def _report_loop(self, stop: threading.Event) -> None:
+        while not stop.wait(self.progress_interval):
+            self.report(self.progress())
+
+    def _next_batch(self, stage: Stage, inbox: "queue.Queue[Any]") -> Tuple[List[Any], bool]:
+        """Up to `batch_size` items and whether the end of input was reached."""
+        first = inbox.get()
+        if first is _DONE:
+            return [], True
+        batch = [first]
+        while len(batch) < stage.batch_size:
+            try:
+                item = inbox.get(timeout=stage.linger)
+            except queue.Empty:
+                break
+            if item is _DONE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _work(self, index: int) -> None:
+        stage = self.stages[index]
+        inbox = self._queues[index]
+        outbox = self._queues[index + 1] if index + 1 < len(self.stages) else None
+        done = False
+        while not done:
+            batch, done = self._next_batch(stage, inbox)
+            if not batch:
+                continue
+            try:
+                outputs = stage.fn(batch if stage.batch_size > 1 else batch[0]) or ()
+                for output in outputs:
+                    if outbox is not None:
+                        outbox.put(output)
+                    with self._lock:
+                        stage.emitted += 1
+            except Exception as e:
+                with self._lock:
+                    stage.errors += len(batch)
+                    stage.last_error = str(e)
+                self.report(f"❌ {stage.name}: {e}")
+            finally:
+                with self._lock:
+                    stage.processed += len(batch)
+
+        # The last worker of a stage passes the end of input on
+        with self._lock:
+            self._finished[index] += 1
+            last = self._finished[index] == stage.workers
+        if last and outbox is not None:
+            for _ in range(self.stages[index + 1].workers):
+                outbox.put(_DONE)
@@ -0,0 +1,134 @@
+"""
+Ingest State - Content hashes, sync plans and checkpoints for re-runnable ingestion
+
+Every ingested document carries a `source_key` (a file's absolute path,
+or the JSON file plus the source/title of a record) and a `content_hash`
+of what was stored. A sync compares the current sources with those columns:
+
+- new       source key not in the table: embed and insert
+- changed   hash differs: re-embed and update the row in place (its chunks
+            are replaced)
+- unchanged hash matches: nothing to do, no embedding call
+- removed   key in the table (within the synced scope) but no longer in the
+            sources: delete, chunks cascade
+
+`sync_action` makes the first three calls; removals are whatever stored keys
+a sync did not see.
+
+`IngestState` is a local JSON manifest of the sources a run has finished
+(key -> hash, row id and, for files, mtime and size). It is saved after
+every batch, so an interrupted run resumes where it stopped, and files
+whose mtime and size still match are not even read again.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, Iterable, Optional
+
+
+DEFAULT_STATE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "voice-email-agent", "ingest")
+PAGE_SIZE = 1000
+
+# Columns whose change means the stored document is out of date
+HASHED_FIELDS = ("content", "title", "doc_type", "category", "metadata")
+
+
+def content_hash(row: Dict[str, Any]) -> str:
+    """SHA-256 over the stored fields of a document row."""
+    canonical = json.dumps({field: row.get(field) for field in HASHED_FIELDS},
+                           sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def state_path(name: str) -> str:
+    """Default manifest location for a sync scope (e.g. a data folder)."""
+    digest = hashlib.sha256(name.encode("utf-8")).hexdigest()[:16]
+    directory = os.path.expanduser(os.getenv("INGEST_STATE_DIR", DEFAULT_STATE_DIR))
+    return os.path.join(directory, f"{digest}.json")
+
+
+def fetch_sources(supabase: Any, prefix: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """source_key -> {id, content_hash} of stored top-level documents, optionally under `prefix`."""
+    sources: Dict[str, Dict[str, Any]] = {}
+    offset = 0
+    while True:
+        query = (supabase.table("documents").select("id, source_key, content_hash")
+                 .is_("parent_id", "null").not_.is_("source_key", "null"))
+        if prefix:
+            query = query.like("source_key", f"{prefix}%")
+        page = query.order("id").range(offset, offset + PAGE_SIZE - 1).execute().data
+        for row in page:
+            # LIKE treats _ and % in the prefix as wildcards
+            if prefix is None or row["source_key"].startswith(prefix):
+                sources[row["source_key"]] = {"id": row["id"], "content_hash": row.get("content_hash")}
+        offset += len(page)
+        if len(page) < PAGE_SIZE:
+            return sources
+
+
+def sync_action(digest: Optional[str], entry: Optional[Dict[str, Any]]) -> str:
+    """
+    "new", "changed" or "unchanged" for a source with hash `digest`, given its
+    stored {id, content_hash} (None if not stored). A stored row without a
+    hash (a parent whose chunks were never finished) counts as changed.
+    """
+    if entry is None:
+        return "new"
+    if not digest or entry.get("content_hash") != digest:
+        return "changed"
+    return "unchanged"
+
+
+class IngestState:
+    """JSON manifest of finished sources, written atomically on `save()`."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f).get("entries", {})
+            except (OSError, ValueError):
+                # A damaged manifest only costs re-hashing; the table is authoritative
+                self.entries = {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(key)
+
+    def file_unchanged(self, key: str, stat: os.stat_result) -> Optional[str]:
+        """The recorded hash of a file whose mtime and size still match, else None."""
+        entry = self.entries.get(key)
+        if entry and entry.get("mtime_ns") == stat.st_mtime_ns and entry.get("size") == stat.st_size:
+            return entry.get("content_hash")
+        return None
+
+    def record(self, key: str, digest: str, doc_id: Optional[str] = None,
+               stat: Optional[os.stat_result] = None) -> None:
+        entry: Dict[str, Any] = {"content_hash": digest, "id": doc_id}
+        if stat is not None:
+            entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+        self.entries[key] = entry
+
+    def forget(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self.entries.pop(key, None)
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".ingest-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"entries": self.entries}, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
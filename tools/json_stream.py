@@ -0,0 +1,150 @@
+"""
+JSON Stream - Incremental readers for large business data imports
+
+`json.load` needs the whole export in memory before the first record can be
+ingested. These readers yield `(section, record)` pairs as they are parsed
+instead, holding one record (plus a read buffer) at a time:
+
+- `iter_json_sections` reads the business_data.json layout, a top-level
+  object of arrays ({"documents": [...], "contacts": [...], ...})
+- `iter_json_lines` reads JSON Lines, one record per line with a `type`
+  naming its section ("document" / "documents", "contact", "proposal", "faq")
+
+`iter_records` picks the reader from the file suffix (.jsonl / .ndjson are
+JSON Lines).
+"""
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, TextIO, Tuple, Union
+
+
+SECTIONS = ("documents", "contacts", "proposals", "faqs")
+JSON_LINES_SUFFIXES = {".jsonl", ".ndjson"}
+READ_SIZE = 1 << 16
+
+Record = Tuple[Optional[str], Dict[str, Any]]
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def section_name(name: Any) -> Optional[str]:
+    """The section a record type refers to ("faq" -> "faqs"), None if unknown."""
+    if not isinstance(name, str):
+        return None
+    name = name.strip().lower()
+    if name in SECTIONS:
+        return name
+    return name + "s" if name + "s" in SECTIONS else None
+
+
+class _Reader:
+    """A sliding window over a text stream for decoding one JSON value at a time."""
+
+    def __init__(self, f: TextIO):
+        self.f = f
+        self.buffer = ""
+        self.pos = 0
+        self.consumed = 0
+        self.eof = False
+
+    @property
+    def offset(self) -> int:
+        return self.consumed + self.pos
+
+    def _fill(self, size: int = READ_SIZE) -> bool:
+        chunk = self.f.read(size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop what has been parsed so only the current value stays buffered
+        self.consumed += self.pos
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """The next non-whitespace character ("" at the end of the stream)."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if not char or char not in chars:
+            found = repr(char) if char else "end of file"
+            raise ValueError(f"Expected {' or '.join(map(repr, chars))} at offset {self.offset}, found {found}")
+        self.pos += 1
+        return char
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+                # A value ending at the buffer's end may continue (e.g. a number)
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self.eof:
+                    raise ValueError(f"Invalid JSON at offset {self.consumed + e.pos}: {e.msg}") from None
+            # Grow geometrically so a huge value is not re-parsed once per read
+            self._fill(max(READ_SIZE, len(self.buffer) - self.pos))
+
+
+def iter_json_sections(f: TextIO, sections: Iterable[str] = SECTIONS) -> Iterator[Record]:
+    """(section, record) for every element of the top-level arrays named in `sections`."""
+    wanted = set(sections)
+    reader = _Reader(f)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        if not isinstance(key, str):
+            raise ValueError(f"Expected an object key at offset {reader.offset}")
+        reader.expect(":")
+        if key in wanted and reader.peek() == "[":
+            reader.pos += 1
+            if reader.peek() == "]":
+                reader.pos += 1
+            else:
+                while True:
+                    yield key, reader.value()
+                    if reader.expect(",]") == "]":
+                        break
+        else:
+            # Other keys are parsed and dropped
+            reader.value()
+        if reader.expect(",}") == "}":
+            return
+
+
+def iter_json_lines(f: TextIO) -> Iterator[Record]:
+    """(section, record) per JSON Lines record; section is None for an unknown `type`."""
+    for number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON on line {number}: {e.msg}") from None
+        if not isinstance(record, dict):
+            yield None, {"line": number, "value": record}
+            continue
+        yield section_name(record.pop("type", None)), record
+
+
+def iter_records(path: Union[str, Path]) -> Iterator[Record]:
+    """Records of a business data file, JSON or JSON Lines by suffix."""
+    path = Path(path)
+    with open(path, "r", encoding="utf-8") as f:
+        if path.suffix.lower() in JSON_LINES_SUFFIXES:
+            yield from iter_json_lines(f)
+        else:
+            yield from iter_json_sections(f)
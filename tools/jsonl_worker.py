@@ -0,0 +1,48 @@
+"""
+JSON Lines worker loop shared by the CLI tools' `serve` command.
+
+A worker reads one JSON request per line on stdin and writes one JSON response
+per line on stdout, so the process (and its SDK clients) stay warm between
+calls:
+
+    -> {"id": 1, "command": "search", "args": {"query": "refund policy", "limit": 5}}
+    <- {"id": 1, "result": {"status": "success", "results": [...]}}
+
+Anything the tool functions print would corrupt the protocol, so stdout is
+redirected to stderr while a command runs.
+"""
+import contextlib
+import json
+import sys
+from typing import Any, Callable, Dict
+
+
+def handle_request(commands: Dict[str, Callable[..., Dict[str, Any]]], line: str) -> Dict[str, Any]:
+    """Execute a single JSON request line and build the response object."""
+    try:
+        request = json.loads(line)
+    except json.JSONDecodeError as e:
+        return {"id": None, "result": {"status": "error", "message": f"Invalid request: {e}"}}
+
+    request_id = request.get("id")
+    command = request.get("command")
+    if command not in commands:
+        return {"id": request_id, "result": {"status": "error", "message": f"Unknown command: {command}"}}
+
+    try:
+        result = commands[command](**request.get("args", {}))
+    except Exception as e:
+        result = {"status": "error", "message": str(e)}
+    return {"id": request_id, "result": result}
+
+
+def serve(commands: Dict[str, Callable[..., Dict[str, Any]]]) -> None:
+    """Serve requests from stdin until EOF."""
+    out = sys.stdout
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        with contextlib.redirect_stdout(sys.stderr):
+            response = handle_request(commands, line)
+        out.write(json.dumps(response) + "\n")
+        out.flush()
@@ -0,0 +1,200 @@
+"""
+Lexical Index - BM25 keyword search over the knowledge base
+
+Embeddings are good at paraphrases and bad at exact terms: an invoice
+number, a product SKU or a contact's name has no meaningful neighbourhood in
+embedding space, so `match_documents` often misses them. This inverted index
+scores documents with Okapi BM25 over their title, content and keywords and
+keeps identifiers such as "INV-2024-0042" intact as single terms (their parts
+are indexed as well). Inserts and deletes are incremental, mirroring the
+vector index.
+
+`fuse()` merges a lexical and a vector ranking with reciprocal-rank fusion,
+and `is_decisive()` tells the caller when the keyword match alone is clear
+enough that the query embedding is not worth computing: the query names
+something exact (an identifier with digits or separators, or a capitalized
+name) that the top document contains, and that document is well ahead of
+the runner-up.
+"""
+import math
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from vector_index import PAYLOAD_FIELDS
+
+
+# Compound identifiers (SKU-1234, inv/2024/7, v1.2) stay one token
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./#][a-z0-9]+)*")
+PART_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from has have how i if in is it its me my
+of on or our please tell that the their them there this to us was we what when where
+which who why will with you your
+""".split())
+
+# Reciprocal-rank fusion constant (Cormack et al.)
+RRF_K = 60
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased terms without stopwords; compound identifiers add their parts."""
+    terms = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        terms.append(token)
+        parts = PART_PATTERN.findall(token)
+        if len(parts) > 1:
+            terms.extend(part for part in parts if part not in STOPWORDS)
+    return terms
+
+
+def exact_terms(query: str) -> List[str]:
+    """Terms of `query` that name something exactly: identifiers and capitalized names."""
+    terms = [token for token in TOKEN_PATTERN.findall(query.lower())
+             if any(c.isdigit() for c in token) or len(PART_PATTERN.findall(token)) > 1]
+    # Capitalized words after the first one ("Who is Priya Raman at Globex?")
+    words = re.findall(r"[A-Za-z][\w'-]*", query)
+    terms.extend(word.lower() for word in words[1:] if word[0].isupper() and word.lower() not in STOPWORDS)
+    return list(dict.fromkeys(terms))
+
+
+def searchable_text(row: Dict[str, Any]) -> str:
+    """Title, content and keywords of a `documents` (or FAQ) row."""
+    metadata = row.get("metadata") or {}
+    keywords = row.get("keywords") or metadata.get("keywords") or []
+    return " ".join(filter(None, [row.get("title"), row.get("content"), " ".join(keywords)]))
+
+
+class BM25Index:
+    """Okapi BM25 inverted index with in-place inserts and deletes."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._lengths: Dict[str, int] = {}
+        self._terms: Dict[str, List[str]] = {}
+        self._payloads: Dict[str, Dict[str, Any]] = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return str(doc_id) in self._lengths
+
+    def ids(self) -> List[str]:
+        return list(self._lengths)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]], **params) -> "BM25Index":
+        index = cls(**params)
+        for row in rows:
+            index.upsert(row)
+        return index
+
+    def upsert(self, row: Dict[str, Any]) -> None:
+        """Index a document or re-index the one with the same id."""
+        payload = {field: row.get(field) for field in PAYLOAD_FIELDS}
+        doc_id = str(payload["id"])
+        terms = Counter(tokenize(searchable_text(row)))
+
+        with self._lock:
+            self.remove(doc_id)
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[doc_id] = tf
+            length = sum(terms.values())
+            self._lengths[doc_id] = length
+            self._terms[doc_id] = list(terms)
+            self._total_length += length
+            self._payloads[doc_id] = payload
+
+    def remove(self, doc_id: str) -> bool:
+        doc_id = str(doc_id)
+        with self._lock:
+            length = self._lengths.pop(doc_id, None)
+            if length is None:
+                return False
+            self._total_length -= length
+            del self._payloads[doc_id]
+            for term in self._terms.pop(doc_id):
+                postings = self._postings[term]
+                del postings[doc_id]
+                if not postings:
+                    del self._postings[term]
+            return True
+
+    def idf(self, term: str) -> float:
+        df = len(self._postings.get(term, ()))
+        return math.log(1 + (len(self._lengths) - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, limit: int = 5,
+               doc_type: Optional[str] = None, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Top `limit` documents by BM25 score (only documents sharing a term), best first."""
+        terms = set(tokenize(query))
+        with self._lock:
+            if not self._lengths or limit <= 0:
+                return []
+            average_length = self._total_length / len(self._lengths) or 1.0
+            scores: Dict[str, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = self.idf(term)
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            results = []
+            for doc_id, score in ranked:
+                payload = self._payloads[doc_id]
+                if doc_type is not None and payload["doc_type"] != doc_type:
+                    continue
+                if category is not None and payload["category"] != category:
+                    continue
+                results.append({**payload, "score": round(score, 4)})
+                if len(results) == limit:
+                    break
+            return results
+
+    def is_decisive(self, query: str, results: List[Dict[str, Any]],
+                    min_score: float = 3.0, ratio: float = 2.0) -> bool:
+        """
+        Whether the top keyword hit for `query` stands on its own: it contains
+        an exact term of the query and scores at least `min_score` and
+        `ratio` times the runner-up.
+        """
+        if not results or results[0]["score"] < min_score:
+            return False
+        if len(results) > 1 and results[0]["score"] < ratio * results[1]["score"]:
+            return False
+        top = str(results[0]["id"])
+        with self._lock:
+            return any(top in self._postings.get(term, ()) for term in exact_terms(query))
+
+
+def fuse(lexical: List[Dict[str, Any]], vector: List[Dict[str, Any]], limit: int,
+         k: int = RRF_K) -> List[Dict[str, Any]]:
+    """
+    Reciprocal-rank fusion of a BM25 and a vector ranking. Results keep the
+    vector `similarity` (None for keyword-only hits) and get the fused `score`.
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    for ranking in (lexical, vector):
+        for rank, row in enumerate(ranking):
+            doc_id = str(row["id"])
+            entry = fused.setdefault(doc_id, {**row, "similarity": None, "score": 0.0})
+            if "similarity" in row:
+                entry["similarity"] = row["similarity"]
+            entry["score"] += 1.0 / (k + rank + 1)
+    ranked = sorted(fused.values(), key=lambda row: row["score"], reverse=True)[:limit]
+    for row in ranked:
+        row["score"] = round(row["score"], 6)
+    return ranked
@@ -0,0 +1,265 @@
+"""
+Quantization - Compressed embeddings for the knowledge base index
+
+A 1536-dimensional float32 embedding is 6 KB, and a query has to scan all of
+them. The quantized index keeps a compact code per document for that scan
+and re-scores only the best candidates exactly:
+
+- sq8: per-dimension scalar quantization to one byte (4x smaller); the
+       approximate score is a single uint8 matrix-vector product
+- pq:  product quantization; the vector is split into `subspaces` chunks and
+       each chunk is replaced by the index of its nearest k-means centroid
+       (256 per chunk), e.g. 96 bytes per 1536-dimensional vector (64x);
+       scores are table lookups (asymmetric distance computation)
+
+Only the codes are held in RAM. The full vectors, the re-scoring tier, go
+to a memory-mapped scratch file (in `vectors_dir`, the system temp directory
+by default), so the kernel pages in just the rows of the candidates being
+re-scored. Results, similarities and the `threshold` cut-off are exact for
+every candidate the codes surface.
+
+Both need training data. Until `train_size` documents have been added the
+index answers from the full vectors like `VectorIndex`; it then fits the
+quantizer on a random sample of up to `train_sample` of them and encodes new
+documents as they arrive. Codebooks fitted on a small corpus describe it
+poorly once it has grown, so the quantizer is re-fitted and every document
+re-encoded whenever the index reaches `retrain_growth` times the size it
+was last trained at.
+
+Selected with RAG_INDEX_BACKEND=sq8 or pq; scripts/benchmark_ann.py reports
+memory, recall and latency per setting.
+"""
+import os
+import tempfile
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from vector_index import Vector, VectorIndex, as_vector, normalize
+
+
+# Rows scored per block, bounding the float32 temporaries of a scan
+SCAN_BLOCK = 4096
+
+
+def kmeans(vectors: np.ndarray, k: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """Lloyd's k-means; returns (k, dim) centroids."""
+    rng = np.random.default_rng(seed)
+    k = min(k, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = nearest_centroids(vectors, centroids)
+        counts = np.bincount(assignments, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        # Re-seed clusters that lost all their points
+        centroids[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+    return centroids
+
+
+def nearest_centroids(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    distances = (centroids ** 2).sum(axis=1) - 2 * vectors @ centroids.T
+    return distances.argmin(axis=1)
+
+
+class ScalarQuantizer:
+    """Per-dimension min/max quantization of each component to one byte."""
+
+    name = "sq8"
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.code_size = dim
+        self.trained = False
+        self._low = np.zeros(dim, dtype=np.float32)
+        self._scale = np.ones(dim, dtype=np.float32)
+
+    def train(self, vectors: np.ndarray) -> None:
+        self._low = vectors.min(axis=0)
+        spread = vectors.max(axis=0) - self._low
+        self._scale = np.where(spread > 0, spread / 255, 1.0).astype(np.float32)
+        self.trained = True
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.rint((vectors - self._low) / self._scale)
+        return np.clip(codes, 0, 255).astype(np.uint8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return self._low + codes.astype(np.float32) * self._scale
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Approximate dot products of the encoded vectors with `query`."""
+        # q . (low + scale * code) = q . low + (q * scale) . code
+        weights = query * self._scale
+        offset = float(query @ self._low)
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), SCAN_BLOCK):
+            block = codes[start:start + SCAN_BLOCK]
+            scores[start:start + len(block)] = block.astype(np.float32) @ weights + offset
+        return scores
+
+
+class ProductQuantizer:
+    """Product quantization with 256 k-means centroids per subspace."""
+
+    name = "pq"
+
+    def __init__(self, dim: int, subspaces: int = 96, iterations: int = 20, seed: int = 0):
+        if dim % subspaces:
+            raise ValueError(f"dim {dim} is not divisible into {subspaces} subspaces")
+        self.dim = dim
+        self.subspaces = subspaces
+        self.sub_dim = dim // subspaces
+        self.code_size = subspaces
+        self.iterations = iterations
+        self.seed = seed
+        self.trained = False
+        self._codebooks = np.zeros((subspaces, 256, self.sub_dim), dtype=np.float32)
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        return vectors.reshape(len(vectors), self.subspaces, self.sub_dim)
+
+    def train(self, vectors: np.ndarray) -> None:
+        parts = self._split(vectors)
+        for s in range(self.subspaces):
+            centroids = kmeans(parts[:, s], 256, self.iterations, self.seed + s)
+            self._codebooks[s, :len(centroids)] = centroids
+            # With fewer training points than centroids, repeat the last one
+            self._codebooks[s, len(centroids):] = centroids[-1]
+        self.trained = True
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        parts = self._split(vectors)
+        codes = np.empty((len(vectors), self.subspaces), dtype=np.uint8)
+        for s in range(self.subspaces):
+            codes[:, s] = nearest_centroids(parts[:, s], self._codebooks[s])
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        parts = self._codebooks[np.arange(self.subspaces), codes]
+        return parts.reshape(len(codes), self.dim)
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Approximate dot products via per-subspace lookup tables."""
+        # table[s, c] = query chunk s . centroid c of subspace s
+        table = np.einsum("scd,sd->sc", self._codebooks, query.reshape(self.subspaces, self.sub_dim))
+        columns = np.arange(self.subspaces)
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), SCAN_BLOCK):
+            block = codes[start:start + SCAN_BLOCK]
+            scores[start:start + len(block)] = table[columns, block].sum(axis=1)
+        return scores
+
+
+QUANTIZERS = {"sq8": ScalarQuantizer, "pq": ProductQuantizer}
+
+
+class QuantizedIndex(VectorIndex):
+    """
+    `VectorIndex` that scans quantized codes and re-scores the top
+    `limit * rerank` candidates on the full vectors, kept on disk.
+    """
+
+    def __init__(self, dim: int = 1536, capacity: int = 1024, method: str = "sq8",
+                 train_size: int = 1024, rerank: int = 10, train_sample: int = 16384,
+                 retrain_growth: float = 2.0, vectors_dir: Optional[str] = None, **quantizer_params):
+        if method not in QUANTIZERS:
+            raise ValueError(f"Unknown quantization method: {method} (expected one of {tuple(QUANTIZERS)})")
+        self.vectors_dir = vectors_dir
+        super().__init__(dim=dim, capacity=capacity)
+        self.quantizer = QUANTIZERS[method](dim, **quantizer_params)
+        self.train_size = train_size
+        self.train_sample = train_sample
+        self.retrain_growth = retrain_growth
+        self.rerank = rerank
+        # Index size at the last training, 0 before the first
+        self.trained_on = 0
+        self._rng = np.random.default_rng(quantizer_params.get("seed", 0))
+        self._codes = np.zeros((capacity, self.quantizer.code_size), dtype=np.uint8)
+
+    def _new_matrix(self, capacity: int) -> np.ndarray:
+        # An unlinked scratch file: its space is freed with the last mapping
+        with tempfile.TemporaryFile(dir=self.vectors_dir, prefix="quantized-") as f:
+            return np.memmap(f, dtype=np.float32, mode="w+", shape=(capacity, self.dim))
+
+    @classmethod
+    def from_rows(cls, rows, dim: int = 1536, **params) -> "QuantizedIndex":
+        """Build an index from `documents` rows and train once they are all in."""
+        rows = [row for row in rows if row.get("embedding") is not None]
+        index = cls(dim=dim, capacity=max(len(rows), 1), **params)
+        for row in rows:
+            VectorIndex.upsert(index, row)
+        if len(index):
+            index.train()
+        return index
+
+    def train(self) -> None:
+        """Fit the quantizer on a sample of the stored vectors and (re-)encode all of them."""
+        with self._lock:
+            sample = min(self._size, self.train_sample)
+            positions = np.sort(self._rng.choice(self._size, sample, replace=False))
+            self.quantizer.train(np.asarray(self._matrix[positions]))
+            for start in range(0, self._size, SCAN_BLOCK):
+                end = min(start + SCAN_BLOCK, self._size)
+                self._codes[start:end] = self.quantizer.encode(np.asarray(self._matrix[start:end]))
+            self.trained_on = self._size
+
+    def upsert(self, row: Dict[str, Any]) -> None:
+        with self._lock:
+            super().upsert(row)
+            if self._size >= max(self.train_size, self.trained_on * self.retrain_growth):
+                self.train()
+            elif self.quantizer.trained:
+                position = self._rows[str(row["id"])]
+                self._codes[position] = self.quantizer.encode(self._matrix[position:position + 1])[0]
+
+    def _grow(self) -> None:
+        codes = np.zeros((2 * len(self._matrix), self.quantizer.code_size), dtype=np.uint8)
+        codes[:self._size] = self._codes[:self._size]
+        self._codes = codes
+        super()._grow()
+
+    def remove(self, doc_id: str) -> bool:
+        with self._lock:
+            position = self._rows.get(str(doc_id))
+            last = self._size - 1
+            if not super().remove(doc_id):
+                return False
+            self._codes[position] = self._codes[last]
+            return True
+
+    def search(self, query_embedding: Vector, limit: int = 5, threshold: float = 0.7,
+               doc_type: Optional[str] = None, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Top `limit` documents with exact similarity above `threshold`, best first."""
+        if not self.quantizer.trained:
+            return super().search(query_embedding, limit, threshold, doc_type, category)
+        query = normalize(as_vector(query_embedding))
+
+        with self._lock:
+            if self._size == 0 or limit <= 0:
+                return []
+            approximate = self.quantizer.scores(self._codes[:self._size], query)
+            if doc_type is not None:
+                approximate[self._doc_types[:self._size] != doc_type] = -np.inf
+            if category is not None:
+                approximate[self._categories[:self._size] != category] = -np.inf
+
+            k = min(limit * self.rerank, self._size)
+            candidates = np.argpartition(-approximate, k - 1)[:k]
+            candidates = candidates[np.isfinite(approximate[candidates])]
+            exact = self._matrix[candidates] @ query
+            order = np.argsort(-exact)[:limit]
+            return [
+                {**self._payloads[candidates[i]], "similarity": float(exact[i])}
+                for i in order
+                if exact[i] > threshold
+            ]
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Bytes of codes held in RAM and of full re-scoring vectors kept on disk."""
+        return {
+            "codes": self._size * self.quantizer.code_size,
+            "vectors_on_disk": self._size * self.dim * 4,
+        }
@@ -9,107 +9,554 @@ Usage:
     python rag_cli.py search --query "What is our refund policy?" --limit 5
     python rag_cli.py add --text "Our refund policy is..." --metadata '{"type":"policy"}'
     python rag_cli.py delete --id "abc123"
+    python rag_cli.py warm     # load the local vector index and report its size
+    python rag_cli.py snapshot # rebuild the shared memory-mapped snapshot (mmap backend)
+    python rag_cli.py faq --question "How do I reset my password?"
+    python rag_cli.py serve    # JSON-lines worker mode (see jsonl_worker.py)
+
+Embeddings are cached by model and normalized text (see embedding_cache.py),
+so repeated queries skip the OpenAI call. Searches are answered from an
+in-memory index of the `documents` embeddings once it is loaded, and by the
+`match_documents` RPC until then. RAG_INDEX_BACKEND selects exact search
+(vector_index.py), an HNSW graph (hnsw_index.py, persisted to RAG_INDEX_PATH),
+quantized codes (quantization.py) or a memory-mapped snapshot at
+RAG_INDEX_PATH that all workers share (vector_store.py). Long documents are
+added as token-budgeted chunks linked to a parent row (chunking.py).
 """
 import argparse
+import asyncio
 import json
-import sys
 import os
-from typing import Dict, Any, List
-from supabase import create_client, Client
-from openai import OpenAI
+import sys
+import threading
+import time
+import uuid
+import warnings
+from typing import Dict, Any, List, Optional, Tuple
+from supabase import AsyncClient, Client
+from openai import AsyncOpenAI, OpenAI
+
+from batch_embedder import BatchEmbedder
+from chunking import chunk_document, chunk_rows, parent_row
+from clients import registry
+from embedding_cache import get_embedding_cache
+from faq_matcher import FAQMatcher, UsageRecorder
+from jsonl_worker import serve
+from lexical_index import BM25Index, fuse
+from vector_index import SearchIndex, create_index
+from vector_store import MappedVectorIndex, write_store
+
+
+EMBEDDING_MODEL = "text-embedding-3-small"
 
 
 def get_supabase_client() -> Client:
-    """Initialize and return Supabase client."""
-    url = os.getenv("SUPABASE_URL")
-    key = os.getenv("SUPABASE_SERVICE_KEY")
-    if not url or not key:
-        raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set")
-    return create_client(url, key)
+    """Return the shared Supabase client."""
+    return registry.get("supabase")
+
+
+def get_async_supabase_client() -> AsyncClient:
+    """Return the shared async Supabase client."""
+    return registry.get("supabase_async")
 
 
 def get_openai_client() -> OpenAI:
-    """Initialize and return OpenAI client for embeddings."""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY must be set")
-    return OpenAI(api_key=api_key)
+    """Return the shared OpenAI client for embeddings."""
+    return registry.get("openai")
+
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """Return the shared async OpenAI client for embeddings."""
+    return registry.get("openai_async")
 
 
 def generate_embedding(text: str) -> List[float]:
-    """Generate embedding for text using OpenAI."""
+    """Generate embedding for text using OpenAI (cached)."""
+    cache = get_embedding_cache()
+    embedding = cache.get(EMBEDDING_MODEL, text)
+    if embedding is not None:
+        return embedding
+    
     client = get_openai_client()
     response = client.embeddings.create(
-        model="text-embedding-3-small",
+        model=EMBEDDING_MODEL,
+        input=text
+    )
+    embedding = response.data[0].embedding
+    cache.put(EMBEDDING_MODEL, text, embedding)
+    return embedding
+
+
+async def agenerate_embedding(text: str) -> List[float]:
+    """Async variant of generate_embedding."""
+    cache = get_embedding_cache()
+    embedding = cache.get(EMBEDDING_MODEL, text)
+    if embedding is not None:
+        return embedding
+    
+    client = get_async_openai_client()
+    response = await client.embeddings.create(
+        model=EMBEDDING_MODEL,
         input=text
     )
-    return response.data[0].embedding
+    embedding = response.data[0].embedding
+    cache.put(EMBEDDING_MODEL, text, embedding)
+    return embedding
+
+
+
+def generate_embeddings(texts: List[str]) -> List[List[float]]:
+    """Embeddings for many texts, batched into as few requests as possible (cached)."""
+    return BatchEmbedder(get_openai_client(), EMBEDDING_MODEL).embed(texts)
+
+
+MATCH_THRESHOLD = 0.7
+
+
+def _match_params(query_embedding: List[float], limit: int,
+                  doc_type: Optional[str] = None, category: Optional[str] = None) -> Dict[str, Any]:
+    params = {
+        "query_embedding": query_embedding,
+        "match_threshold": MATCH_THRESHOLD,
+        "match_count": limit
+    }
+    # Only the full schema's match_documents takes filters
+    if doc_type is not None:
+        params["filter_doc_type"] = doc_type
+    if category is not None:
+        params["filter_category"] = category
+    return params
+
+
+def _format_matches(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": doc["id"],
+            "content": doc["content"],
+            "metadata": doc["metadata"],
+            # None for keyword-only hits of a hybrid search
+            "similarity": doc.get("similarity"),
+            **({"score": doc["score"]} if "score" in doc else {})
+        }
+        for doc in rows
+    ]
+
+
+# ============================================================================
+# Local vector index (fast path for match_documents)
+# ============================================================================
+
+LOCAL_INDEX_ENABLED = os.getenv("RAG_LOCAL_INDEX", "1") != "0"
+INDEX_BACKEND = os.getenv("RAG_INDEX_BACKEND", "exact")
+INDEX_PATH = os.path.expanduser(os.getenv("RAG_INDEX_PATH", ""))
+INDEX_REFRESH_SECONDS = float(os.getenv("RAG_INDEX_REFRESH_SECONDS", "300"))
+INDEX_PARAMS = {
+    "hnsw": {
+        "M": int(os.getenv("RAG_HNSW_M", "16")),
+        "ef_construction": int(os.getenv("RAG_HNSW_EF_CONSTRUCTION", "200")),
+        "ef_search": int(os.getenv("RAG_HNSW_EF_SEARCH", "64")),
+    },
+    "sq8": {
+        "rerank": int(os.getenv("RAG_QUANT_RERANK", "10")),
+        "train_sample": int(os.getenv("RAG_QUANT_TRAIN_SAMPLE", "16384")),
+        "vectors_dir": os.getenv("RAG_QUANT_VECTORS_DIR") or None,
+    },
+    "pq": {
+        "rerank": int(os.getenv("RAG_QUANT_RERANK", "10")),
+        "train_sample": int(os.getenv("RAG_QUANT_TRAIN_SAMPLE", "16384")),
+        "vectors_dir": os.getenv("RAG_QUANT_VECTORS_DIR") or None,
+        "subspaces": int(os.getenv("RAG_PQ_SUBSPACES", "96")),
+    },
+}
+INDEX_PAGE_SIZE = 1000
+INDEX_FETCH_BATCH = 200
+# Rebuild an HNSW graph once this share of its nodes are deleted
+COMPACT_DELETED_FRACTION = 0.3
+
+HYBRID_SEARCH = os.getenv("RAG_HYBRID_SEARCH", "1") != "0"
+LEXICAL_DECISIVE_SCORE = float(os.getenv("RAG_LEXICAL_DECISIVE_SCORE", "3.0"))
+LEXICAL_DECISIVE_RATIO = float(os.getenv("RAG_LEXICAL_DECISIVE_RATIO", "2.0"))
+# Document columns the keyword index needs (no embedding)
+LEXICAL_COLUMNS = "id, content, metadata, doc_type, category, title"
+# FAQs live in their own table; their keyword index entries get this id prefix
+FAQ_ID_PREFIX = "faq:"
+
+_index: Optional[SearchIndex] = None
+_lexical: Optional[BM25Index] = None
+_index_loaded_at = 0.0
+_index_lock = threading.Lock()
+_index_loading = threading.Lock()
+# Only long-lived processes (serve, in-process) warm the index in the
+# background; a one-shot CLI command would exit before it is used
+_background_warm = True
+
 
+def fetch_index_rows(columns: str = "*") -> List[Dict[str, Any]]:
+    """Read every embedded document, a page at a time."""
+    supabase = get_supabase_client()
+    rows: List[Dict[str, Any]] = []
+    while True:
+        page = supabase.table("documents").select(columns).not_.is_("embedding", "null").order("id") \
+            .range(len(rows), len(rows) + INDEX_PAGE_SIZE - 1).execute().data
+        rows.extend(page)
+        if len(page) < INDEX_PAGE_SIZE:
+            return rows
 
-def search_knowledge(query: str, limit: int = 5) -> Dict[str, Any]:
-    """Search the knowledge base using vector similarity."""
+
+def fetch_document_ids() -> set:
+    """Ids of every embedded document (chunked parents have no embedding)."""
+    supabase = get_supabase_client()
+    ids: set = set()
+    offset = 0
+    while True:
+        page = supabase.table("documents").select("id").not_.is_("embedding", "null").order("id") \
+            .range(offset, offset + INDEX_PAGE_SIZE - 1).execute().data
+        ids.update(str(row["id"]) for row in page)
+        offset += len(page)
+        if len(page) < INDEX_PAGE_SIZE:
+            return ids
+
+
+def fetch_documents_by_id(doc_ids: List[str]) -> List[Dict[str, Any]]:
+    supabase = get_supabase_client()
+    rows: List[Dict[str, Any]] = []
+    for start in range(0, len(doc_ids), INDEX_FETCH_BATCH):
+        batch = doc_ids[start:start + INDEX_FETCH_BATCH]
+        rows.extend(supabase.table("documents").select("*").in_("id", batch).execute().data)
+    return rows
+
+
+def fetch_faqs() -> List[Dict[str, Any]]:
+    """Every FAQ with its category name and, where stored, question embedding."""
+    supabase = get_supabase_client()
+    columns = "id, question, answer, keywords, question_embedding, faq_categories(name)"
     try:
-        supabase = get_supabase_client()
+        return supabase.table("faqs").select(columns).execute().data
+    except Exception:
+        # Schemas created before faqs.question_embedding was added
+        return supabase.table("faqs").select(columns.replace(" question_embedding,", "")).execute().data
+
+
+def _faq_category(faq: Dict[str, Any]) -> Optional[str]:
+    return (faq.get("faq_categories") or {}).get("name")
+
+
+def _faq_document(faq: Dict[str, Any]) -> Dict[str, Any]:
+    """An FAQ as a keyword index row (question and answer as content)."""
+    return {
+        "id": f"{FAQ_ID_PREFIX}{faq['id']}",
+        "content": f"Q: {faq['question']}\nA: {faq['answer']}",
+        "metadata": {"source": "faqs", "faq_id": faq["id"], "keywords": faq.get("keywords") or []},
+        "doc_type": "faq",
+        "category": _faq_category(faq),
+        "title": faq["question"],
+    }
+
+
+def _new_index(size: int = 0) -> SearchIndex:
+    """An empty index of INDEX_BACKEND for `size` documents."""
+    backend = INDEX_BACKEND
+    if backend == "hnsw":
+        from hnsw_index import python_build_fits
+        if not python_build_fits(size):
+            warnings.warn(f"hnswlib is not installed; building the exact index for {size} documents "
+                          "instead of a pure-Python HNSW graph (pip install hnswlib)")
+            backend = "exact"
+    return create_index(backend, **INDEX_PARAMS.get(backend, {}))
+
+
+def _load_persisted_index() -> Optional[SearchIndex]:
+    if not INDEX_PATH or not os.path.exists(INDEX_PATH):
+        return None
+    if INDEX_BACKEND == "mmap":
+        try:
+            return MappedVectorIndex(INDEX_PATH)
+        except ValueError:
+            # A snapshot in an older format is rebuilt
+            return None
+    if INDEX_BACKEND == "hnsw":
+        from hnsw_index import load_hnsw_index
+        try:
+            return load_hnsw_index(INDEX_PATH)
+        except ValueError:
+            # Saved by the other HNSW engine; rebuilt
+            return None
+    return None
+
+
+def write_snapshot() -> Dict[str, Any]:
+    """Write every document to the memory-mapped snapshot workers share."""
+    try:
+        if not INDEX_PATH:
+            raise ValueError("RAG_INDEX_PATH is not set")
+        started = time.perf_counter()
+        documents = write_store(INDEX_PATH, fetch_index_rows())
+        return {
+            "status": "success",
+            "path": INDEX_PATH,
+            "documents": documents,
+            "bytes": os.path.getsize(INDEX_PATH),
+            "build_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+def sync_index(index: SearchIndex, *others) -> Dict[str, int]:
+    """
+    Bring indexes in line with the table: drop deleted ids, add new ones.
+    Counts are those of the first index.
+    """
+    live = fetch_document_ids()
+    indexes = (index,) + others
+    indexed = [{i for i in idx.ids() if not i.startswith(FAQ_ID_PREFIX)} for idx in indexes]
+    
+    missing: set = set()
+    for idx, ids in zip(indexes, indexed):
+        for doc_id in ids - live:
+            idx.remove(doc_id)
+        missing |= live - ids
+    
+    added = 0
+    for row in fetch_documents_by_id(sorted(missing)):
+        if row.get("embedding") is None:
+            continue
+        for idx, ids in zip(indexes, indexed):
+            if str(row["id"]) not in ids:
+                idx.upsert(row)
+        added += str(row["id"]) not in indexed[0]
+    
+    return {"added": added, "removed": len(indexed[0] - live)}
+
+
+def sync_faqs(lexical: BM25Index, faqs: List[Dict[str, Any]]) -> None:
+    """Re-index every FAQ in the keyword index."""
+    rows = [_faq_document(faq) for faq in faqs]
+    live = {row["id"] for row in rows}
+    for doc_id in lexical.ids():
+        if doc_id.startswith(FAQ_ID_PREFIX) and doc_id not in live:
+            lexical.remove(doc_id)
+    for row in rows:
+        lexical.upsert(row)
+
+
+def warm_index() -> Dict[str, Any]:
+    """
+    Load the local vector index, or sync the loaded one with the table.
+    
+    A cold start reads the persisted HNSW graph or the mmap snapshot when
+    there is one and only fetches what changed since; otherwise every
+    document is read. A snapshot replaced by another process is re-opened.
+    The keyword index is kept in step with the same changes, and the FAQ
+    matcher is reloaded.
+    """
+    global _index, _index_loaded_at, _lexical
+    try:
+        with _index_loading:
+            started = time.perf_counter()
+            index = _index
+            lexical = _lexical if HYBRID_SEARCH else None
+            if index is None or getattr(index, "snapshot_replaced", False):
+                index = _load_persisted_index()
+            if index is None and INDEX_BACKEND == "mmap":
+                result = write_snapshot()
+                if result["status"] != "success":
+                    return result
+                index = MappedVectorIndex(INDEX_PATH)
+                changes = {"added": len(index), "removed": 0}
+            elif index is None:
+                rows = fetch_index_rows()
+                index = _new_index(len(rows))
+                lexical = BM25Index() if HYBRID_SEARCH else None
+                for row in rows:
+                    index.upsert(row)
+                    if lexical is not None:
+                        lexical.upsert(row)
+                changes = {"added": len(index), "removed": 0}
+            else:
+                changes = sync_index(index, *([lexical] if lexical is not None else []))
+            
+            try:
+                faqs = fetch_faqs()
+            except Exception:
+                # Schemas without the faqs table (setup_supabase.sql)
+                faqs = []
+            if HYBRID_SEARCH:
+                if lexical is None:
+                    lexical = BM25Index.from_rows(fetch_index_rows(LEXICAL_COLUMNS))
+                sync_faqs(lexical, faqs)
+            set_faq_matcher(build_faq_matcher(faqs))
+            changes["faqs"] = len(faqs)
+            
+            if getattr(index, "deleted_fraction", 0.0) > COMPACT_DELETED_FRACTION:
+                index = index.compacted()
+                changes["compacted"] = True
+            if INDEX_PATH and hasattr(index, "save") and (changes["added"] or changes["removed"]):
+                index.save(INDEX_PATH)
+            
+            with _index_lock:
+                _index = index
+                _lexical = lexical
+                _index_loaded_at = time.monotonic()
+            return {
+                "status": "success",
+                "backend": INDEX_BACKEND,
+                "documents": len(index),
+                **changes,
+                "load_ms": round((time.perf_counter() - started) * 1000, 1)
+            }
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+def get_local_index() -> Optional[SearchIndex]:
+    """
+    The loaded index, or None while it is cold.
+    
+    A missing or stale index is (re)loaded in a background thread; callers
+    fall back to the RPC in the meantime. One-shot CLI commands never start
+    that thread.
+    """
+    if not LOCAL_INDEX_ENABLED:
+        return None
+    with _index_lock:
+        index = _index
+        stale = index is None or time.monotonic() - _index_loaded_at > INDEX_REFRESH_SECONDS
+    if stale and _background_warm and not _index_loading.locked():
+        threading.Thread(target=warm_index, daemon=True).start()
+    return index
+
+
+def _keyword_matches(query: str, limit: int, doc_type: Optional[str],
+                     category: Optional[str]) -> Tuple[List[Dict[str, Any]], bool]:
+    """BM25 hits from the loaded keyword index, and whether they are decisive."""
+    lexical = _lexical
+    if lexical is None:
+        return [], False
+    rows = lexical.search(query, limit, doc_type, category)
+    return rows, lexical.is_decisive(query, rows, LEXICAL_DECISIVE_SCORE, LEXICAL_DECISIVE_RATIO)
+
+
+def search_knowledge(query: str, limit: int = 5,
+                     doc_type: Optional[str] = None, category: Optional[str] = None) -> Dict[str, Any]:
+    """Search the knowledge base using keyword and vector similarity."""
+    try:
+        index = get_local_index()
+        keyword_rows, decisive = _keyword_matches(query, limit, doc_type, category)
+        if decisive:
+            return {"status": "success", "results": _format_matches(fuse(keyword_rows, [], limit)), "embedding_skipped": True}
+        
         query_embedding = generate_embedding(query)
         
-        # Use Supabase RPC function for vector similarity search
-        response = supabase.rpc(
-            "match_documents",
-            {
-                "query_embedding": query_embedding,
-                "match_threshold": 0.7,
-                "match_count": limit
-            }
-        ).execute()
+        if index is not None:
+            rows = index.search(query_embedding, limit, MATCH_THRESHOLD, doc_type, category)
+        else:
+            # Use Supabase RPC function for vector similarity search
+            supabase = get_supabase_client()
+            rows = supabase.rpc("match_documents", _match_params(query_embedding, limit, doc_type, category)).execute().data
         
-        results = []
-        for doc in response.data:
-            results.append({
-                "id": doc["id"],
-                "content": doc["content"],
-                "metadata": doc["metadata"],
-                "similarity": doc["similarity"]
-            })
+        if keyword_rows:
+            rows = fuse(keyword_rows, rows, limit)
+        return {"status": "success", "results": _format_matches(rows)}
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+async def asearch_knowledge(query: str, limit: int = 5,
+                            doc_type: Optional[str] = None, category: Optional[str] = None) -> Dict[str, Any]:
+    """Async variant of search_knowledge."""
+    try:
+        index = get_local_index()
+        keyword_rows, decisive = _keyword_matches(query, limit, doc_type, category)
+        if decisive:
+            return {"status": "success", "results": _format_matches(fuse(keyword_rows, [], limit)), "embedding_skipped": True}
+        
+        query_embedding = await agenerate_embedding(query)
         
-        return {"status": "success", "results": results}
+        if index is not None:
+            # Graph walks and quantized scans read memmaps and SQLite; keep them off the event loop
+            rows = await asyncio.to_thread(index.search, query_embedding, limit, MATCH_THRESHOLD, doc_type, category)
+        else:
+            supabase = get_async_supabase_client()
+            response = await supabase.rpc("match_documents", _match_params(query_embedding, limit, doc_type, category)).execute()
+            rows = response.data
+        
+        if keyword_rows:
+            rows = fuse(keyword_rows, rows, limit)
+        return {"status": "success", "results": _format_matches(rows)}
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 
 def add_knowledge(text: str, metadata: str = "{}") -> Dict[str, Any]:
-    """Add a new document to the knowledge base."""
+    """
+    Add a new document to the knowledge base.
+    
+    Text longer than one chunk (see chunking.py) is stored as a parent row
+    without an embedding plus one embedded row per chunk; the returned id is
+    the parent's. The chunks are embedded first and the parent is written in
+    the same insert as them, so a failure leaves no parent without chunks.
+    """
     try:
         supabase = get_supabase_client()
         metadata_dict = json.loads(metadata)
-        embedding = generate_embedding(text)
+        document = {"content": text, "metadata": metadata_dict}
+        chunks = chunk_document(text, metadata_dict.get("file_type"))
         
-        response = supabase.table("documents").insert({
-            "content": text,
-            "metadata": metadata_dict,
-            "embedding": embedding
-        }).execute()
+        if len(chunks) <= 1:
+            rows = [{**document, "embedding": generate_embedding(text)}]
+            response = supabase.table("documents").insert(rows[0]).execute()
+            inserted = response.data or []
+            doc_id = inserted[0]["id"] if inserted else None
+        else:
+            doc_id = str(uuid.uuid4())
+            rows = chunk_rows(document, chunks, doc_id)
+            for row, embedding in zip(rows, generate_embeddings([row["content"] for row in rows])):
+                row["id"] = str(uuid.uuid4())
+                row["embedding"] = embedding
+            # One statement: the parent and its chunks are committed together
+            parent = {**parent_row(document, len(chunks)), "id": doc_id}
+            inserted = supabase.table("documents").insert([parent] + rows).execute().data or []
         
-        doc_id = response.data[0]["id"] if response.data else None
-        return {"status": "success", "id": doc_id}
+        # Keep the loaded local indexes in step with the table (parents are not indexed)
+        for row in inserted:
+            if row.get("embedding") is None:
+                continue
+            for index in (_index, _lexical):
+                if index is not None:
+                    index.upsert(row)
+        
+        result = {"status": "success", "id": doc_id}
+        if len(chunks) > 1:
+            result["chunks"] = len(chunks)
+        return result
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 
 def delete_knowledge(doc_id: str) -> Dict[str, Any]:
-    """Delete a document from the knowledge base."""
+    """Delete a document (and its chunks) from the knowledge base."""
     try:
         supabase = get_supabase_client()
+        # Chunks go with their parent (ON DELETE CASCADE); collect their ids for the local indexes
+        chunks = supabase.table("documents").select("id").eq("parent_id", doc_id).execute()
         supabase.table("documents").delete().eq("id", doc_id).execute()
+        
+        for removed in [doc_id] + [row["id"] for row in chunks.data or []]:
+            for index in (_index, _lexical):
+                if index is not None:
+                    index.remove(removed)
+        
         return {"status": "success"}
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 
 def list_knowledge(limit: int = 10, offset: int = 0) -> Dict[str, Any]:
-    """List documents in the knowledge base."""
+    """List documents in the knowledge base (chunks are listed through their parent)."""
     try:
         supabase = get_supabase_client()
-        response = supabase.table("documents").select("id, content, metadata").range(offset, offset + limit - 1).execute()
+        response = supabase.table("documents").select("id, content, metadata").is_("parent_id", "null").range(offset, offset + limit - 1).execute()
         
         documents = []
         for doc in response.data:
@@ -124,7 +571,116 @@ def list_knowledge(limit: int = 10, offset: int = 0) -> Dict[str, Any]:
         return {"status": "error", "message": str(e)}
 
 
+# ============================================================================
+# FAQ fast path
+# ============================================================================
+
+FAQ_MATCH_THRESHOLD = float(os.getenv("FAQ_MATCH_THRESHOLD", "0.85"))
+FAQ_USAGE_FLUSH_SECONDS = float(os.getenv("FAQ_USAGE_FLUSH_SECONDS", "30"))
+
+_faq_matcher: Optional[FAQMatcher] = None
+_faq_lock = threading.Lock()
+
+
+def build_faq_matcher(faqs: List[Dict[str, Any]]) -> FAQMatcher:
+    """Matcher over `faqs` rows; missing question embeddings are computed (cached)."""
+    missing = [faq["question"] for faq in faqs if not faq.get("question_embedding")]
+    computed = iter(generate_embeddings(missing) if missing else [])
+    embeddings = [faq.get("question_embedding") or next(computed) for faq in faqs]
+    entries = [
+        {
+            "id": faq["id"],
+            "question": faq["question"],
+            "answer": faq["answer"],
+            "keywords": faq.get("keywords") or [],
+            "category": _faq_category(faq),
+        }
+        for faq in faqs
+    ]
+    return FAQMatcher(entries, embeddings)
+
+
+def set_faq_matcher(matcher: FAQMatcher) -> None:
+    global _faq_matcher
+    with _faq_lock:
+        _faq_matcher = matcher
+
+
+def get_faq_matcher() -> FAQMatcher:
+    """The loaded matcher; the first call loads it (warm_index refreshes it)."""
+    global _faq_matcher
+    with _faq_lock:
+        if _faq_matcher is None:
+            _faq_matcher = build_faq_matcher(fetch_faqs())
+        return _faq_matcher
+
+
+def _write_faq_usage(rows: List[Dict[str, Any]]) -> None:
+    get_supabase_client().rpc("record_faq_usage", {"usage": rows}).execute()
+
+
+faq_usage = UsageRecorder(_write_faq_usage, interval=FAQ_USAGE_FLUSH_SECONDS)
+
+
+def _faq_result(faq: Optional[Dict[str, Any]], score: float) -> Dict[str, Any]:
+    confidence = min(score, 1.0)
+    if faq is None or confidence < FAQ_MATCH_THRESHOLD:
+        return {"status": "success", "match": None, "confidence": round(confidence, 4)}
+    faq_usage.record(faq["id"])
+    return {
+        "status": "success",
+        "match": {
+            "id": faq["id"],
+            "question": faq["question"],
+            "answer": faq["answer"],
+            "category": faq["category"],
+        },
+        "confidence": round(confidence, 4)
+    }
+
+
+def match_faq(question: str) -> Dict[str, Any]:
+    """Find the FAQ that answers `question`, if one matches confidently."""
+    try:
+        matcher = get_faq_matcher()
+        faq = matcher.exact(question)
+        if faq is not None:
+            return _faq_result(faq, 1.0)
+        if not len(matcher):
+            return _faq_result(None, 0.0)
+        return _faq_result(*matcher.match(question, generate_embedding(question)))
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+async def amatch_faq(question: str) -> Dict[str, Any]:
+    """Async variant of match_faq."""
+    try:
+        matcher = _faq_matcher if _faq_matcher is not None else await asyncio.to_thread(get_faq_matcher)
+        faq = matcher.exact(question)
+        if faq is not None:
+            return _faq_result(faq, 1.0)
+        if not len(matcher):
+            return _faq_result(None, 0.0)
+        return _faq_result(*matcher.match(question, await agenerate_embedding(question)))
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+# Commands exposed by `serve` (argument names match the function signatures)
+COMMANDS = {
+    "search": search_knowledge,
+    "add": add_knowledge,
+    "delete": delete_knowledge,
+    "list": list_knowledge,
+    "warm": warm_index,
+    "snapshot": write_snapshot,
+    "faq": match_faq,
+}
+
+
 def main():
+    global _background_warm
     parser = argparse.ArgumentParser(description="RAG CLI Tool")
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
     
@@ -132,6 +688,8 @@ def main():
     search_parser = subparsers.add_parser("search", help="Search knowledge base")
     search_parser.add_argument("--query", required=True, help="Search query")
     search_parser.add_argument("--limit", type=int, default=5, help="Maximum number of results")
+    search_parser.add_argument("--doc-type", help="Only match documents of this doc_type")
+    search_parser.add_argument("--category", help="Only match documents in this category")
     
     # Add command
     add_parser = subparsers.add_parser("add", help="Add document to knowledge base")
@@ -147,22 +705,49 @@ def main():
     list_parser.add_argument("--limit", type=int, default=10, help="Maximum number of results")
     list_parser.add_argument("--offset", type=int, default=0, help="Offset for pagination")
     
+    # Warm command
+    subparsers.add_parser("warm", help="Load the local vector index and report its size")
+    
+    # Snapshot command
+    subparsers.add_parser("snapshot", help="Rebuild the memory-mapped snapshot at RAG_INDEX_PATH")
+    
+    # FAQ command
+    faq_parser = subparsers.add_parser("faq", help="Match a question against the FAQs")
+    faq_parser.add_argument("--question", required=True, help="User question")
+    
+    # Serve command
+    subparsers.add_parser("serve", help="Serve JSON-lines requests on stdin/stdout")
+    
     args = parser.parse_args()
     
     if not args.command:
         parser.print_help()
         sys.exit(1)
     
+    if args.command == "serve":
+        serve(COMMANDS)
+        registry.close()
+        return
+    
+    _background_warm = False
+    
     # Execute command
     result = {}
     if args.command == "search":
-        result = search_knowledge(args.query, args.limit)
+        result = search_knowledge(args.query, args.limit, args.doc_type, args.category)
     elif args.command == "add":
         result = add_knowledge(args.text, args.metadata)
     elif args.command == "delete":
         result = delete_knowledge(args.id)
     elif args.command == "list":
         result = list_knowledge(args.limit, args.offset)
+    elif args.command == "warm":
+        result = warm_index()
+    elif args.command == "snapshot":
+        result = write_snapshot()
+    elif args.command == "faq":
+        result = match_faq(args.question)
+        faq_usage.flush()
     
     # Output result as JSON
     print(json.dumps(result, indent=2))
@@ -0,0 +1,237 @@
+"""
+TTS Cache - Content-addressed cache for synthesized speech
+
+Many spoken responses are fixed strings ("You have no unread emails.", the
+draft email's closing question, ...), and synthesizing them again costs a
+Google TTS round trip every time. The cache keys audio by a hash of the text,
+the voice and the audio config, and keeps it in two tiers:
+
+- memory: an LRU bounded by total audio bytes (TTS_CACHE_MEMORY_MB)
+- disk:   one file per entry under TTS_CACHE_DIR, bounded by TTS_CACHE_DISK_MB
+          and evicted least-recently-used first (by file mtime)
+
+Disk entries survive restarts and are shared by every process (API server,
+tool workers) pointed at the same directory. Each process keeps a running
+total of the disk tier and only rescans the directory when that total crosses
+the limit or every `rescan_seconds`, which picks up what other processes wrote,
+so the limit holds for all of them together. Set TTS_CACHE_DIR to an empty
+string to keep the cache in memory only.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "voice-email-agent", "tts")
+
+# Pruning frees the disk tier down to this fraction of its limit, so a full
+# cache does not rescan and evict on every write
+PRUNE_TARGET = 0.9
+
+
+def cache_key(text: str, voice: bytes, audio_config: bytes) -> str:
+    """Content address of one synthesis request (serialized voice and config)."""
+    digest = hashlib.sha256()
+    for part in (text.encode("utf-8"), voice, audio_config):
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class TTSCache:
+    """Two-tier (memory LRU + disk) audio cache with hit/miss counters."""
+
+    def __init__(self, directory: Optional[str] = None,
+                 memory_bytes: int = 32 * 1024 * 1024,
+                 disk_bytes: int = 256 * 1024 * 1024,
+                 rescan_seconds: float = 60.0):
+        self.directory = directory or None
+        self.memory_limit = memory_bytes
+        self.disk_limit = disk_bytes
+        self.rescan_seconds = rescan_seconds
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_size = 0
+        self._disk_sizes: Dict[str, int] = {}
+        self._disk_size = 0
+        self._next_scan = 0.0
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        if self.directory:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                self._load_scan(self._scan_disk())
+            except OSError:
+                # Unwritable location: run with the memory tier only
+                self.directory = None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def _scan_disk(self) -> Dict[str, Tuple[int, float]]:
+        """Size and last use of every entry, including other processes' files."""
+        entries = {}
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".mp3"):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        # Evicted by another process meanwhile
+                        continue
+                    entries[entry.name[:-4]] = (stat.st_size, stat.st_mtime)
+        return entries
+
+    def _load_scan(self, entries: Dict[str, Tuple[int, float]]) -> None:
+        self._disk_sizes = {key: size for key, (size, _) in entries.items()}
+        self._disk_size = sum(self._disk_sizes.values())
+        self._next_scan = time.monotonic() + self.rescan_seconds
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return cached audio, promoting disk hits into memory."""
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return audio
+
+        audio = self._read_disk(key)
+        with self._lock:
+            if audio is None:
+                self._counters["misses"] += 1
+                return None
+            self._counters["disk_hits"] += 1
+            self._remember(key, audio)
+        return audio
+
+    def put(self, key: str, audio: bytes) -> None:
+        """Store audio in both tiers."""
+        with self._lock:
+            self._remember(key, audio)
+        self._write_disk(key, audio)
+
+    def _remember(self, key: str, audio: bytes) -> None:
+        if len(audio) > self.memory_limit:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_size -= len(previous)
+        self._memory[key] = audio
+        self._memory_size += len(audio)
+        while self._memory_size > self.memory_limit:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+            self._counters["evictions"] += 1
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+            # Mark as recently used for disk eviction
+            os.utime(path)
+            return audio
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, audio: bytes) -> None:
+        if not self.directory or len(audio) > self.disk_limit:
+            return
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(audio)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            self._disk_size += len(audio) - self._disk_sizes.get(key, 0)
+            self._disk_sizes[key] = len(audio)
+            due = self._disk_size > self.disk_limit or time.monotonic() >= self._next_scan
+            if due:
+                # Claim the scan so concurrent writers do not repeat it
+                self._next_scan = time.monotonic() + self.rescan_seconds
+        if due:
+            self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        """
+        Rescan the directory and delete least recently used files until the
+        disk tier is back under its limit. Runs outside the lock; writes that
+        land meanwhile are picked up by the next scan.
+        """
+        try:
+            entries = self._scan_disk()
+        except OSError:
+            return
+        total = sum(size for size, _ in entries.values())
+        evicted = 0
+        if total > self.disk_limit:
+            for key in sorted(entries, key=lambda key: entries[key][1]):
+                if total <= self.disk_limit * PRUNE_TARGET:
+                    break
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+                total -= entries.pop(key)[0]
+                evicted += 1
+
+        with self._lock:
+            self._load_scan(entries)
+            self._counters["evictions"] += evicted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["memory_hits"] + self._counters["disk_hits"] + self._counters["misses"]
+            hits = lookups - self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_size,
+                "disk_entries": len(self._disk_sizes),
+                "disk_bytes": self._disk_size,
+            }
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+            if self.directory:
+                try:
+                    self._load_scan(self._scan_disk())
+                except OSError:
+                    pass
+            for key in list(self._disk_sizes):
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+            self._disk_sizes.clear()
+            self._disk_size = 0
+
+
+def create_tts_cache() -> TTSCache:
+    """Build the cache from TTS_CACHE_DIR / TTS_CACHE_MEMORY_MB / TTS_CACHE_DISK_MB."""
+    return TTSCache(
+        directory=os.path.expanduser(os.getenv("TTS_CACHE_DIR", DEFAULT_CACHE_DIR)),
+        memory_bytes=int(float(os.getenv("TTS_CACHE_MEMORY_MB", "32")) * 1024 * 1024),
+        disk_bytes=int(float(os.getenv("TTS_CACHE_DISK_MB", "256")) * 1024 * 1024),
+    )
@@ -0,0 +1,180 @@
+"""
+Vector Index - In-memory exact search over the knowledge base
+
+The `documents` table is small enough to keep in RAM, so instead of a
+PostgREST round trip to `match_documents` per query, the index holds every
+embedding in one contiguous float32 matrix with L2-normalized rows. A query is
+a single matrix-vector product (cosine similarity) plus `argpartition` for the
+top k, with the same `match_threshold` and `doc_type`/`category` filters as
+the SQL function. Document payloads (content, metadata, ...) are kept next to
+the matrix so results have the same shape as the RPC's rows.
+
+`create_index()` picks the backend: "exact" (this module), "hnsw"
+(hnsw_index.py, approximate, for knowledge bases too large to scan) or
+"sq8"/"pq" (quantization.py, compressed codes re-scored exactly).
+"""
+import json
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Protocol, Sequence, Union
+
+import numpy as np
+
+
+# Columns of `documents` returned by match_documents, besides the embedding
+PAYLOAD_FIELDS = ("id", "content", "metadata", "doc_type", "category", "title")
+
+Vector = Union[Sequence[float], np.ndarray, str]
+
+
+def as_vector(embedding: Vector) -> np.ndarray:
+    """float32 vector from a list, an array or pgvector's '[x,y,...]' text form."""
+    if isinstance(embedding, str):
+        embedding = json.loads(embedding)
+    return np.asarray(embedding, dtype=np.float32)
+
+
+def normalize(vector: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SearchIndex(Protocol):
+    """Interface shared by the index backends."""
+
+    def __len__(self) -> int: ...
+
+    def __contains__(self, doc_id: str) -> bool: ...
+
+    def ids(self) -> List[str]: ...
+
+    def upsert(self, row: Dict[str, Any]) -> None: ...
+
+    def remove(self, doc_id: str) -> bool: ...
+
+    def search(self, query_embedding: Vector, limit: int = 5, threshold: float = 0.7,
+               doc_type: Optional[str] = None, category: Optional[str] = None) -> List[Dict[str, Any]]: ...
+
+
+class VectorIndex:
+    """Exact cosine-similarity index with in-place inserts and deletes."""
+
+    def __init__(self, dim: int = 1536, capacity: int = 1024):
+        self.dim = dim
+        self._matrix = self._new_matrix(capacity)
+        # Filter columns, kept as arrays so filtering stays vectorized
+        self._doc_types = np.empty(capacity, dtype=object)
+        self._categories = np.empty(capacity, dtype=object)
+        self._size = 0
+        self._payloads: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, doc_id: str) -> bool:
+        return str(doc_id) in self._rows
+
+    def ids(self) -> List[str]:
+        return list(self._rows)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]], dim: int = 1536) -> "VectorIndex":
+        """Build an index from `documents` rows (embedding plus payload columns)."""
+        rows = [row for row in rows if row.get("embedding") is not None]
+        index = cls(dim=dim, capacity=max(len(rows), 1))
+        for row in rows:
+            index.upsert(row)
+        return index
+
+    def upsert(self, row: Dict[str, Any]) -> None:
+        """Insert a document or replace the one with the same id."""
+        vector = normalize(as_vector(row["embedding"]))
+        if vector.shape != (self.dim,):
+            raise ValueError(f"Expected a {self.dim}-dimensional embedding, got {vector.shape}")
+        payload = {field: row.get(field) for field in PAYLOAD_FIELDS}
+        doc_id = str(payload["id"])
+
+        with self._lock:
+            position = self._rows.get(doc_id)
+            if position is None:
+                if self._size == len(self._matrix):
+                    self._grow()
+                position = self._size
+                self._size += 1
+                self._payloads.append(payload)
+                self._rows[doc_id] = position
+            else:
+                self._payloads[position] = payload
+            self._matrix[position] = vector
+            self._doc_types[position] = payload["doc_type"]
+            self._categories[position] = payload["category"]
+
+    def _new_matrix(self, capacity: int) -> np.ndarray:
+        return np.zeros((capacity, self.dim), dtype=np.float32)
+
+    def _grow(self) -> None:
+        capacity = 2 * len(self._matrix)
+        matrix = self._new_matrix(capacity)
+        matrix[:self._size] = self._matrix[:self._size]
+        doc_types = np.empty(capacity, dtype=object)
+        doc_types[:self._size] = self._doc_types[:self._size]
+        categories = np.empty(capacity, dtype=object)
+        categories[:self._size] = self._categories[:self._size]
+        self._matrix, self._doc_types, self._categories = matrix, doc_types, categories
+
+    def remove(self, doc_id: str) -> bool:
+        """Delete a document; the last row is moved into its slot."""
+        with self._lock:
+            position = self._rows.pop(str(doc_id), None)
+            if position is None:
+                return False
+            last = self._size - 1
+            if position != last:
+                self._matrix[position] = self._matrix[last]
+                self._doc_types[position] = self._doc_types[last]
+                self._categories[position] = self._categories[last]
+                self._payloads[position] = self._payloads[last]
+                self._rows[str(self._payloads[position]["id"])] = position
+            self._payloads.pop()
+            self._size -= 1
+            return True
+
+    def search(self, query_embedding: Vector, limit: int = 5, threshold: float = 0.7,
+               doc_type: Optional[str] = None, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Top `limit` documents with similarity above `threshold`, best first."""
+        query = normalize(as_vector(query_embedding))
+
+        with self._lock:
+            if self._size == 0 or limit <= 0:
+                return []
+            scores = self._matrix[:self._size] @ query
+            if doc_type is not None:
+                scores[self._doc_types[:self._size] != doc_type] = -np.inf
+            if category is not None:
+                scores[self._categories[:self._size] != category] = -np.inf
+
+            k = min(limit, self._size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                {**self._payloads[position], "similarity": float(scores[position])}
+                for position in top
+                if scores[position] > threshold
+            ]
+
+
+INDEX_BACKENDS = ("exact", "hnsw", "sq8", "pq")
+
+
+def create_index(backend: str = "exact", dim: int = 1536, **params) -> SearchIndex:
+    """Empty index of the given backend; `params` tune the HNSW graph or the quantizer."""
+    if backend == "exact":
+        return VectorIndex(dim=dim)
+    if backend == "hnsw":
+        from hnsw_index import create_hnsw_index
+        return create_hnsw_index(dim=dim, **params)
+    if backend in ("sq8", "pq"):
+        from quantization import QuantizedIndex
+        return QuantizedIndex(dim=dim, method=backend, **params)
+    raise ValueError(f"Unknown index backend: {backend} (expected one of {INDEX_BACKENDS})")
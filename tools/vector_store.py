@@ -0,0 +1,286 @@
+"""
+Vector Store - Memory-mapped knowledge base snapshot shared across workers
+
+With several uvicorn workers each one would fetch and hold its own copy of
+the `documents` embeddings. A snapshot file instead holds them once on disk:
+
+    header     magic, version, length of the table of contents (little endian)
+    contents   JSON: dim, count, doc_type/category names, section offsets
+    vectors    count x dim float32, L2-normalized
+    ids        document ids, sorted, fixed width (for a binary search)
+    id rows    uint32 row of each sorted id
+    doc_types  uint16 code of each row's doc_type (0 = none)
+    categories uint16 code of each row's category (0 = none)
+    offsets    uint64 start of each row's record, plus the end of the last
+    records    one JSON object per row (id, content, metadata, ...)
+
+Every section is 64-byte aligned and mapped with `np.memmap`, so every
+process reads the same page-cache copy, opening a snapshot costs one small
+read, and resident memory does not grow with the number of workers or the
+size of the knowledge base. A record is only decoded for a search hit.
+`write_store()` builds a new snapshot next to the old one and swaps it in
+with `os.replace`, so readers see either the old file or the new one, never
+a partial write; open mappings keep the old inode alive until they are
+dropped.
+
+`MappedVectorIndex` searches a snapshot with the `VectorIndex` interface.
+Documents added or deleted after the snapshot was built go to a small
+in-memory overlay until the next snapshot. Selected with
+RAG_INDEX_BACKEND=mmap and RAG_INDEX_PATH.
+"""
+import json
+import os
+import struct
+import tempfile
+import threading
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from vector_index import PAYLOAD_FIELDS, Vector, VectorIndex, as_vector, normalize
+
+
+MAGIC = b"VEAVECS\0"
+VERSION = 2
+# magic, version, table of contents length
+HEADER = struct.Struct("<8sII")
+ALIGNMENT = 64
+# Room left for the table of contents, so sections can be laid out before it is final
+CONTENTS_SIZE = 4096
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _codes(values: List[Optional[str]]) -> Tuple[List[str], np.ndarray]:
+    """Names and uint16 codes of `values`; code 0 stands for None."""
+    names = sorted({value for value in values if value is not None})
+    if len(names) >= 1 << 16:
+        raise ValueError(f"Too many distinct values for a snapshot: {len(names)}")
+    lookup = {name: i for i, name in enumerate(names, 1)}
+    return names, np.array([lookup.get(value, 0) for value in values], dtype="<u2")
+
+
+def _write_section(f: BinaryIO, sections: Dict[str, int], name: str, data: bytes) -> None:
+    f.write(b"\0" * (_aligned(f.tell()) - f.tell()))
+    sections[name] = f.tell()
+    f.write(data)
+
+
+def write_store(path: str, rows: Iterable[Dict[str, Any]], dim: int = 1536) -> int:
+    """Atomically write a snapshot of `documents` rows; returns the document count."""
+    rows = [row for row in rows if row.get("embedding") is not None]
+    ids = [str(row["id"]) for row in rows]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Snapshot rows must have distinct ids")
+    encoded_ids = [doc_id.encode("utf-8") for doc_id in ids]
+    id_width = max(map(len, encoded_ids), default=1)
+    order = sorted(range(len(rows)), key=encoded_ids.__getitem__)
+    doc_types, doc_type_codes = _codes([row.get("doc_type") for row in rows])
+    categories, category_codes = _codes([row.get("category") for row in rows])
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".vectors-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            sections: Dict[str, int] = {}
+            f.write(b"\0" * (HEADER.size + CONTENTS_SIZE))
+
+            f.write(b"\0" * (_aligned(f.tell()) - f.tell()))
+            sections["vectors"] = f.tell()
+            for row in rows:
+                vector = normalize(as_vector(row["embedding"]))
+                if vector.shape != (dim,):
+                    raise ValueError(f"Expected a {dim}-dimensional embedding, got {vector.shape}")
+                f.write(vector.astype("<f4").tobytes())
+
+            _write_section(f, sections, "ids",
+                           np.array([encoded_ids[i] for i in order], dtype=f"S{id_width}").tobytes())
+            _write_section(f, sections, "id_rows", np.array(order, dtype="<u4").tobytes())
+            _write_section(f, sections, "doc_types", doc_type_codes.tobytes())
+            _write_section(f, sections, "categories", category_codes.tobytes())
+
+            offsets = [0]
+            records = []
+            for row in rows:
+                record = json.dumps({field: row.get(field) for field in PAYLOAD_FIELDS},
+                                    default=str).encode("utf-8")
+                records.append(record)
+                offsets.append(offsets[-1] + len(record))
+            _write_section(f, sections, "offsets", np.array(offsets, dtype="<u8").tobytes())
+            _write_section(f, sections, "records", b"".join(records))
+
+            contents = json.dumps({
+                "dim": dim,
+                "count": len(rows),
+                "id_width": id_width,
+                "doc_types": doc_types,
+                "categories": categories,
+                "sections": sections,
+            }).encode("utf-8")
+            if len(contents) > CONTENTS_SIZE:
+                raise ValueError("Too many distinct doc_type / category values for a snapshot")
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, VERSION, len(contents)))
+            f.write(contents)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return len(rows)
+
+
+class VectorStore:
+    """Read-only view of a snapshot file; vectors, ids and records stay on disk."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                raise ValueError(f"{path} is not a vector store (truncated header)")
+            magic, version, contents_length = HEADER.unpack(header)
+            if magic != MAGIC or version != VERSION or contents_length > CONTENTS_SIZE:
+                raise ValueError(f"{path} is not a version {VERSION} vector store")
+            contents = json.loads(f.read(contents_length))
+
+        # Identity of the file opened, to notice when a new snapshot replaces it
+        self._identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        self.dim = dim = contents["dim"]
+        self._count = count = contents["count"]
+        self._doc_types = [None] + contents["doc_types"]
+        self._categories = [None] + contents["categories"]
+        sections = contents["sections"]
+
+        def section(name: str, dtype: str, shape: Tuple[int, ...]) -> np.ndarray:
+            if not count:
+                return np.zeros(shape, dtype=dtype)
+            return np.memmap(path, dtype=dtype, mode="r", offset=sections[name], shape=shape)
+
+        self.vectors = section("vectors", "<f4", (count, dim))
+        self._ids = section("ids", f"S{contents['id_width']}", (count,))
+        self._id_rows = section("id_rows", "<u4", (count,))
+        self.doc_type_codes = section("doc_types", "<u2", (count,))
+        self.category_codes = section("categories", "<u2", (count,))
+        self._offsets = section("offsets", "<u8", (count + 1,))
+        self._records = (np.memmap(path, dtype=np.uint8, mode="r", offset=sections["records"],
+                                   shape=(int(self._offsets[-1]),))
+                         if count and self._offsets[-1] else np.zeros(0, dtype=np.uint8))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def position(self, doc_id: str) -> Optional[int]:
+        """Row of `doc_id` in the snapshot, by binary search over the id table."""
+        if not self._count:
+            return None
+        key = str(doc_id).encode("utf-8")
+        if len(key) > self._ids.itemsize:
+            return None
+        i = int(np.searchsorted(self._ids, key))
+        if i < self._count and self._ids[i] == key:
+            return int(self._id_rows[i])
+        return None
+
+    def ids(self) -> List[str]:
+        """Every id in the snapshot, in row order."""
+        order = np.argsort(self._id_rows)
+        return [value.decode("utf-8") for value in self._ids[order]]
+
+    def payload(self, position: int) -> Dict[str, Any]:
+        """Decode one row's record (id, content, metadata, ...)."""
+        start, end = int(self._offsets[position]), int(self._offsets[position + 1])
+        return json.loads(self._records[start:end].tobytes())
+
+    def doc_type_code(self, doc_type: str) -> int:
+        """Code of `doc_type` in the doc_types section, -1 if no row has it."""
+        return self._doc_types.index(doc_type) if doc_type in self._doc_types else -1
+
+    def category_code(self, category: str) -> int:
+        return self._categories.index(category) if category in self._categories else -1
+
+    @property
+    def replaced(self) -> bool:
+        """True once a newer snapshot has been swapped in at `path`."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size) != self._identity
+
+
+class MappedVectorIndex:
+    """Exact search over a memory-mapped snapshot plus an in-memory overlay."""
+
+    def __init__(self, path: str):
+        self.store = VectorStore(path)
+        self.dim = self.store.dim
+        # Snapshot rows deleted or superseded since the snapshot was written
+        self._hidden = np.zeros(len(self.store), dtype=bool)
+        self._overlay = VectorIndex(dim=self.dim, capacity=16)
+        self._lock = threading.RLock()
+
+    @property
+    def snapshot_replaced(self) -> bool:
+        return self.store.replaced
+
+    def __len__(self) -> int:
+        return len(self.store) - int(self._hidden.sum()) + len(self._overlay)
+
+    def __contains__(self, doc_id: str) -> bool:
+        position = self.store.position(doc_id)
+        return (position is not None and not self._hidden[position]) or doc_id in self._overlay
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            live = [doc_id for doc_id, hidden in zip(self.store.ids(), self._hidden) if not hidden]
+            return live + self._overlay.ids()
+
+    def upsert(self, row: Dict[str, Any]) -> None:
+        """Insert or replace a document in the overlay."""
+        with self._lock:
+            self._hide(row["id"])
+            self._overlay.upsert(row)
+
+    def remove(self, doc_id: str) -> bool:
+        with self._lock:
+            return self._hide(doc_id) | self._overlay.remove(doc_id)
+
+    def _hide(self, doc_id: str) -> bool:
+        position = self.store.position(doc_id)
+        if position is None or self._hidden[position]:
+            return False
+        self._hidden[position] = True
+        return True
+
+    def search(self, query_embedding: Vector, limit: int = 5, threshold: float = 0.7,
+               doc_type: Optional[str] = None, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Top `limit` documents with similarity above `threshold`, best first."""
+        query = normalize(as_vector(query_embedding))
+
+        with self._lock:
+            results = self._overlay.search(query, limit, threshold, doc_type, category)
+            if len(self.store) and limit > 0:
+                scores = self.store.vectors @ query
+                scores[self._hidden] = -np.inf
+                if doc_type is not None:
+                    scores[self.store.doc_type_codes != self.store.doc_type_code(doc_type)] = -np.inf
+                if category is not None:
+                    scores[self.store.category_codes != self.store.category_code(category)] = -np.inf
+
+                k = min(limit, len(scores))
+                top = np.argpartition(-scores, k - 1)[:k]
+                # Only the hits' records are read and decoded
+                results.extend(
+                    {**self.store.payload(position), "similarity": float(scores[position])}
+                    for position in top
+                    if scores[position] > threshold
+                )
+        results.sort(key=lambda r: r["similarity"], reverse=True)
+        return results[:limit]
@@ -7,100 +7,289 @@ using Google Cloud APIs, following the Code Execution with MCP pattern.
 
 Usage:
     python voice_cli.py transcribe --file "path/to/audio.wav"
+    python voice_cli.py transcribe --file - < audio.wav    # audio on stdin
     python voice_cli.py speak --text "Hello, how can I help you?" --output "response.mp3"
+    python voice_cli.py speak --text "Hello" --output -    # base64 audio in the JSON
+    python voice_cli.py serve    # JSON-lines worker mode (see jsonl_worker.py)
+
+The `*_bytes` functions are the in-memory core used by the API server: audio
+goes from the websocket to the recognizer and from the synthesizer back to
+the websocket without touching the filesystem. Synthesized audio is cached by
+text, voice and audio config (see tts_cache.py).
 """
 import argparse
+import asyncio
+import base64
 import json
 import sys
 import os
-from typing import Dict, Any
+from typing import Any, AsyncIterator, Dict, Union
 from google.cloud import speech
 from google.cloud import texttospeech
 
+from clients import registry
+from jsonl_worker import serve
+from tts_cache import cache_key, create_tts_cache
 
-def transcribe_audio(file_path: str) -> Dict[str, Any]:
-    """Transcribe audio file to text using Google Cloud Speech-to-Text."""
+
+tts_cache = create_tts_cache()
+
+
+def _recognition_config() -> speech.RecognitionConfig:
+    return speech.RecognitionConfig(
+        encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+        sample_rate_hertz=16000,
+        language_code="en-US",
+        enable_automatic_punctuation=True,
+    )
+
+
+def _transcription_result(response: speech.RecognizeResponse) -> Dict[str, Any]:
+    transcript = ""
+    for result in response.results:
+        transcript += result.alternatives[0].transcript + " "
+    
+    return {
+        "status": "success",
+        "text": transcript.strip(),
+        "confidence": response.results[0].alternatives[0].confidence if response.results else 0.0
+    }
+
+
+def _voice_params() -> texttospeech.VoiceSelectionParams:
+    return texttospeech.VoiceSelectionParams(
+        language_code="en-US",
+        name="en-US-Neural2-J",  # High-quality neural voice
+        ssml_gender=texttospeech.SsmlVoiceGender.NEUTRAL
+    )
+
+
+def _audio_config() -> texttospeech.AudioConfig:
+    return texttospeech.AudioConfig(
+        audio_encoding=texttospeech.AudioEncoding.MP3,
+        speaking_rate=1.0,
+        pitch=0.0
+    )
+
+
+AudioBuffer = Union[bytes, bytearray, memoryview]
+
+
+def _write_audio(audio_content: bytes, output_file: str = None) -> Dict[str, Any]:
+    if output_file == "-":
+        return {
+            "status": "success",
+            "audio_base64": base64.b64encode(audio_content).decode("ascii"),
+            "size_bytes": len(audio_content)
+        }
+    
+    if not output_file:
+        output_file = "output.mp3"
+    
+    with open(output_file, "wb") as out:
+        out.write(audio_content)
+    
+    return {
+        "status": "success",
+        "audio_file": output_file,
+        "size_bytes": len(audio_content)
+    }
+
+
+def _read_audio(file_path: str) -> bytes:
+    if file_path == "-":
+        return sys.stdin.buffer.read()
+    with open(file_path, "rb") as audio_file:
+        return audio_file.read()
+
+
+def transcribe_bytes(content: AudioBuffer) -> Dict[str, Any]:
+    """Transcribe an in-memory LINEAR16 audio buffer."""
     try:
-        client = speech.SpeechClient()
-        
-        with open(file_path, "rb") as audio_file:
-            content = audio_file.read()
+        client = registry.get("speech")
         
-        audio = speech.RecognitionAudio(content=content)
-        config = speech.RecognitionConfig(
-            encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-            sample_rate_hertz=16000,
-            language_code="en-US",
-            enable_automatic_punctuation=True,
-        )
+        audio = speech.RecognitionAudio(content=bytes(content))
+        response = client.recognize(config=_recognition_config(), audio=audio)
         
-        response = client.recognize(config=config, audio=audio)
+        return _transcription_result(response)
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+async def atranscribe_bytes(content: AudioBuffer) -> Dict[str, Any]:
+    """Async variant of transcribe_bytes using the gRPC asyncio client."""
+    try:
+        client = registry.get("speech_async")
         
-        transcript = ""
-        for result in response.results:
-            transcript += result.alternatives[0].transcript + " "
+        audio = speech.RecognitionAudio(content=bytes(content))
+        response = await client.recognize(config=_recognition_config(), audio=audio)
         
-        return {
-            "status": "success",
-            "text": transcript.strip(),
-            "confidence": response.results[0].alternatives[0].confidence if response.results else 0.0
+        return _transcription_result(response)
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+async def astream_transcribe(frames: AsyncIterator[AudioBuffer],
+                             single_utterance: bool = True) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream PCM frames to Speech-to-Text as they arrive.
+    
+    Yields {"is_final", "text", "stability", "confidence"} for every response:
+    interim hypotheses while the user is speaking, then the final transcript.
+    With `single_utterance` the service ends the utterance itself when it
+    detects the end of speech, so the final result arrives right after the
+    user stops talking.
+    """
+    client = registry.get("speech_async")
+    streaming_config = speech.StreamingRecognitionConfig(
+        config=_recognition_config(),
+        interim_results=True,
+        single_utterance=single_utterance,
+    )
+    
+    async def requests():
+        yield speech.StreamingRecognizeRequest(streaming_config=streaming_config)
+        async for frame in frames:
+            yield speech.StreamingRecognizeRequest(audio_content=bytes(frame))
+    
+    stream = await client.streaming_recognize(requests=requests())
+    async for response in stream:
+        results = [result for result in response.results if result.alternatives]
+        if not results:
+            continue
+        yield {
+            "is_final": all(result.is_final for result in results),
+            "text": "".join(result.alternatives[0].transcript for result in results).strip(),
+            "stability": min(result.stability for result in results),
+            "confidence": results[0].alternatives[0].confidence,
         }
+
+
+def transcribe_base64(audio_b64: str) -> Dict[str, Any]:
+    """Transcribe base64-encoded audio (used by JSON-lines workers)."""
+    return transcribe_bytes(base64.b64decode(audio_b64))
+
+
+def transcribe_audio(file_path: str) -> Dict[str, Any]:
+    """Transcribe audio file to text using Google Cloud Speech-to-Text."""
+    try:
+        content = _read_audio(file_path)
     except Exception as e:
         return {"status": "error", "message": str(e)}
+    return transcribe_bytes(content)
 
 
-def synthesize_speech(text: str, output_file: str = None) -> Dict[str, Any]:
-    """Convert text to speech using Google Cloud Text-to-Speech."""
+async def atranscribe_audio(file_path: str) -> Dict[str, Any]:
+    """Async variant of transcribe_audio."""
     try:
-        client = texttospeech.TextToSpeechClient()
-        
-        synthesis_input = texttospeech.SynthesisInput(text=text)
-        
-        voice = texttospeech.VoiceSelectionParams(
-            language_code="en-US",
-            name="en-US-Neural2-J",  # High-quality neural voice
-            ssml_gender=texttospeech.SsmlVoiceGender.NEUTRAL
-        )
+        content = _read_audio(file_path)
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+    return await atranscribe_bytes(content)
+
+
+def _speech_cache_key(text: str) -> str:
+    return cache_key(
+        text,
+        texttospeech.VoiceSelectionParams.serialize(_voice_params()),
+        texttospeech.AudioConfig.serialize(_audio_config()),
+    )
+
+
+def _speech_audio(audio: bytes, cached: bool) -> Dict[str, Any]:
+    return {"status": "success", "audio": audio, "size_bytes": len(audio), "cached": cached}
+
+
+def synthesize_bytes(text: str) -> Dict[str, Any]:
+    """Synthesize speech and return the MP3 audio in memory under "audio"."""
+    try:
+        key = _speech_cache_key(text)
+        audio = tts_cache.get(key)
+        if audio is not None:
+            return _speech_audio(audio, cached=True)
         
-        audio_config = texttospeech.AudioConfig(
-            audio_encoding=texttospeech.AudioEncoding.MP3,
-            speaking_rate=1.0,
-            pitch=0.0
-        )
+        client = registry.get("tts")
         
         response = client.synthesize_speech(
-            input=synthesis_input,
-            voice=voice,
-            audio_config=audio_config
+            input=texttospeech.SynthesisInput(text=text),
+            voice=_voice_params(),
+            audio_config=_audio_config()
         )
         
-        if not output_file:
-            output_file = "output.mp3"
+        tts_cache.put(key, response.audio_content)
+        return _speech_audio(response.audio_content, cached=False)
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+async def asynthesize_bytes(text: str) -> Dict[str, Any]:
+    """Async variant of synthesize_bytes using the gRPC asyncio client."""
+    try:
+        key = _speech_cache_key(text)
+        # The cache reads, touches and writes files; keep that off the event loop
+        audio = await asyncio.to_thread(tts_cache.get, key)
+        if audio is not None:
+            return _speech_audio(audio, cached=True)
         
-        with open(output_file, "wb") as out:
-            out.write(response.audio_content)
+        client = registry.get("tts_async")
         
-        return {
-            "status": "success",
-            "audio_file": output_file,
-            "size_bytes": len(response.audio_content)
-        }
+        response = await client.synthesize_speech(
+            input=texttospeech.SynthesisInput(text=text),
+            voice=_voice_params(),
+            audio_config=_audio_config()
+        )
+        
+        await asyncio.to_thread(tts_cache.put, key, response.audio_content)
+        return _speech_audio(response.audio_content, cached=False)
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+def synthesize_speech(text: str, output_file: str = None) -> Dict[str, Any]:
+    """Convert text to speech using Google Cloud Text-to-Speech."""
+    result = synthesize_bytes(text)
+    if result["status"] != "success":
+        return result
+    try:
+        return _write_audio(result["audio"], output_file)
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 
+async def asynthesize_speech(text: str, output_file: str = None) -> Dict[str, Any]:
+    """Async variant of synthesize_speech."""
+    result = await asynthesize_bytes(text)
+    if result["status"] != "success":
+        return result
+    try:
+        return _write_audio(result["audio"], output_file)
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+# Commands exposed by `serve` (argument names match the function signatures)
+COMMANDS = {
+    "transcribe": transcribe_audio,
+    "transcribe_base64": transcribe_base64,
+    "speak": synthesize_speech,
+}
+
+
 def main():
     parser = argparse.ArgumentParser(description="Voice CLI Tool")
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
     
     # Transcribe command
     transcribe_parser = subparsers.add_parser("transcribe", help="Transcribe audio to text")
-    transcribe_parser.add_argument("--file", required=True, help="Path to audio file")
+    transcribe_parser.add_argument("--file", required=True, help="Path to audio file ('-' for stdin)")
     
     # Speak command
     speak_parser = subparsers.add_parser("speak", help="Convert text to speech")
     speak_parser.add_argument("--text", required=True, help="Text to convert to speech")
-    speak_parser.add_argument("--output", help="Output audio file path")
+    speak_parser.add_argument("--output", help="Output audio file path ('-' for base64 in the JSON output)")
+    
+    # Serve command
+    subparsers.add_parser("serve", help="Serve JSON-lines requests on stdin/stdout")
     
     args = parser.parse_args()
     
@@ -108,6 +297,11 @@ def main():
         parser.print_help()
         sys.exit(1)
     
+    if args.command == "serve":
+        serve(COMMANDS)
+        registry.close()
+        return
+    
     # Execute command
     result = {}
     if args.command == "transcribe":